@@ -20,8 +20,17 @@ Example:
 import os
 import sys
 import re
+import json
+import time
 import shutil
+import threading
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+TIMESTAMP_RE = re.compile(r'\d{14}')
+TIMESTAMP_VIDEO_RE = re.compile(r'^\d{14}\.mp4$')
+
+JOURNAL_FILENAME = '.deforum_rename_journal.jsonl'
 
 def is_timestamp_folder(folder_name):
     """
@@ -29,25 +38,64 @@ def is_timestamp_folder(folder_name):
     This indicates it's likely a Deforum batch output folder.
     The timestamp can be anywhere in the folder name.
     """
-    timestamp_pattern = r'\d{14}'
-    return re.search(timestamp_pattern, folder_name) is not None
+    return TIMESTAMP_RE.search(folder_name) is not None
 
 def is_timestamp_video(filename):
     """
     Check if a filename is a timestamp-only video file (YYYYMMDDHHMMSS.mp4).
     """
-    timestamp_video_pattern = r'^\d{14}\.mp4$'
-    return re.match(timestamp_video_pattern, filename) is not None
+    return TIMESTAMP_VIDEO_RE.match(filename) is not None
 
 def extract_timestamp_from_folder(folder_name):
     """
     Extract the timestamp from a folder name.
     Returns the timestamp string if found, None otherwise.
     """
-    timestamp_pattern = r'\d{14}'
-    match = re.search(timestamp_pattern, folder_name)
+    match = TIMESTAMP_RE.search(folder_name)
     return match.group(0) if match else None
 
+def rename_video_to_folder(video_file, folder_timestamp=None, dry_run=False):
+    """
+    Rename one timestamp video to match the name of the folder it is in.
+    
+    Args:
+        video_file (Path): The timestamp-only video file (YYYYMMDDHHMMSS.mp4)
+        folder_timestamp (str): Timestamp of the batch folder, shown in dry-run output
+        dry_run (bool): If True, only show what would be renamed without actually doing it
+    
+    Returns:
+        (status, new_path) where status is 'renamed', 'dry-run', 'exists' or 'error'
+    """
+    video_file = Path(video_file)
+    folder = video_file.parent
+    video_name = video_file.name
+    
+    # Extract timestamp from video name to see if it's related to this batch
+    video_timestamp = video_name.replace('.mp4', '')
+    
+    # Create new filename using folder name
+    new_video_name = f"{folder.name}.mp4"
+    new_video_path = folder / new_video_name
+    
+    # Check if target file already exists
+    if new_video_path.exists() and new_video_path != video_file:
+        print(f"  ⚠️  Warning: Target file '{new_video_name}' already exists")
+        return 'exists', new_video_path
+        
+    if dry_run:
+        print(f"  📹 Would rename: '{video_name}' → '{new_video_name}'")
+        print(f"     Video timestamp: {video_timestamp}, Folder timestamp: {folder_timestamp}")
+        return 'dry-run', new_video_path
+    
+    try:
+        # Rename the file
+        video_file.rename(new_video_path)
+        print(f"  ✅ Renamed: '{video_name}' → '{new_video_name}'")
+        return 'renamed', new_video_path
+    except Exception as e:
+        print(f"  ❌ Error renaming '{video_name}': {e}")
+        return 'error', None
+
 def find_and_rename_videos(base_directory, dry_run=False):
     """
     Find all video files in timestamp-named subfolders and rename them to match folder names.
@@ -102,30 +150,11 @@ def find_and_rename_videos(base_directory, dry_run=False):
                 print(f"  Skipping '{video_name}' (doesn't match timestamp pattern)")
                 continue
                 
-            # Extract timestamp from video name to see if it's related to this batch
-            video_timestamp = video_name.replace('.mp4', '')
-            
-            # Create new filename using folder name
-            new_video_name = f"{folder_name}.mp4"
-            new_video_path = item / new_video_name
-            
-            # Check if target file already exists
-            if new_video_path.exists() and new_video_path != video_file:
-                print(f"  ⚠️  Warning: Target file '{new_video_name}' already exists")
-                continue
-                
-            if dry_run:
-                print(f"  📹 Would rename: '{video_name}' → '{new_video_name}'")
-                print(f"     Video timestamp: {video_timestamp}, Folder timestamp: {folder_timestamp}")
-            else:
-                try:
-                    # Rename the file
-                    video_file.rename(new_video_path)
-                    print(f"  ✅ Renamed: '{video_name}' → '{new_video_name}'")
-                    renamed_count += 1
-                except Exception as e:
-                    print(f"  ❌ Error renaming '{video_name}': {e}")
-                    error_count += 1
+            status, _ = rename_video_to_folder(video_file, folder_timestamp, dry_run=dry_run)
+            if status == 'renamed':
+                renamed_count += 1
+            elif status == 'error':
+                error_count += 1
     
     print("\n" + "=" * 60)
     if dry_run:
@@ -135,6 +164,176 @@ def find_and_rename_videos(base_directory, dry_run=False):
         if error_count > 0:
             print(f"ERRORS: {error_count} files could not be renamed")
 
+def scan_rename_jobs(directory, recursive=False):
+    """
+    Yield (video_path, new_path) for every timestamp video that should be renamed.
+    
+    Uses a single os.scandir pass per folder. With recursive=True, folders that are not
+    timestamp folders (batch folders, z_<param>_<value> groups) are searched as well;
+    timestamp folders themselves are never descended into, since they hold the frames.
+    """
+    try:
+        with os.scandir(directory) as it:
+            subfolders = [entry for entry in it if entry.is_dir() and not entry.name.startswith('.')]
+    except OSError as e:
+        print(f"  ⚠️  Warning: Could not scan '{directory}': {e}")
+        return
+    
+    for entry in subfolders:
+        if not TIMESTAMP_RE.search(entry.name):
+            if recursive:
+                yield from scan_rename_jobs(entry.path, recursive)
+            continue
+        
+        target_name = f"{entry.name}.mp4"
+        videos = []
+        target_exists = False
+        try:
+            with os.scandir(entry.path) as it:
+                for file_entry in it:
+                    if file_entry.name == target_name:
+                        target_exists = True
+                    elif TIMESTAMP_VIDEO_RE.match(file_entry.name):
+                        videos.append(file_entry.path)
+        except OSError:
+            continue
+        
+        # Same rule as rename_video_to_folder: never overwrite an existing target
+        if videos and not target_exists:
+            yield videos[0], os.path.join(entry.path, target_name)
+
+class RenameJournal:
+    """
+    Append-only JSON-lines log of renames.
+    
+    Each entry is written and flushed before the rename happens, so after an interruption
+    undo_renames() can still reverse every rename that was carried out. Resuming needs no
+    journal lookup: already renamed videos no longer match the timestamp pattern.
+    """
+    
+    def __init__(self, journal_path):
+        self.journal_path = journal_path
+        self.lock = threading.Lock()
+        self.file = open(journal_path, 'a', encoding='utf-8')
+    
+    def record(self, op, source, target):
+        entry = json.dumps({'op': op, 'from': source, 'to': target, 'time': time.time()})
+        with self.lock:
+            self.file.write(entry + '\n')
+            self.file.flush()
+    
+    def close(self):
+        self.file.close()
+
+def fast_rename_videos(base_directory, dry_run=False, recursive=False, jobs=8, journal_path=None):
+    """
+    Rename timestamp videos in bulk, printing a summary instead of per-file output.
+    
+    Args:
+        base_directory (str): The directory to search for Deforum output folders
+        dry_run (bool): If True, only count what would be renamed
+        recursive (bool): Also search folders below non-timestamp folders
+        jobs (int): Number of renames to run concurrently (helps on network filesystems)
+        journal_path (str): Journal file (default: .deforum_rename_journal.jsonl in base_directory)
+    
+    Returns:
+        (renamed_count, error_count)
+    """
+    if not os.path.isdir(base_directory):
+        print(f"Error: Directory '{base_directory}' does not exist.")
+        return 0, 0
+    
+    start = time.perf_counter()
+    rename_jobs = list(scan_rename_jobs(base_directory, recursive))
+    scan_time = time.perf_counter() - start
+    
+    print(f"Scanned {base_directory} in {scan_time:.2f}s: {len(rename_jobs)} videos to rename")
+    if dry_run or not rename_jobs:
+        for video_path, new_path in rename_jobs[:10]:
+            print(f"  📹 Would rename: '{video_path}' → '{os.path.basename(new_path)}'")
+        if len(rename_jobs) > 10:
+            print(f"  ... and {len(rename_jobs) - 10} more")
+        return 0, 0
+    
+    journal = RenameJournal(journal_path or os.path.join(base_directory, JOURNAL_FILENAME))
+    errors = []
+    
+    def rename(job):
+        video_path, new_path = job
+        journal.record('rename', video_path, new_path)
+        try:
+            os.rename(video_path, new_path)
+            return True
+        except OSError as e:
+            errors.append((video_path, e))
+            return False
+    
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as executor:
+            renamed_count = sum(executor.map(rename, rename_jobs))
+    finally:
+        journal.close()
+    
+    elapsed = time.perf_counter() - start
+    print(f"✅ Renamed {renamed_count} videos in {elapsed:.2f}s (journal: {journal.journal_path})")
+    if errors:
+        print(f"❌ {len(errors)} videos could not be renamed:")
+        for video_path, e in errors[:10]:
+            print(f"  {video_path}: {e}")
+    return renamed_count, len(errors)
+
+def undo_renames(journal_path, dry_run=False):
+    """
+    Reverse the renames recorded in a journal, newest first.
+    
+    A rename is reversed only if its target still exists and its original name is free, so
+    undo can be run again safely. Each reversal is appended to the journal as an 'undo' entry.
+    
+    Returns:
+        (restored_count, skipped_count)
+    """
+    if not os.path.isfile(journal_path):
+        print(f"Error: Journal '{journal_path}' does not exist.")
+        return 0, 0
+    
+    entries = []
+    with open(journal_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A line cut short by an interruption
+                continue
+            if entry.get('op') == 'rename':
+                entries.append(entry)
+    
+    restored_count = 0
+    skipped_count = 0
+    journal = None if dry_run else RenameJournal(journal_path)
+    try:
+        for entry in reversed(entries):
+            source, target = entry['from'], entry['to']
+            if not os.path.exists(target) or os.path.exists(source):
+                skipped_count += 1
+                continue
+            if dry_run:
+                restored_count += 1
+                continue
+            journal.record('undo', target, source)
+            try:
+                os.rename(target, source)
+                restored_count += 1
+            except OSError as e:
+                print(f"  ❌ Error restoring '{target}': {e}")
+                skipped_count += 1
+    finally:
+        if journal:
+            journal.close()
+    
+    action = "Would restore" if dry_run else "Restored"
+    print(f"{action} {restored_count} videos ({skipped_count} already restored or missing)")
+    return restored_count, skipped_count
+
 def main():
     """
     Main function to handle command line arguments and run the renamer.
@@ -150,6 +349,8 @@ Examples:
   python deforum_video_renamer.py --dry-run
   python deforum_video_renamer.py "C:/path/to/deforum/outputs"
   python deforum_video_renamer.py "D:/AI Apps/stable-diffusion-webui/outputs/txt2img-images" --dry-run
+  python deforum_video_renamer.py "D:/outputs" --fast --recursive
+  python deforum_video_renamer.py "D:/outputs" --undo
         """
     )
     
@@ -166,6 +367,37 @@ Examples:
         help='Show what would be renamed without actually doing it'
     )
     
+    parser.add_argument(
+        '--fast',
+        action='store_true',
+        help='Fast mode for large trees: one scan pass, concurrent renames, summary output '
+             'and a journal of every rename'
+    )
+    
+    parser.add_argument(
+        '-r', '--recursive',
+        action='store_true',
+        help='Also search subfolders that are not timestamp folders (implies --fast)'
+    )
+    
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=8,
+        help='Number of concurrent renames in fast mode (default: 8)'
+    )
+    
+    parser.add_argument(
+        '--journal',
+        help=f'Rename journal file (default: {JOURNAL_FILENAME} in the directory)'
+    )
+    
+    parser.add_argument(
+        '--undo',
+        action='store_true',
+        help='Reverse the renames recorded in the journal'
+    )
+    
     args = parser.parse_args()
     
     # Convert to absolute path for clarity
@@ -178,7 +410,14 @@ Examples:
         print("🔍 DRY RUN MODE - No files will be changed")
         print("-" * 60)
     
-    find_and_rename_videos(directory, dry_run=args.dry_run)
+    journal_path = args.journal or os.path.join(directory, JOURNAL_FILENAME)
+    if args.undo:
+        undo_renames(journal_path, dry_run=args.dry_run)
+    elif args.fast or args.recursive:
+        fast_rename_videos(directory, dry_run=args.dry_run, recursive=args.recursive,
+                           jobs=args.jobs, journal_path=journal_path)
+    else:
+        find_and_rename_videos(directory, dry_run=args.dry_run)
 
 if __name__ == "__main__":
     main()
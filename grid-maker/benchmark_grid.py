@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Deforum Video Grid Benchmark
+
+Builds synthetic Deforum batches with FFmpeg's lavfi testsrc and times each stage of the
+grid maker separately: renaming, scanning, parameter extraction, probing, resizing and
+compositing. Every run is appended to a JSON history file and compared with the previous
+run on the same machine, so regressions show up across engines and settings.
+
+Usage:
+    python benchmark_grid.py [options]
+
+Example:
+    python benchmark_grid.py --grids 3x3,6x6 --resolutions 512x512 --durations 2,5 \\
+        --engines two-stage,single-pass --label "before strip change"
+"""
+
+import os
+import sys
+import io
+import json
+import shutil
+import argparse
+import platform
+import subprocess
+import tempfile
+import time
+import contextlib
+from datetime import datetime
+from itertools import product
+from pathlib import Path
+from statistics import median
+from typing import List, Tuple, Dict, Optional
+
+from deforum_video_grid import DeforumVideoGrid, FFmpegLocator, GridWatcher, ProcessRunner, ENCODER_PROFILES
+
+STAGES = ['rename', 'scan', 'parameters', 'probe', 'resize', 'composite']
+
+HISTORY_FILENAME = 'benchmark_history.json'
+
+class SyntheticBatch:
+    """A Deforum-style batch folder of cols x rows runs, each with a testsrc video and settings file."""
+    
+    def __init__(self, root: Path, cols: int, rows: int, resolution: str, duration: float, fps: int):
+        self.root = root
+        self.cols = cols
+        self.rows = rows
+        self.resolution = resolution
+        self.duration = duration
+        self.fps = fps
+        self.batch_dir = root / f"bench_{cols}x{rows}_{resolution}_{duration:g}s"
+    
+    def source_clip(self, ffmpeg_path: str) -> Path:
+        """Encode (once) the testsrc clip that every run folder gets a copy of."""
+        clip = self.root / f"source_{self.resolution}_{self.duration:g}s_{self.fps}.mp4"
+        if clip.exists():
+            return clip
+        cmd = [
+            ffmpeg_path,
+            '-f', 'lavfi',
+            '-i', f'testsrc=size={self.resolution}:rate={self.fps}:duration={self.duration}',
+            '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p',
+            '-y', str(clip)
+        ]
+        result = ProcessRunner.shared().run(cmd, timeout=300)
+        if result.returncode != 0:
+            raise RuntimeError(f"Could not synthesize test clip: {result.stderr.decode('utf-8', 'replace')[-500:]}")
+        return clip
+    
+    def create(self, ffmpeg_path: str):
+        """Write the run folders, named the way Deforum names them, with timestamp-only videos."""
+        clip = self.source_clip(ffmpeg_path)
+        if self.batch_dir.exists():
+            shutil.rmtree(self.batch_dir)
+        self.batch_dir.mkdir(parents=True)
+        width, height = self.resolution.split('x')
+        
+        for index, (y, x) in enumerate(product(range(self.rows), range(self.cols))):
+            strength = round(0.3 + 0.05 * x, 2)
+            cfg = 4 + y
+            timestring = f"2025010100{index:04d}"
+            folder = self.batch_dir / (f"{timestring}_bench_seed_{index}_iter_{width}x{height}_"
+                                       f"strength-{strength}_cfg-{cfg}")
+            folder.mkdir()
+            shutil.copyfile(clip, folder / f"20250102{index:06d}.mp4")
+            settings = {
+                'W': int(width), 'H': int(height), 'seed': index, 'seed_behavior': 'iter',
+                'max_frames': int(self.duration * self.fps),
+                'strength_schedule': f"0: ({strength})", 'cfg_scale_schedule': f"0: ({cfg})",
+                'batch_name': folder.name,
+            }
+            with open(folder / f"{timestring}_settings.txt", 'w', encoding='utf-8') as f:
+                json.dump(settings, f, indent=4)
+
+class GridBenchmark:
+    def __init__(self, ffmpeg_path: str, work_dir: Path, thumbnail_size: int = 150, fps: int = 24,
+                 jobs: Optional[int] = None, repeat: int = 1, verbose: bool = False):
+        self.ffmpeg_path = ffmpeg_path
+        self.work_dir = work_dir
+        self.thumbnail_size = thumbnail_size
+        self.fps = fps
+        self.jobs = jobs
+        self.repeat = max(1, repeat)
+        self.verbose = verbose
+        self.renamer = GridWatcher._load_renamer()
+    
+    @contextlib.contextmanager
+    def quiet(self):
+        """Hide the grid maker's progress output unless running verbose."""
+        if self.verbose:
+            yield
+        else:
+            with contextlib.redirect_stdout(io.StringIO()):
+                yield
+    
+    def time_rename(self, batch: SyntheticBatch) -> Optional[float]:
+        """Time the renamer's fast mode, restoring the timestamp names first."""
+        if not self.renamer:
+            return None
+        journal_path = str(self.work_dir / f"{batch.batch_dir.name}.rename.jsonl")
+        with self.quiet():
+            if os.path.exists(journal_path):
+                self.renamer.undo_renames(journal_path)
+                os.remove(journal_path)
+            start = time.perf_counter()
+            self.renamer.fast_rename_videos(str(batch.batch_dir), jobs=self.jobs or 8, journal_path=journal_path)
+        return time.perf_counter() - start
+    
+    def run_case(self, batch: SyntheticBatch, engine: str, compositor: str, profile: str) -> Dict[str, float]:
+        """Run every stage once with cold indexes and no cell cache, returning seconds per stage."""
+        stages = {'rename': self.time_rename(batch)}
+        
+        with self.quiet():
+            generator = DeforumVideoGrid(
+                str(batch.batch_dir), thumbnail_size=self.thumbnail_size, fps=self.fps,
+                ffmpeg_path=self.ffmpeg_path, jobs=self.jobs, engine=engine, compositor=compositor,
+                use_index=False, use_cache=False, profile=profile
+            )
+            output_path = self.work_dir / f"{batch.batch_dir.name}_{engine}_{compositor}_{profile}.mp4"
+            
+            start = time.perf_counter()
+            video_files = list(generator.iter_video_files())
+            stages['scan'] = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            generator.resolve_settings_parameters(video_files)
+            grid, x_labels, y_labels, x_param_name, y_param_name = generator.organize_grid_layout(video_files)
+            stages['parameters'] = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            max_duration = generator.get_max_duration(grid)
+            stages['probe'] = time.perf_counter() - start
+            
+            page = generator.make_page(grid, output_path, x_labels, y_labels, x_param_name, y_param_name)
+            threads = 0
+            if engine == 'two-stage':
+                generator.temp_dir = Path(tempfile.mkdtemp(dir=self.work_dir))
+                try:
+                    start = time.perf_counter()
+                    placeholder_path = generator.create_placeholder_video(max_duration)
+                    resized = generator.resize_grid_cells(grid, max_duration, placeholder_path)
+                    stages['resize'] = time.perf_counter() - start
+                    
+                    start = time.perf_counter()
+                    ok = generator.compose_resized_grid(page, resized, max_duration, threads)
+                    stages['composite'] = time.perf_counter() - start
+                finally:
+                    shutil.rmtree(generator.temp_dir, ignore_errors=True)
+            else:
+                render = (generator.create_grid_video_numpy if engine == 'numpy'
+                          else generator.create_grid_video_single_pass)
+                start = time.perf_counter()
+                ok = render(page, max_duration, threads)
+                stages['composite'] = time.perf_counter() - start
+        
+        if output_path.exists():
+            output_path.unlink()
+        if not ok:
+            raise RuntimeError(f"{engine} engine failed to compose the grid")
+        return stages
+    
+    def run(self, grids: List[Tuple[int, int]], resolutions: List[str], durations: List[float],
+            engines: List[str], compositors: List[str], profiles: List[str]) -> List[Dict]:
+        """Run the full case matrix, taking the median of each stage over the repeats."""
+        results = []
+        for (cols, rows), resolution, duration in product(grids, resolutions, durations):
+            batch = SyntheticBatch(self.work_dir, cols, rows, resolution, duration, self.fps)
+            print(f"Synthesizing {batch.batch_dir.name}...")
+            batch.create(self.ffmpeg_path)
+            
+            for engine, compositor, profile in product(engines, compositors, profiles):
+                config = {
+                    'grid': f"{cols}x{rows}", 'resolution': resolution, 'duration': duration,
+                    'engine': engine, 'compositor': compositor, 'profile': profile,
+                    'thumbnail_size': self.thumbnail_size, 'fps': self.fps, 'jobs': self.jobs,
+                }
+                case = case_key(config)
+                runs = []
+                error = None
+                for _ in range(self.repeat):
+                    try:
+                        runs.append(self.run_case(batch, engine, compositor, profile))
+                    except Exception as e:
+                        error = str(e)
+                        break
+                
+                stages = {}
+                for stage in STAGES:
+                    values = [r[stage] for r in runs if r.get(stage) is not None]
+                    if values:
+                        stages[stage] = round(median(values), 4)
+                total = round(sum(stages.values()), 4)
+                status = f"{total:.2f}s" if error is None else f"FAILED ({error})"
+                print(f"  {case}: {status}")
+                results.append({'case': case, 'config': config, 'stages': stages, 'total': total,
+                                'ok': error is None})
+            
+            shutil.rmtree(batch.batch_dir, ignore_errors=True)
+        return results
+
+def case_key(config: Dict) -> str:
+    return (f"{config['grid']} {config['resolution']} {config['duration']:g}s "
+            f"{config['engine']}/{config['compositor']}/{config['profile']}")
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    return result.stdout.strip() or None
+
+def load_history(history_path: Path) -> List[Dict]:
+    try:
+        with open(history_path, 'r', encoding='utf-8') as f:
+            history = json.load(f)
+    except (OSError, ValueError):
+        return []
+    return history if isinstance(history, list) else []
+
+def save_history(history_path: Path, history: List[Dict]):
+    """Write the history atomically so an interrupted run never corrupts earlier results."""
+    tmp_path = history_path.with_name(history_path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp_path, history_path)
+
+def find_baseline(history: List[Dict], run: Dict, label: Optional[str]) -> Optional[Dict]:
+    """Pick the run to compare against: the newest with the given label, else the newest from this host."""
+    for previous in reversed(history):
+        if previous is run:
+            continue
+        if label is not None:
+            if previous.get('label') == label:
+                return previous
+        elif previous.get('host') == run.get('host'):
+            return previous
+    return None
+
+def print_report(run: Dict, baseline: Optional[Dict], threshold: float):
+    """Print stage times for this run and, with a baseline, the change per stage."""
+    stages = [stage for stage in STAGES if any(stage in r['stages'] for r in run['results'])]
+    print("\n" + "=" * 60)
+    print(f"Run {run['id']} ({run.get('label') or 'unlabeled'}, commit {run.get('commit') or 'unknown'})")
+    header = f"{'Case':<48}" + ''.join(f"{stage:>11}" for stage in stages) + f"{'total':>11}"
+    print(header)
+    for result in run['results']:
+        cells = ''.join(
+            f"{result['stages'][stage]:>10.2f}s" if stage in result['stages'] else f"{'-':>11}"
+            for stage in stages
+        )
+        total = f"{result['total']:>10.2f}s" if result['ok'] else f"{'FAILED':>11}"
+        print(f"{result['case']:<48}{cells}{total}")
+    
+    if not baseline:
+        print("\nNo earlier run to compare with")
+        return
+    
+    previous = {r['case']: r for r in baseline['results'] if r['ok']}
+    print(f"\nChange against run {baseline['id']} ({baseline.get('label') or 'unlabeled'}, "
+          f"commit {baseline.get('commit') or 'unknown'}):")
+    print(header)
+    regressions = []
+    for result in run['results']:
+        before = previous.get(result['case'])
+        if not before or not result['ok']:
+            continue
+        cells = ''
+        for stage in stages + ['total']:
+            new = result['total'] if stage == 'total' else result['stages'].get(stage)
+            old = before['total'] if stage == 'total' else before['stages'].get(stage)
+            if new is None or not old:
+                cells += f"{'-':>11}"
+                continue
+            change = (new - old) / old
+            cells += f"{change:>+10.0%} "
+            # Ignore noise on stages that take only a few milliseconds
+            if change > threshold and new - old > 0.05:
+                regressions.append((result['case'], stage, old, new, change))
+        print(f"{result['case']:<48}{cells}")
+    
+    if regressions:
+        print(f"\nRegressions over {threshold:.0%}:")
+        for case, stage, old, new, change in regressions:
+            print(f"  {case} {stage}: {old:.2f}s -> {new:.2f}s ({change:+.0%})")
+    else:
+        print(f"\nNo regressions over {threshold:.0%}")
+
+def parse_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+def parse_grids(value: str) -> List[Tuple[int, int]]:
+    grids = []
+    for item in parse_list(value):
+        cols, _, rows = item.partition('x')
+        grids.append((int(cols), int(rows or cols)))
+    return grids
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the Deforum video grid maker on synthetic batches",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python benchmark_grid.py
+  python benchmark_grid.py --grids 4x4,8x8 --engines two-stage,single-pass,numpy --repeat 3
+  python benchmark_grid.py --profiles draft,standard,final --label "profile comparison"
+  python benchmark_grid.py --compare-to "before strip change"
+        """
+    )
+    
+    parser.add_argument(
+        '--grids',
+        default='3x3',
+        help='Comma-separated grid sizes as COLSxROWS (default: 3x3)'
+    )
+    
+    parser.add_argument(
+        '--resolutions',
+        default='512x512',
+        help='Comma-separated source video resolutions (default: 512x512)'
+    )
+    
+    parser.add_argument(
+        '--durations',
+        default='2',
+        help='Comma-separated source video durations in seconds (default: 2)'
+    )
+    
+    parser.add_argument(
+        '--engines',
+        default='two-stage',
+        help='Comma-separated engines: two-stage, single-pass, numpy (default: two-stage)'
+    )
+    
+    parser.add_argument(
+        '--compositors',
+        default='overlay',
+        help='Comma-separated compositors: overlay, stack (default: overlay)'
+    )
+    
+    parser.add_argument(
+        '--profiles',
+        default='standard',
+        help=f"Comma-separated encoder profiles: {', '.join(ENCODER_PROFILES)} (default: standard)"
+    )
+    
+    parser.add_argument(
+        '-s', '--size',
+        type=int,
+        default=150,
+        help='Thumbnail size in pixels (default: 150)'
+    )
+    
+    parser.add_argument(
+        '-f', '--fps',
+        type=int,
+        default=24,
+        help='Frame rate of the synthetic videos and the grid (default: 24)'
+    )
+    
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        help='Worker count passed to the grid maker (default: CPU core count)'
+    )
+    
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=1,
+        help='Runs per case; the median of each stage is recorded (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--history',
+        default=HISTORY_FILENAME,
+        help=f'JSON file that results are appended to (default: {HISTORY_FILENAME})'
+    )
+    
+    parser.add_argument(
+        '--label',
+        help='Name for this run, e.g. the change being measured'
+    )
+    
+    parser.add_argument(
+        '--compare-to',
+        metavar='LABEL',
+        help='Compare with the newest run with this label (default: the previous run on this machine)'
+    )
+    
+    parser.add_argument(
+        '--threshold',
+        type=float,
+        default=0.10,
+        help='Slowdown fraction reported as a regression (default: 0.10)'
+    )
+    
+    parser.add_argument(
+        '--work-dir',
+        help='Folder for synthetic batches (default: a temporary folder, removed afterwards)'
+    )
+    
+    parser.add_argument(
+        '--ffmpeg-path',
+        help='Custom path to FFmpeg executable'
+    )
+    
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help='Show the grid maker output for every stage'
+    )
+    
+    args = parser.parse_args()
+    
+    ffmpeg_path = args.ffmpeg_path or FFmpegLocator.find_ffmpeg()
+    if not ffmpeg_path:
+        print("Error: FFmpeg not found. Please install FFmpeg or specify path with --ffmpeg-path")
+        return 1
+    
+    work_dir = Path(args.work_dir) if args.work_dir else Path(tempfile.mkdtemp(prefix='deforum_bench_'))
+    work_dir.mkdir(parents=True, exist_ok=True)
+    
+    benchmark = GridBenchmark(ffmpeg_path, work_dir, thumbnail_size=args.size, fps=args.fps,
+                              jobs=args.jobs, repeat=args.repeat, verbose=args.verbose)
+    try:
+        results = benchmark.run(
+            parse_grids(args.grids),
+            parse_list(args.resolutions),
+            [float(d) for d in parse_list(args.durations)],
+            parse_list(args.engines),
+            parse_list(args.compositors),
+            parse_list(args.profiles)
+        )
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    run = {
+        'id': datetime.now().strftime('%Y%m%d%H%M%S'),
+        'label': args.label,
+        'commit': git_commit(),
+        'host': platform.node(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'ffmpeg': FFmpegLocator._check(ffmpeg_path),
+        'results': results,
+    }
+    
+    history_path = Path(args.history)
+    history = load_history(history_path)
+    history.append(run)
+    save_history(history_path, history)
+    
+    print_report(run, find_baseline(history, run, args.compare_to), args.threshold)
+    print(f"\nResults appended to {history_path}")
+    return 0 if all(result['ok'] for result in results) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -63,6 +63,14 @@ if errorlevel 1 (
     set fps=24
 )
 
+:: Get encoder profile
+set /p profile="Enter encoder profile - draft, standard or final (default: standard): "
+if "%profile%"=="" set profile=standard
+if /i not "%profile%"=="draft" if /i not "%profile%"=="standard" if /i not "%profile%"=="final" (
+    echo Invalid profile. Using default: standard
+    set profile=standard
+)
+
 :: Get output filename
 set /p output_name="Enter output filename (without extension, default: auto-generated): "
 
@@ -89,6 +97,7 @@ echo =====================================================
 echo Directory: %selected_dir%
 echo Thumbnail size: %thumbnail_size%px
 echo FPS: %fps%
+echo Encoder profile: %profile%
 if not "%output_name%"=="" (
     echo Output filename: %output_name%.mp4
 ) else (
@@ -97,7 +106,7 @@ if not "%output_name%"=="" (
 echo.
 
 :: Build command
-set cmd_args="%selected_dir%" --size %thumbnail_size% --fps %fps%
+set cmd_args="%selected_dir%" --size %thumbnail_size% --fps %fps% --profile %profile%
 if not "%output_name%"=="" (
     set cmd_args=%cmd_args% --output "%output_name%.mp4"
 )
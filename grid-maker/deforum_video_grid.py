@@ -11,7 +11,7 @@ Usage:
 
 Requirements:
     - FFmpeg installed and accessible in PATH
-    - Python 3.6+
+    - Python 3.8+
 """
 
 import os
@@ -21,132 +21,474 @@ import json
 import subprocess
 import argparse
 from pathlib import Path
-from typing import List, Tuple, Dict, Optional
+from typing import List, Tuple, Dict, Optional, Iterator
 import tempfile
 import platform
+import shutil
+import threading
+import hashlib
+import time
+import fnmatch
+import contextlib
+import heapq
+import itertools
+import asyncio
+import atexit
+import signal
+import concurrent.futures
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+TIMESTAMP_VIDEO_RE = re.compile(r'^\d{14}\.mp4$')
+SETTINGS_FILE_RE = re.compile(r'^(.*_)?settings\.txt$')
+Z_GROUP_RE = re.compile(r'^z_(.+)_([^_]+)$')
+SINGLE_KEYFRAME_RE = re.compile(r'^\s*0\s*:\s*\((.*)\)\s*$')
+
+# Encoder profiles: 'intermediate' is used for resized cells, placeholders and strips,
+# 'output' for the final grid video
+ENCODER_PROFILES = {
+    'draft': {
+        'description': 'fast previews: ultrafast intermediates, quick lower-quality output',
+        'intermediate': ['-c:v', 'libx264', '-preset', 'ultrafast', '-crf', '23', '-pix_fmt', 'yuv420p'],
+        'output': ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '28', '-pix_fmt', 'yuv420p'],
+    },
+    'standard': {
+        'description': 'libx264 defaults for every encode (previous behaviour)',
+        'intermediate': ['-c:v', 'libx264', '-pix_fmt', 'yuv420p'],
+        'output': ['-c:v', 'libx264', '-pix_fmt', 'yuv420p'],
+    },
+    'final': {
+        'description': 'deliverables: lossless ultrafast intermediates, slow high-quality output',
+        'intermediate': ['-c:v', 'libx264', '-preset', 'ultrafast', '-qp', '0', '-pix_fmt', 'yuv420p'],
+        'output': ['-c:v', 'libx264', '-preset', 'slow', '-crf', '18', '-pix_fmt', 'yuv420p'],
+    },
+}
+
+# Extra outputs (--ladder) split off the composed grid stream and encoded in the same FFmpeg run.
+# width 0 keeps the full grid width; codec and crf default per format (LADDER_CODECS)
+LADDER_PRESETS = {
+    'proxy': {'width': 480, 'fps': 12, 'format': 'mp4'},
+    'preview': {'width': 320, 'fps': 8, 'format': 'webp'},
+    'gif': {'width': 320, 'fps': 8, 'format': 'gif'},
+}
+
+LADDER_CODECS = {
+    'mp4': ['-c:v', 'libx264', '-preset', 'veryfast', '-crf', '28', '-pix_fmt', 'yuv420p'],
+    'webm': ['-c:v', 'libvpx-vp9', '-crf', '36', '-b:v', '0', '-pix_fmt', 'yuv420p'],
+    'webp': ['-c:v', 'libwebp', '-loop', '0', '-quality', '75'],
+    'gif': ['-loop', '0'],
+}
+
+# FFmpeg -benchmark and progress output, parsed when profiling
+BENCH_TIMES_RE = re.compile(r'bench: utime=([\d.]+)s stime=([\d.]+)s rtime=([\d.]+)s')
+BENCH_MAXRSS_RE = re.compile(r'bench: maxrss=(\d+)\s*(KiB|kB)')
+SPEED_RE = re.compile(r'speed=\s*([\d.]+)x')
+
+# Settings keys that differ between runs without being sweep parameters
+SETTINGS_IGNORED_KEYS = {'batch_name', 'timestring', 'outdir', 'resume_timestring', 'resume_path'}
+
+class ProcessRunner:
+    """Starts every FFmpeg and FFprobe process, running captured ones on an asyncio loop thread.
+    
+    An asyncio.Semaphore caps how many processes run at once. stderr is streamed and only
+    its first and last few kilobytes are kept, so a chatty encode never grows in memory;
+    stdout is kept only when asked for (ffprobe JSON, -version). Each process starts in its
+    own process group, so a timeout, a cancelled coroutine or Ctrl+C kills the whole group.
+    
+    run_async is the awaitable API for pipelining work on the runner's loop; submit returns
+    a concurrent.futures.Future and run blocks, returning a subprocess.CompletedProcess
+    like subprocess.run, for the thread-pool code paths. Code that streams through a
+    process's pipes (the numpy engine, farm workers) starts it with popen, which registers
+    it for the same group kill, and holds its semaphore slots with reserve.
+    """
+    
+    STDERR_HEAD = 16 * 1024
+    STDERR_TAIL = 48 * 1024
+    
+    _shared = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.processes = set()
+        self.interrupted = False
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='ffmpeg-runner', daemon=True)
+        self.thread.start()
+        self.semaphore, self.reserve_lock = asyncio.run_coroutine_threadsafe(
+            self._make_primitives(), self.loop).result()
+    
+    async def _make_primitives(self) -> Tuple[asyncio.Semaphore, asyncio.Lock]:
+        # Created on the runner's loop, which older Pythons bind them to
+        return asyncio.Semaphore(self.limit), asyncio.Lock()
+    
+    @classmethod
+    def shared(cls, limit: Optional[int] = None) -> 'ProcessRunner':
+        """The process-wide runner; limit (default: CPU count) applies when it is first created."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls(limit or os.cpu_count() or 1)
+                atexit.register(cls._shared.close)
+            return cls._shared
+    
+    @staticmethod
+    def _group_options() -> Dict:
+        if os.name == 'nt':
+            return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+        return {'start_new_session': True}
+    
+    @staticmethod
+    def _kill(proc):
+        """Kill a process and, on POSIX, everything else in its process group."""
+        try:
+            if os.name == 'nt':
+                proc.kill()
+            else:
+                os.killpg(proc.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+    
+    async def _read_bounded(self, stream) -> bytes:
+        """Read a stream to its end, keeping only its head and tail."""
+        head = bytearray()
+        tail = bytearray()
+        skipped = 0
+        while True:
+            chunk = await stream.read(64 * 1024)
+            if not chunk:
+                break
+            if len(head) < self.STDERR_HEAD:
+                room = self.STDERR_HEAD - len(head)
+                head += chunk[:room]
+                chunk = chunk[room:]
+            tail += chunk
+            if len(tail) > 2 * self.STDERR_TAIL:
+                skipped += len(tail) - self.STDERR_TAIL
+                del tail[:-self.STDERR_TAIL]
+        if skipped:
+            return bytes(head) + f"\n[... {skipped} bytes of output skipped ...]\n".encode() + bytes(tail)
+        return bytes(head + tail)
+    
+    async def run_async(self, cmd: List[str], timeout: Optional[float] = None,
+                        capture_stdout: bool = False) -> subprocess.CompletedProcess:
+        """Run a command once a slot is free; raises subprocess.TimeoutExpired after timeout seconds."""
+        async with self.semaphore:
+            if self.interrupted:
+                return subprocess.CompletedProcess(cmd, -int(signal.SIGINT), b'', b'Interrupted')
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE if capture_stdout else subprocess.DEVNULL,
+                stderr=subprocess.PIPE, **self._group_options())
+            self.processes.add(proc)
+            try:
+                readers = [self._read_bounded(proc.stderr)]
+                if capture_stdout:
+                    readers.append(proc.stdout.read())
+                gathered = asyncio.gather(*readers, proc.wait())
+                # Retrieve the outcome even when the wait is cancelled, so asyncio does not log it
+                gathered.add_done_callback(lambda f: f.cancelled() or f.exception())
+                outputs = await asyncio.wait_for(gathered, timeout)
+            except asyncio.TimeoutError:
+                self._kill(proc)
+                await proc.wait()
+                raise subprocess.TimeoutExpired(cmd, timeout)
+            except asyncio.CancelledError:
+                self._kill(proc)
+                await proc.wait()
+                raise
+            finally:
+                self.processes.discard(proc)
+        stdout = outputs[1] if capture_stdout else b''
+        return subprocess.CompletedProcess(cmd, proc.returncode, stdout, outputs[0])
+    
+    def submit(self, cmd: List[str], timeout: Optional[float] = None,
+               capture_stdout: bool = False) -> concurrent.futures.Future:
+        """Start run_async from any thread; cancelling the future kills the process."""
+        return asyncio.run_coroutine_threadsafe(self.run_async(cmd, timeout, capture_stdout), self.loop)
+    
+    def run(self, cmd: List[str], timeout: Optional[float] = None,
+            capture_stdout: bool = False) -> subprocess.CompletedProcess:
+        """Blocking run, a drop-in for subprocess.run(cmd, capture_output=True, timeout=timeout)."""
+        future = self.submit(cmd, timeout, capture_stdout)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+    
+    async def _acquire(self, count: int):
+        # One reservation at a time, so two callers never deadlock holding part of their slots
+        async with self.reserve_lock:
+            acquired = 0
+            try:
+                while acquired < count:
+                    await self.semaphore.acquire()
+                    acquired += 1
+            except asyncio.CancelledError:
+                for _ in range(acquired):
+                    self.semaphore.release()
+                raise
+    
+    @contextlib.contextmanager
+    def reserve(self, count: int):
+        """Hold count of the runner's slots (at most all of them) for processes started with popen."""
+        count = min(max(1, count), self.limit)
+        future = asyncio.run_coroutine_threadsafe(self._acquire(count), self.loop)
+        try:
+            future.result()
+        except BaseException:
+            future.cancel()
+            raise
+        try:
+            yield
+        finally:
+            for _ in range(count):
+                self.loop.call_soon_threadsafe(self.semaphore.release)
+    
+    @contextlib.contextmanager
+    def popen(self, cmd: List[str], **kwargs) -> Iterator[subprocess.Popen]:
+        """Start a streaming subprocess.Popen in its own process group for code that needs its pipes.
+        
+        The process is killed with the others on interrupt() and, if still running, when the
+        block exits. Its slots are not taken here; hold them with reserve().
+        """
+        if self.interrupted:
+            raise OSError("Interrupted")
+        proc = subprocess.Popen(cmd, **kwargs, **self._group_options())
+        self.processes.add(proc)
+        try:
+            yield proc
+        finally:
+            if proc.poll() is None:
+                self._kill(proc)
+            self.processes.discard(proc)
+            proc.wait()
+            for stream in (proc.stdin, proc.stdout, proc.stderr):
+                if stream:
+                    with contextlib.suppress(OSError):
+                        stream.close()
+    
+    def interrupt(self):
+        """Kill every running process group and refuse new processes until resume()."""
+        self.interrupted = True
+        self.loop.call_soon_threadsafe(lambda: [self._kill(proc) for proc in list(self.processes)])
+    
+    def resume(self):
+        self.interrupted = False
+    
+    def install_interrupt_handler(self):
+        """Make Ctrl+C kill the running FFmpeg process groups, which do not see the terminal's SIGINT."""
+        def handler(signum, frame):
+            self.interrupt()
+            raise KeyboardInterrupt
+        signal.signal(signal.SIGINT, handler)
+    
+    def close(self):
+        if self.loop.is_running():
+            self.interrupt()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
 
 class FFmpegLocator:
-    """Locate FFmpeg executable across different systems and installation types."""
+    """Locate FFmpeg executable across different systems and installation types.
+    
+    The resolved executable is cached on disk and revalidated by size and mtime, so a warm
+    start costs a single stat instead of running the detection strategies again.
+    """
+    
+    verbose = False
+    CACHE_VERSION = 1
+    SEARCH_MAX_DEPTH = 4
+    SEARCH_TIME_BUDGET = 15.0  # seconds for the directory search strategy
+    
+    @staticmethod
+    def _log(message: str):
+        """Print detection details only in verbose mode."""
+        if FFmpegLocator.verbose:
+            print(message)
+    
+    @staticmethod
+    def cache_path() -> Path:
+        """Location of the on-disk locator cache."""
+        if platform.system().lower() == 'windows':
+            base = Path(os.environ.get('LOCALAPPDATA') or Path.home() / 'AppData/Local')
+        else:
+            base = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache')
+        return base / 'deforum_video_grid' / 'ffmpeg.json'
+    
+    @staticmethod
+    def load_cached() -> Optional[Dict]:
+        """Return the cached FFmpeg entry if the executable is unchanged since it was verified."""
+        try:
+            with open(FFmpegLocator.cache_path(), 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if entry.get('version') != FFmpegLocator.CACHE_VERSION:
+                return None
+            stat = os.stat(entry['ffmpeg'])
+            if stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+                return entry
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+        return None
+    
+    @staticmethod
+    def save_cached(ffmpeg_path: str, version_line: str):
+        """Store the verified FFmpeg executable, its version and its ffprobe sibling."""
+        try:
+            stat = os.stat(ffmpeg_path)
+            ffprobe_path = FFmpegLocator.ffprobe_for(ffmpeg_path)
+            entry = {
+                'version': FFmpegLocator.CACHE_VERSION,
+                'ffmpeg': ffmpeg_path,
+                'ffprobe': ffprobe_path if Path(ffprobe_path).is_file() else None,
+                'ffmpeg_version': version_line,
+                'size': stat.st_size,
+                'mtime_ns': stat.st_mtime_ns,
+            }
+            cache_file = FFmpegLocator.cache_path()
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(cache_file, 'w', encoding='utf-8') as f:
+                json.dump(entry, f, indent=2)
+        except OSError as e:
+            FFmpegLocator._log(f"Could not write FFmpeg cache: {e}")
+    
+    @staticmethod
+    def _check(ffmpeg_path) -> Optional[str]:
+        """Run '-version' on a candidate and return its first output line if it works."""
+        try:
+            result = ProcessRunner.shared().run([str(ffmpeg_path), '-version'], timeout=5, capture_stdout=True)
+            if result.returncode != 0:
+                raise subprocess.CalledProcessError(result.returncode, result.args)
+            return (result.stdout.decode(errors='replace').splitlines() or [''])[0]
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired, OSError) as e:
+            FFmpegLocator._log(f"    Failed version check: {type(e).__name__}")
+            return None
+    
+    @staticmethod
+    def find_ffmpeg(use_cache: bool = True) -> Optional[str]:
+        """Find FFmpeg executable, using the cache first and detection strategies on a miss."""
+        if use_cache:
+            cached = FFmpegLocator.load_cached()
+            if cached:
+                FFmpegLocator._log(f"Using cached FFmpeg: {cached['ffmpeg']} ({cached.get('ffmpeg_version')})")
+                return cached['ffmpeg']
+        
+        found = FFmpegLocator.detect_ffmpeg()
+        if found:
+            ffmpeg_path, version_line = found
+            FFmpegLocator.save_cached(ffmpeg_path, version_line)
+            return ffmpeg_path
+        return None
     
     @staticmethod
-    def find_ffmpeg() -> Optional[str]:
+    def detect_ffmpeg() -> Optional[Tuple[str, str]]:
         """Find FFmpeg executable using multiple detection strategies."""
-        print("=== FFmpeg Detection Debug ===")
+        FFmpegLocator._log("=== FFmpeg Detection Debug ===")
         
         # Strategy 1: Check Automatic1111 installations first
-        print("Strategy 1: Checking A1111 installations...")
+        FFmpegLocator._log("Strategy 1: Checking A1111 installations...")
         a1111_ffmpeg = FFmpegLocator._find_a1111_ffmpeg()
         if a1111_ffmpeg:
-            print(f"SUCCESS: Found A1111 FFmpeg at: {a1111_ffmpeg}")
+            FFmpegLocator._log(f"SUCCESS: Found A1111 FFmpeg at: {a1111_ffmpeg[0]}")
             return a1111_ffmpeg
-        print("Strategy 1: No A1111 FFmpeg found")
+        FFmpegLocator._log("Strategy 1: No A1111 FFmpeg found")
         
         # Strategy 2: Check PATH
-        print("Strategy 2: Checking system PATH...")
-        try:
-            result = subprocess.run(['ffmpeg', '-version'], 
-                                  capture_output=True, check=True, timeout=5)
-            print(f"SUCCESS: Found FFmpeg in PATH")
-            return 'ffmpeg'
-        except (subprocess.CalledProcessError, FileNotFoundError, subprocess.TimeoutExpired) as e:
-            print(f"Strategy 2: PATH check failed: {type(e).__name__}")
+        FFmpegLocator._log("Strategy 2: Checking system PATH...")
+        path_ffmpeg = shutil.which('ffmpeg')
+        if path_ffmpeg:
+            version_line = FFmpegLocator._check(path_ffmpeg)
+            if version_line is not None:
+                FFmpegLocator._log(f"SUCCESS: Found FFmpeg in PATH: {path_ffmpeg}")
+                return str(Path(path_ffmpeg).resolve()), version_line
+        FFmpegLocator._log("Strategy 2: FFmpeg not found in PATH")
         
         # Strategy 3: Common installation paths by OS
-        print("Strategy 3: Checking common installation paths...")
+        FFmpegLocator._log("Strategy 3: Checking common installation paths...")
         common_paths = FFmpegLocator._get_common_paths()
         
         for path in common_paths:
-            print(f"  Checking: {path}")
+            FFmpegLocator._log(f"  Checking: {path}")
             ffmpeg_path = Path(path)
             if ffmpeg_path.exists() and ffmpeg_path.is_file():
-                try:
-                    result = subprocess.run([str(ffmpeg_path), '-version'], 
-                                          capture_output=True, check=True, timeout=5)
-                    print(f"SUCCESS: Found working FFmpeg at: {path}")
-                    return str(ffmpeg_path)
-                except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
-                    print(f"  Failed version check: {type(e).__name__}")
-                    continue
+                version_line = FFmpegLocator._check(ffmpeg_path)
+                if version_line is not None:
+                    FFmpegLocator._log(f"SUCCESS: Found working FFmpeg at: {path}")
+                    return str(ffmpeg_path), version_line
             else:
-                print(f"  Not found or not a file")
+                FFmpegLocator._log(f"  Not found or not a file")
         
-        # Strategy 4: Search common directories
-        print("Strategy 4: Searching common directories...")
+        # Strategy 4: Search common directories, bounded by depth and time
+        FFmpegLocator._log("Strategy 4: Searching common directories...")
         search_dirs = FFmpegLocator._get_search_directories()
+        deadline = time.monotonic() + FFmpegLocator.SEARCH_TIME_BUDGET
         
         for search_dir in search_dirs:
-            print(f"  Searching directory: {search_dir}")
+            FFmpegLocator._log(f"  Searching directory: {search_dir}")
             if not Path(search_dir).exists():
-                print(f"    Directory does not exist")
+                FFmpegLocator._log(f"    Directory does not exist")
                 continue
-                
+            
+            base_depth = len(Path(search_dir).parts)
             for root, dirs, files in os.walk(search_dir):
+                if time.monotonic() > deadline:
+                    FFmpegLocator._log("Strategy 4: Search time budget exhausted")
+                    print("FFmpeg search timed out. Specify the path with --ffmpeg-path")
+                    return None
+                
+                # Prune hidden folders and anything below the depth limit
+                if len(Path(root).parts) - base_depth >= FFmpegLocator.SEARCH_MAX_DEPTH:
+                    dirs[:] = []
+                else:
+                    dirs[:] = [d for d in dirs if not d.startswith('.')]
+                
                 for file in files:
                     if FFmpegLocator._is_ffmpeg_executable(file):
                         candidate = Path(root) / file
-                        print(f"    Found candidate: {candidate}")
-                        try:
-                            result = subprocess.run([str(candidate), '-version'], 
-                                                  capture_output=True, check=True, timeout=5)
-                            print(f"SUCCESS: Found working FFmpeg at: {candidate}")
-                            return str(candidate)
-                        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
-                            print(f"    Failed version check: {type(e).__name__}")
-                            continue
-        
-        print("FAILURE: No working FFmpeg found")
+                        FFmpegLocator._log(f"    Found candidate: {candidate}")
+                        version_line = FFmpegLocator._check(candidate)
+                        if version_line is not None:
+                            FFmpegLocator._log(f"SUCCESS: Found working FFmpeg at: {candidate}")
+                            return str(candidate), version_line
+        
+        FFmpegLocator._log("FAILURE: No working FFmpeg found")
         return None
     
     @staticmethod
-    def _find_a1111_ffmpeg() -> Optional[str]:
+    def _find_a1111_ffmpeg() -> Optional[Tuple[str, str]]:
         """Specifically search for Automatic1111 FFmpeg installations."""
         current_path = Path.cwd()
-        print(f"  Current working directory: {current_path}")
+        FFmpegLocator._log(f"  Current working directory: {current_path}")
         
         # Search up the directory tree for stable-diffusion-webui
         for i in range(5):  # Search up to 5 levels
-            print(f"  Level {i}: Checking {current_path}")
-            
-            webui_path = current_path / 'stable-diffusion-webui'
-            print(f"    Looking for webui at: {webui_path}")
-            if webui_path.exists():
-                ffmpeg_path = webui_path / 'ffmpeg.exe'
-                print(f"    Checking FFmpeg at: {ffmpeg_path}")
-                if ffmpeg_path.exists():
-                    try:
-                        result = subprocess.run([str(ffmpeg_path), '-version'], 
-                                             capture_output=True, check=True, timeout=5)
-                        print(f"    SUCCESS: Working FFmpeg found")
-                        return str(ffmpeg_path)
-                    except Exception as e:
-                        print(f"    Failed version check: {type(e).__name__}: {e}")
-                else:
-                    print(f"    FFmpeg not found at expected location")
-            else:
-                print(f"    Webui directory not found")
+            FFmpegLocator._log(f"  Level {i}: Checking {current_path}")
             
+            candidates = [current_path / 'stable-diffusion-webui' / 'ffmpeg.exe']
             # Check if current directory is the webui directory
             if current_path.name == 'stable-diffusion-webui':
-                ffmpeg_path = current_path / 'ffmpeg.exe'
-                print(f"    Current dir is webui, checking: {ffmpeg_path}")
+                candidates.append(current_path / 'ffmpeg.exe')
+            
+            for ffmpeg_path in candidates:
+                FFmpegLocator._log(f"    Checking FFmpeg at: {ffmpeg_path}")
                 if ffmpeg_path.exists():
-                    try:
-                        result = subprocess.run([str(ffmpeg_path), '-version'], 
-                                             capture_output=True, check=True, timeout=5)
-                        print(f"    SUCCESS: Working FFmpeg found in webui root")
-                        return str(ffmpeg_path)
-                    except Exception as e:
-                        print(f"    Failed version check: {type(e).__name__}: {e}")
-                else:
-                    print(f"    FFmpeg not found in webui root")
+                    version_line = FFmpegLocator._check(ffmpeg_path)
+                    if version_line is not None:
+                        FFmpegLocator._log(f"    SUCCESS: Working FFmpeg found")
+                        return str(ffmpeg_path), version_line
             
             current_path = current_path.parent
             if current_path == current_path.parent:  # Reached root
-                print(f"    Reached filesystem root")
+                FFmpegLocator._log(f"    Reached filesystem root")
                 break
         
         # Check common A1111 installation paths
-        print("  Checking common A1111 installation paths...")
+        FFmpegLocator._log("  Checking common A1111 installation paths...")
         a1111_common_paths = [
             # Direct FFmpeg executables
             'D:/AI Apps/stable-diffusion-webui/ffmpeg.exe',
@@ -161,21 +503,17 @@ class FFmpegLocator:
         ]
         
         for path in a1111_common_paths:
-            print(f"    Checking: {path}")
+            FFmpegLocator._log(f"    Checking: {path}")
             ffmpeg_path = Path(path)
             if ffmpeg_path.exists():
-                try:
-                    result = subprocess.run([str(ffmpeg_path), '-version'], 
-                                         capture_output=True, check=True, timeout=5)
-                    print(f"    SUCCESS: Working FFmpeg found")
-                    return str(ffmpeg_path)
-                except Exception as e:
-                    print(f"    Failed version check: {type(e).__name__}: {e}")
-                    continue
+                version_line = FFmpegLocator._check(ffmpeg_path)
+                if version_line is not None:
+                    FFmpegLocator._log(f"    SUCCESS: Working FFmpeg found")
+                    return str(ffmpeg_path), version_line
             else:
-                print(f"    File does not exist")
+                FFmpegLocator._log(f"    File does not exist")
         
-        print("  No A1111 FFmpeg installations found")
+        FFmpegLocator._log("  No A1111 FFmpeg installations found")
         return None
     
     @staticmethod
@@ -239,16 +577,642 @@ class FFmpegLocator:
             return filename.lower() in ['ffmpeg.exe']
         else:
             return filename in ['ffmpeg']
+    
+    @staticmethod
+    def ffprobe_for(ffmpeg_path: str) -> str:
+        """Return the ffprobe executable that sits next to the given FFmpeg executable."""
+        path = Path(ffmpeg_path)
+        return str(path.with_name(path.name.replace('ffmpeg', 'ffprobe')))
+            
+class FileIndex(ABC):
+    """Persistent on-disk index of per-file data keyed by path, size and mtime.
+    
+    Subclasses implement compute to build the entry of one file.
+    """
+    
+    INDEX_FILENAME = '.deforum_index.json'
+    VERSION = 1
+    
+    def __init__(self, index_path: Optional[Path]):
+        self.index_path = index_path
+        self.entries = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        self._load()
+    
+    def _load(self):
+        """Load the index from disk, ignoring missing or unreadable files."""
+        if not self.index_path or not self.index_path.exists():
+            return
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                self.entries = data.get('entries', {})
+        except (OSError, ValueError):
+            self.entries = {}
+    
+    def save(self):
+        """Write the index back to disk if anything changed."""
+        if not self.index_path or not self.dirty:
+            return
+        tmp_path = self.index_path.with_name(self.index_path.name + '.tmp')
+        try:
+            with self._lock:
+                data = {'version': self.VERSION, 'entries': self.entries}
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.index_path)
+                self.dirty = False
+        except OSError as e:
+            print(f"Warning: Could not save index {self.index_path}: {e}")
+    
+    @staticmethod
+    def _key(file_path: Path) -> str:
+        return str(Path(file_path).resolve())
+    
+    def lookup(self, file_path: Path) -> Optional[Dict]:
+        """Return the cached entry if the file has not changed since it was indexed."""
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        entry = self.entries.get(self._key(file_path))
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime_ns') == stat.st_mtime_ns:
+            return entry
+        return None
+    
+    def get(self, file_path: Path) -> Optional[Dict]:
+        """Return the entry for a file, computing it only when the index is stale."""
+        entry = self.lookup(file_path)
+        if entry is not None:
+            return entry
+        
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        
+        info = self.compute(file_path)
+        if info is None:
+            return None
+        
+        info['size'] = stat.st_size
+        info['mtime_ns'] = stat.st_mtime_ns
+        with self._lock:
+            self.entries[self._key(file_path)] = info
+            self.dirty = True
+        return info
+    
+    @abstractmethod
+    def compute(self, file_path: Path) -> Optional[Dict]:
+        """Build the index entry for a file."""
+
+
+class MediaIndex(FileIndex):
+    """Index of video metadata (duration, resolution, fps, codec, frame count)."""
+    
+    INDEX_FILENAME = '.deforum_media_index.json'
+    
+    def __init__(self, index_path: Optional[Path], ffmpeg_path: str):
+        self.ffmpeg_path = ffmpeg_path
+        self.ffprobe_path = FFmpegLocator.ffprobe_for(ffmpeg_path)
+        super().__init__(index_path)
+    
+    def compute(self, file_path: Path) -> Optional[Dict]:
+        return self.probe(file_path)
+    
+    def probe_many(self, video_paths: List[Path], jobs: int):
+        """Fill the index for all stale videos using concurrent probe workers."""
+        stale = [path for path in dict.fromkeys(video_paths) if path and self.lookup(path) is None]
+        if not stale:
+            return
+        
+        print(f"Probing {len(stale)} videos with {min(jobs, len(stale))} worker(s)")
+        with ThreadPoolExecutor(max_workers=max(1, min(jobs, len(stale)))) as executor:
+            list(executor.map(self.get, stale))
+        self.save()
+    
+    def probe(self, video_path: Path) -> Optional[Dict]:
+        """Read duration, resolution, fps, codec and frame count from the container header."""
+        try:
+            cmd = [
+                self.ffprobe_path,
+                '-v', 'quiet',
+                '-print_format', 'json',
+                '-show_format',
+                '-show_streams',
+                '-select_streams', 'v:0',
+                str(video_path)
+            ]
             
+            result = ProcessRunner.shared().run(cmd, timeout=10, capture_stdout=True)
+            if result.returncode == 0:
+                return self._parse_ffprobe(json.loads(result.stdout))
+        except Exception:
+            pass
+        
+        # Fallback to ffmpeg: with no output file it prints the header and exits without decoding
+        try:
+            cmd = [self.ffmpeg_path, '-hide_banner', '-i', str(video_path)]
+            result = ProcessRunner.shared().run(cmd, timeout=10)
+            return self._parse_ffmpeg_header(result.stderr.decode(errors='replace'))
+        except Exception as e:
+            print(f"Warning: Could not probe {video_path}: {e}")
+        
+        return None
+    
+    @staticmethod
+    def _parse_rate(rate: str) -> Optional[float]:
+        try:
+            num, _, den = rate.partition('/')
+            value = float(num) / float(den or 1)
+            return value if value > 0 else None
+        except (ValueError, ZeroDivisionError):
+            return None
+    
+    @staticmethod
+    def _parse_ffprobe(data: Dict) -> Optional[Dict]:
+        fmt = data.get('format', {})
+        streams = data.get('streams') or [{}]
+        stream = streams[0]
+        
+        duration = fmt.get('duration') or stream.get('duration')
+        if duration is None:
+            return None
+        
+        nb_frames = stream.get('nb_frames')
+        return {
+            'duration': float(duration),
+            'width': stream.get('width'),
+            'height': stream.get('height'),
+            'fps': MediaIndex._parse_rate(stream.get('avg_frame_rate') or stream.get('r_frame_rate') or ''),
+            'codec': stream.get('codec_name'),
+            'frames': int(nb_frames) if nb_frames and str(nb_frames).isdigit() else None,
+        }
+    
+    @staticmethod
+    def _parse_ffmpeg_header(stderr: str) -> Optional[Dict]:
+        duration_match = re.search(r'Duration: (\d{2}):(\d{2}):(\d{2}\.?\d*)', stderr)
+        if not duration_match:
+            return None
+        hours, minutes, seconds = duration_match.groups()
+        info = {
+            'duration': int(hours) * 3600 + int(minutes) * 60 + float(seconds),
+            'width': None,
+            'height': None,
+            'fps': None,
+            'codec': None,
+            'frames': None,
+        }
+        
+        stream_match = re.search(r'Video: (\w+).*?, (\d{2,5})x(\d{2,5})', stderr)
+        if stream_match:
+            info['codec'] = stream_match.group(1)
+            info['width'] = int(stream_match.group(2))
+            info['height'] = int(stream_match.group(3))
+        
+        fps_match = re.search(r'([\d.]+) fps', stderr)
+        if fps_match:
+            info['fps'] = float(fps_match.group(1))
+            info['frames'] = int(round(info['duration'] * info['fps']))
+        return info
+    
+class SettingsIndex(FileIndex):
+    """Index of parsed Deforum settings files, flattened to dotted keys."""
+    
+    INDEX_FILENAME = '.deforum_settings_index.json'
+    
+    def compute(self, file_path: Path) -> Optional[Dict]:
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not parse settings file {file_path}: {e}")
+            return None
+        if not isinstance(data, dict):
+            return None
+        return {'settings': self.flatten(data)}
+    
+    @staticmethod
+    def flatten(data: Dict, prefix: str = '') -> Dict:
+        """Flatten nested dicts to dotted keys; lists are kept as JSON strings."""
+        flat = {}
+        for key, value in data.items():
+            name = f"{prefix}.{key}" if prefix else key
+            if isinstance(value, dict):
+                flat.update(SettingsIndex.flatten(value, name))
+            elif isinstance(value, list):
+                flat[name] = json.dumps(value)
+            else:
+                flat[name] = value
+        return flat
+
+
+class CellCache:
+    """Content-addressed cache of resized grid cells with size-capped LRU eviction.
+    
+    Files are named <source>_<settings>_<size>.mp4, where <source> hashes the source path,
+    size and mtime and <settings> hashes fps, duration and encoder arguments. Keeping the
+    thumbnail size separate lets a smaller cell be derived from a cached larger one.
+    Unlabeled grid bodies (body_<key>.mp4) and label layers (labels_<key>.png) live here too.
+    Files being written carry a .tmp. infix until they are moved into place.
+    """
+    
+    CACHE_DIRNAME = '.deforum_grid_cache'
+    
+    # Temporary files older than this are left over from an interrupted run
+    STALE_TMP_SECONDS = 6 * 3600
+    
+    def __init__(self, cache_dir: Path, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        # Files looked up or stored since the last evict(); the grid being built needs them
+        self.used = set()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+    
+    @staticmethod
+    def _digest(*parts) -> str:
+        return hashlib.sha1('|'.join(str(part) for part in parts).encode('utf-8')).hexdigest()[:16]
+    
+    def source_key(self, video_path: Path) -> Optional[str]:
+        try:
+            stat = os.stat(video_path)
+        except OSError:
+            return None
+        return self._digest(Path(video_path).resolve(), stat.st_size, stat.st_mtime_ns)
+    
+    def settings_key(self, fps: int, duration: float, encoder_args: List[str], window: str = '') -> str:
+        parts = [fps, f"{duration:.3f}", ' '.join(encoder_args)]
+        if window:
+            parts.append(window)
+        return self._digest(*parts)
+    
+    def cell_path(self, source_key: str, settings_key: str, thumbnail_size: int) -> Path:
+        return self.cache_dir / f"{source_key}_{settings_key}_{thumbnail_size}.mp4"
+    
+    def lookup(self, path: Path) -> bool:
+        """Check for a cached file and mark it as recently used."""
+        if not path.exists():
+            return False
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+        self.used.add(str(path))
+        return True
+    
+    def store(self, tmp_path: Path, path: Path):
+        """Move a finished temporary file into place."""
+        os.replace(tmp_path, path)
+        self.used.add(str(path))
+    
+    def find_larger(self, source_key: str, settings_key: str, thumbnail_size: int) -> Optional[Path]:
+        """Find the smallest cached cell of the same source that is larger than thumbnail_size."""
+        best = None
+        best_size = None
+        for candidate in self.cache_dir.glob(f"{source_key}_{settings_key}_*.mp4"):
+            size_str = candidate.stem.rsplit('_', 1)[-1]
+            if not size_str.isdigit():
+                continue
+            size = int(size_str)
+            if size > thumbnail_size and (best_size is None or size < best_size):
+                best, best_size = candidate, size
+        return best
+    
+    def evict(self, keep: Optional[set] = None):
+        """Delete least recently used files until the cache fits within max_bytes.
+        
+        Files in keep and files used since the last eviction (the cells, body and labels of
+        the grid just built) are never deleted. Temporary files of encodes still running are
+        neither counted nor deleted; stale ones from interrupted runs are removed.
+        """
+        keep = set(keep or ()) | self.used
+        self.used = set()
+        entries = []
+        total = 0
+        now = time.time()
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                if not entry.is_file() or not entry.name.endswith(('.mp4', '.png')):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                if '.tmp.' in entry.name:
+                    if now - stat.st_mtime > self.STALE_TMP_SECONDS:
+                        with contextlib.suppress(OSError):
+                            os.remove(entry.path)
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        
+        if total <= self.max_bytes:
+            return
+        
+        removed = 0
+        freed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path in keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+                freed += size
+                removed += 1
+            except OSError:
+                continue
+        print(f"Evicted {removed} cached files ({freed / (1024 * 1024):.1f}MB)")
+    
+class NullProfiler:
+    """Stand-in used when profiling is off; every hook returns immediately."""
+    
+    enabled = False
+    
+    def span(self, name: str, stage: bool = False, **args):
+        return NULL_SPAN
+    
+    def carry(self, fn):
+        return fn
+    
+    def write(self, trace_path: Path):
+        pass
+
+NULL_SPAN = contextlib.nullcontext()
+
+class StageProfiler:
+    """Wall and CPU time of pipeline stages, tasks and FFmpeg child processes.
+    
+    Events use the Chrome trace event format, so the trace loads in chrome://tracing or
+    Perfetto. FFmpeg runs add the child's CPU time and peak RSS (from -benchmark) and its
+    encoding speed to their event.
+    
+    The current stage is per thread, so concurrent pages and batches each tag their own FFmpeg
+    runs. Work handed to a pool thread takes its submitter's stage along through carry().
+    """
+    
+    enabled = True
+    
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.events = []
+        self.lock = threading.Lock()
+        self.thread_ids = {}
+        self.local = threading.local()
+    
+    @property
+    def stage(self) -> Optional[str]:
+        return getattr(self.local, 'stage', None)
+    
+    @stage.setter
+    def stage(self, name: Optional[str]):
+        self.local.stage = name
+    
+    def carry(self, fn):
+        """Wrap fn to run under the calling thread's stage, for work submitted to a thread pool."""
+        stage = self.stage
+        
+        def run(*args, **kwargs):
+            previous = self.stage
+            self.stage = stage
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.stage = previous
+        return run
+    
+    def _tid(self) -> int:
+        ident = threading.get_ident()
+        with self.lock:
+            return self.thread_ids.setdefault(ident, len(self.thread_ids) + 1)
+    
+    def _add(self, name: str, category: str, start: float, end: float, args: Dict):
+        event = {
+            'name': name, 'cat': category, 'ph': 'X', 'pid': os.getpid(), 'tid': self._tid(),
+            'ts': round((start - self.origin) * 1e6), 'dur': round((end - start) * 1e6), 'args': args,
+        }
+        with self.lock:
+            self.events.append(event)
+    
+    @contextlib.contextmanager
+    def span(self, name: str, stage: bool = False, **args):
+        """Time a block. Stage spans also tag the FFmpeg runs inside them with the stage name."""
+        previous = self.stage
+        if stage:
+            self.stage = name
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            args['cpu_s'] = round(time.thread_time() - cpu_start, 4)
+            if not stage and self.stage:
+                args['stage'] = self.stage
+            self._add(name, 'stage' if stage else 'task', start, time.perf_counter(), args)
+            if stage:
+                self.stage = previous
+    
+    def record_ffmpeg(self, name: str, start: float, end: float, stderr: str, args: Dict):
+        """Record one FFmpeg run with the statistics parsed from its stderr."""
+        times = BENCH_TIMES_RE.search(stderr)
+        if times:
+            args['child_cpu_s'] = round(float(times.group(1)) + float(times.group(2)), 4)
+        maxrss = BENCH_MAXRSS_RE.search(stderr)
+        if maxrss:
+            args['child_maxrss_mb'] = round(int(maxrss.group(1)) / 1024, 1)
+        speeds = SPEED_RE.findall(stderr)
+        if speeds:
+            args['speed'] = float(speeds[-1])
+        if self.stage:
+            args['stage'] = self.stage
+        self._add(name, 'ffmpeg', start, end, args)
+    
+    def write(self, trace_path: Path):
+        with open(trace_path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f)
+    
+    def summary(self) -> str:
+        """One screen: per stage wall/CPU time and FFmpeg totals, then the slowest FFmpeg runs."""
+        lines = [f"{'Stage':<14}{'Wall':>9}{'CPU':>9}{'FFmpeg runs':>13}{'FFmpeg CPU':>12}{'Peak RSS':>10}{'Speed':>8}"]
+        ffmpeg_events = [e for e in self.events if e['cat'] == 'ffmpeg']
+        
+        # Stages that run more than once (pages, watch refreshes) are added up
+        stages = {}
+        for event in sorted((e for e in self.events if e['cat'] == 'stage'), key=lambda e: e['ts']):
+            wall, cpu = stages.get(event['name'], (0.0, 0.0))
+            stages[event['name']] = (wall + event['dur'] / 1e6, cpu + event['args']['cpu_s'])
+        
+        for name, (wall, cpu) in stages.items():
+            runs = [e['args'] for e in ffmpeg_events if e['args'].get('stage') == name]
+            child_cpu = [run['child_cpu_s'] for run in runs if 'child_cpu_s' in run]
+            rss = max((run.get('child_maxrss_mb', 0) for run in runs), default=0)
+            speeds = sorted(run['speed'] for run in runs if 'speed' in run)
+            lines.append(
+                f"{name:<14}{wall:>8.2f}s{cpu:>8.2f}s{len(runs):>13}"
+                + (f"{sum(child_cpu):>11.2f}s" if child_cpu else f"{'-':>12}")
+                + (f"{rss:>8.0f}MB" if rss else f"{'-':>10}")
+                + (f"{speeds[len(speeds) // 2]:>7.1f}x" if speeds else f"{'-':>8}")
+            )
+        
+        slowest = sorted(ffmpeg_events, key=lambda e: e['dur'], reverse=True)[:5]
+        if slowest:
+            lines.append("Slowest FFmpeg runs:")
+            for event in slowest:
+                target = event['args'].get('target', '')
+                lines.append(f"  {event['dur'] / 1e6:>7.2f}s  {event['name']:<12} {target}")
+        return '\n'.join(lines)
+
+class WorkerBudget:
+    """Caps the number of FFmpeg processes running at once across all batches.
+    
+    When a slot frees up it goes to the waiting job with the lowest priority value, so with
+    the estimated batch cost as priority the shortest batches finish first.
+    """
+    
+    def __init__(self, slots: int):
+        self.slots = max(1, slots)
+        self.active = 0
+        self.waiting = []
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+    
+    @contextlib.contextmanager
+    def slot(self, priority: float = 0, count: int = 1):
+        """Hold count slots (at most all of them) while the block runs."""
+        count = min(max(1, count), self.slots)
+        with self.condition:
+            entry = (priority, next(self.counter))
+            heapq.heappush(self.waiting, entry)
+            while self.active + count > self.slots or self.waiting[0] != entry:
+                self.condition.wait()
+            heapq.heappop(self.waiting)
+            self.active += count
+            # The next waiter may also fit
+            self.condition.notify_all()
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.active -= count
+                self.condition.notify_all()
+
+class ParameterTable:
+    """Columnar index of the sweep parameters of every run in a batch.
+    
+    Row ids are positions in the video_files list. Each parameter is one column, a list
+    indexed by row id (None where a run does not set it), plus posting lists mapping each
+    value to the ascending row ids that have it. Selecting the runs with a value, filtering
+    and splitting into facets then cost O(matches) instead of a scan over every run.
+    """
+    
+    def __init__(self, video_files: List[Tuple[Optional[Path], Dict]]):
+        self.row_count = len(video_files)
+        self.columns = {}
+        self.postings = {}
+        for row, (_, params) in enumerate(video_files):
+            for name, value in params['parameters'].items():
+                column = self.columns.get(name)
+                if column is None:
+                    column = self.columns[name] = [None] * self.row_count
+                    self.postings[name] = {}
+                column[row] = value
+                self.postings[name].setdefault(value, []).append(row)
+    
+    def frequency(self, name: str) -> int:
+        """Number of runs that set a parameter."""
+        return sum(len(rows) for rows in self.postings[name].values())
+    
+    def resolve(self, name: str) -> List[str]:
+        """Parameter names matching a user-given name: the exact name, else every name containing it."""
+        if name in self.columns:
+            return [name]
+        return [column for column in self.columns if name in column]
+    
+    def match_values(self, name: str, raw_values: List[str], convert) -> set:
+        """Stored values of a parameter equal to any of the raw strings, as text or after convert()."""
+        wanted = {convert(raw) for raw in raw_values}
+        return {value for value in self.postings[name] if value in wanted or str(value) in raw_values}
+    
+    def select(self, conditions: List[Tuple[str, set]]) -> List[int]:
+        """Row ids whose value of every condition's parameter is in its value set.
+        
+        Starts from the posting lists of the most selective condition and checks the others
+        by column lookup, so the cost follows the smallest match set.
+        """
+        if not conditions:
+            return list(range(self.row_count))
+        conditions = sorted(conditions, key=lambda c: sum(len(self.postings[c[0]][v]) for v in c[1]))
+        name, values = conditions[0]
+        rows = sorted(row for value in values for row in self.postings[name][value])
+        for name, values in conditions[1:]:
+            column = self.columns[name]
+            rows = [row for row in rows if column[row] in values]
+        return rows
+    
+    def facet(self, name: str) -> Dict:
+        """Row ids per value of a parameter (the posting lists themselves)."""
+        return self.postings.get(name, {})
+
 class DeforumVideoGrid:
     def __init__(self, batch_dir: str, thumbnail_size: int = 150, fps: int = 24, 
-                 ffmpeg_path: Optional[str] = None, padding: int = 5):
+                 ffmpeg_path: Optional[str] = None, padding: int = 5,
+                 jobs: Optional[int] = None, engine: str = 'two-stage',
+                 compositor: str = 'overlay', use_index: bool = True,
+                 use_cache: bool = True, cache_size_mb: int = 2048,
+                 rescan_ffmpeg: bool = False, scan_depth: int = 0,
+                 include_patterns: Optional[List[str]] = None,
+                 exclude_patterns: Optional[List[str]] = None, use_settings: bool = True,
+                 z_mode: str = 'pages', max_decoders: int = 64, profile: str = 'standard',
+                 preview: Optional[str] = None, preview_frames: int = 0, preview_fps: int = 4,
+                 preview_format: Optional[str] = None, profiler=None,
+                 worker_budget: Optional[WorkerBudget] = None, priority: float = 0,
+                 start: Optional[Tuple[float, bool]] = None, end: Optional[Tuple[float, bool]] = None,
+                 frame_step: int = 1, ladder: Optional[List[Dict]] = None, cell_farm=None,
+                 x_axis: Optional[str] = None, y_axis: Optional[str] = None, z_axis: Optional[str] = None,
+                 where: Optional[List[Tuple[str, str]]] = None):
         self.batch_dir = Path(batch_dir)
         self.thumbnail_size = thumbnail_size
         self.fps = fps
         self.padding = padding
+        self.jobs = max(1, jobs or os.cpu_count() or 1)
+        self.engine = engine
+        self.compositor = compositor
+        self.scan_depth = scan_depth
+        self.z_mode = z_mode
+        self.max_decoders = max_decoders
+        # Input videos open at once across every FFmpeg process of this grid
+        self.decoder_budget = WorkerBudget(max_decoders) if max_decoders else None
+        self.profile = profile
+        self.preview = preview
+        self.preview_frames = preview_frames
+        self.preview_fps = preview_fps
+        self.preview_format = preview_format or ('webp' if preview == 'animated' else 'png')
+        self.profiler = profiler or NullProfiler()
+        self.worker_budget = worker_budget
+        self.priority = priority
+        # Time window as (value, is_frame_number) points, applied at input with fast seeking
+        self.start = start
+        self.end = end
+        self.frame_step = max(1, frame_step)
+        self.ladder = ladder or []
+        # grid_farm.CellFarm that hands cell resizes to remote workers (--farm)
+        self.cell_farm = cell_farm
+        # Requested axes and --where filters; axis_choice holds the axes resolved against the
+        # batch's parameter names for the current run
+        self.axis_names = {'x': x_axis, 'y': y_axis, 'z': z_axis}
+        self.where = where or []
+        self.axis_choice = {}
+        self.include_patterns = include_patterns or []
+        self.exclude_patterns = exclude_patterns or []
         self.temp_dir = None
-        self.ffmpeg_path = ffmpeg_path or self._locate_ffmpeg()
+        # Watch mode: show runs that have settings but no finished video as placeholder cells,
+        # and treat videos that are still being written as not finished
+        self.include_pending = False
+        self.ignored_videos = set()
+        self.ffmpeg_path = ffmpeg_path or self._locate_ffmpeg(use_cache=not rescan_ffmpeg)
         
         # Text styling parameters (updated for FFmpeg 15)
         self.font_size = max(12, self.thumbnail_size // 12)
@@ -260,46 +1224,213 @@ class DeforumVideoGrid:
         
         if not self.ffmpeg_path:
             raise RuntimeError("FFmpeg not found. Please install FFmpeg or specify path with --ffmpeg-path")
+        
+        index_path = self.batch_dir / MediaIndex.INDEX_FILENAME if use_index else None
+        self.media_index = MediaIndex(index_path, self.ffmpeg_path)
+        
+        self.settings_index = None
+        if use_settings:
+            settings_index_path = self.batch_dir / SettingsIndex.INDEX_FILENAME if use_index else None
+            self.settings_index = SettingsIndex(settings_index_path)
+        
+        self.cell_cache = None
+        if use_cache:
+            try:
+                self.cell_cache = CellCache(self.batch_dir / CellCache.CACHE_DIRNAME, cache_size_mb * 1024 * 1024)
+            except OSError as e:
+                print(f"Warning: Cell cache disabled: {e}")
     
-    def _locate_ffmpeg(self) -> Optional[str]:
+    def _locate_ffmpeg(self, use_cache: bool = True) -> Optional[str]:
         """Locate FFmpeg executable."""
-        return FFmpegLocator.find_ffmpeg()
+        with self.profiler.span('locate_ffmpeg', stage=True):
+            return FFmpegLocator.find_ffmpeg(use_cache=use_cache)
+    
+    def run_ffmpeg(self, cmd: List[str], timeout: float, name: str, target: Optional[Path] = None):
+        """Run an FFmpeg command with captured output, recording it when profiling."""
+        if self.worker_budget:
+            with self.worker_budget.slot(self.priority):
+                return self._run_ffmpeg(cmd, timeout, name, target)
+        return self._run_ffmpeg(cmd, timeout, name, target)
+    
+    def _run_ffmpeg(self, cmd: List[str], timeout: float, name: str, target: Optional[Path] = None):
+        if self.decoder_budget:
+            with self.decoder_budget.slot(count=cmd.count('-i')):
+                return self._run_ffmpeg_now(cmd, timeout, name, target)
+        return self._run_ffmpeg_now(cmd, timeout, name, target)
+    
+    def _run_ffmpeg_now(self, cmd: List[str], timeout: float, name: str, target: Optional[Path] = None):
+        runner = ProcessRunner.shared()
+        if not self.profiler.enabled:
+            return runner.run(cmd, timeout)
+        
+        cmd = [cmd[0], '-benchmark'] + cmd[1:]
+        start = time.perf_counter()
+        try:
+            result = runner.run(cmd, timeout)
+        except subprocess.TimeoutExpired:
+            self.profiler.record_ffmpeg(name, start, time.perf_counter(), '',
+                                        {'target': str(target or ''), 'timed_out': True})
+            raise
+        self.profiler.record_ffmpeg(name, start, time.perf_counter(), result.stderr.decode(errors='replace'),
+                                    {'target': str(target or ''), 'returncode': result.returncode})
+        return result
         
     def find_video_files(self) -> List[Tuple[Path, Dict]]:
         """Find all video files in batch subdirectories and extract parameter info."""
-        video_files = []
+        video_files = list(self.iter_video_files())
+        self.resolve_settings_parameters(video_files)
+        return video_files
+    
+    def iter_video_files(self) -> Iterator[Tuple[Path, Dict]]:
+        """Stream (video, params) records from batch subdirectories as they are found.
         
-        for subfolder in self.batch_dir.iterdir():
-            if not subfolder.is_dir():
-                continue
-                
-            # Look for video files in subfolder
-            videos = list(subfolder.glob("*.mp4"))
-            if not videos:
-                continue
-                
-            # Prioritize renamed videos (folder.mp4) over timestamp videos
-            renamed_video = None
-            timestamp_video = None
-            
-            for video in videos:
-                if video.stem == subfolder.name:
-                    # This is a renamed video matching folder name
-                    renamed_video = video
-                    break
-                elif re.match(r'^\d{14}$', video.stem):
-                    # This is a timestamp-only video (YYYYMMDDHHMMSS pattern)
-                    timestamp_video = video
-            
-            # Use renamed video if available, otherwise use timestamp video
-            video_path = renamed_video or timestamp_video or videos[0]
+        Records from folders with a Deforum settings file carry the parsed settings; their
+        'parameters' are filled in by resolve_settings_parameters once all runs are known.
+        """
+        for folder, video_path, settings_path in self._scan_folders(str(self.batch_dir), 0):
+            if video_path in self.ignored_videos:
+                if not (self.include_pending and settings_path):
+                    continue
+                video_path = None
+            folder_name = os.path.basename(folder)
+            settings = None
+            if settings_path and self.settings_index:
+                entry = self.settings_index.get(Path(settings_path))
+                settings = entry['settings'] if entry else None
             
-            # Extract parameter information from folder name (not video name)
-            params = self.extract_parameters_from_folder(subfolder.name)
+            if settings is not None:
+                params = {'parameters': {}, 'folder_name': folder_name}
+            else:
+                # Extract parameter information from folder name (not video name)
+                params = self.extract_parameters_from_folder(folder_name)
+            params['settings'] = settings
             
-            video_files.append((video_path, params))
+            # Parameters from enclosing z_<param>_<value> group folders
+            params['group_parameters'] = {}
+            for part in Path(os.path.relpath(folder, self.batch_dir)).parts[:-1]:
+                group_match = Z_GROUP_RE.match(part)
+                if group_match:
+                    group_value = self.convert_parameter_value(group_match.group(2))
+                    params['group_parameters'][group_match.group(1)] = group_value
+            params['parameters'].update(params['group_parameters'])
+            yield (Path(video_path) if video_path else None), params
+    
+    def resolve_settings_parameters(self, video_files: List[Tuple[Path, Dict]]):
+        """Set parameters of settings-backed runs to the settings keys that vary across runs."""
+        if self.settings_index:
+            self.settings_index.save()
+        
+        with_settings = [params for _, params in video_files if params.get('settings') is not None]
+        if not with_settings:
+            return
+        
+        keys = set()
+        for params in with_settings:
+            keys.update(params['settings'])
+        
+        varying = []
+        for key in sorted(keys - SETTINGS_IGNORED_KEYS):
+            values = [json.dumps(params['settings'].get(key), sort_keys=True) for params in with_settings]
+            if len(set(values)) > 1:
+                varying.append((key, len(set(values))))
+        
+        # A value that differs on every run (such as a random seed) is not a sweep axis
+        # as long as another key repeats its values across runs
+        run_count = len(with_settings)
+        repeating = [key for key, count in varying if count < run_count]
+        if repeating and run_count > 2:
+            varying = [(key, count) for key, count in varying if count < run_count]
+        
+        for params in with_settings:
+            params['parameters'] = {
+                key: self.convert_setting_value(params['settings'].get(key))
+                for key, _ in varying
+            }
+            # Settings keys are dotted paths, group names use the short key
+            for name, value in params.get('group_parameters', {}).items():
+                if not any(key.split('.')[-1] == name for key, _ in varying):
+                    params['parameters'][name] = value
+        
+        print(f"Varying settings across {run_count} runs: {', '.join(key for key, _ in varying) or 'none'}")
+    
+    def convert_setting_value(self, value):
+        """Convert a settings value to a grid label value, unwrapping single-keyframe schedules."""
+        if isinstance(value, str):
+            schedule_match = SINGLE_KEYFRAME_RE.match(value)
+            if schedule_match:
+                return self.convert_parameter_value(schedule_match.group(1).strip())
+            return value
+        return value
+    
+    def _folder_selected(self, name: str) -> bool:
+        """Apply include/exclude folder name patterns."""
+        if self.include_patterns and not any(fnmatch.fnmatch(name, p) for p in self.include_patterns):
+            return False
+        return not any(fnmatch.fnmatch(name, p) for p in self.exclude_patterns)
+    
+    def _scan_folders(self, directory: str, depth: int) -> Iterator[Tuple[str, Optional[str], Optional[str]]]:
+        """Yield (folder, video, settings) using os.scandir, recursing into folders without videos."""
+        try:
+            with os.scandir(directory) as it:
+                subfolders = [entry for entry in it
+                              if entry.is_dir() and not entry.name.startswith('.')]
+        except OSError as e:
+            print(f"Warning: Could not scan {directory}: {e}")
+            return
+        
+        for entry in sorted(subfolders, key=lambda e: e.name):
+            # Skip hidden folders such as the cell cache and anything filtered out
+            if not self._folder_selected(entry.name):
+                continue
             
-        return video_files
+            video_path, settings_path = self._pick_folder_files(entry.path, entry.name,
+                                                                self.settings_index is not None)
+            if video_path:
+                yield entry.path, video_path, settings_path
+            elif settings_path and self.include_pending:
+                # The run has started but its video is not written yet
+                yield entry.path, None, settings_path
+            elif depth < self.scan_depth or Z_GROUP_RE.match(entry.name):
+                # Z group folders (z_<param>_<value>) are always searched
+                yield from self._scan_folders(entry.path, depth + 1)
+    
+    @staticmethod
+    def _pick_folder_files(folder: str, folder_name: str,
+                           want_settings: bool) -> Tuple[Optional[str], Optional[str]]:
+        """Pick the preferred video and the settings file in a folder.
+        
+        Reading stops as soon as the renamed video (and the settings file, if wanted) is seen.
+        """
+        renamed_name = f"{folder_name}.mp4"
+        renamed_video = None
+        timestamp_video = None
+        first_video = None
+        settings_file = None
+        
+        try:
+            with os.scandir(folder) as it:
+                for entry in it:
+                    name = entry.name
+                    if want_settings and settings_file is None and SETTINGS_FILE_RE.match(name):
+                        settings_file = entry.path
+                    elif not name.endswith('.mp4'):
+                        continue
+                    elif name == renamed_name:
+                        # This is a renamed video matching folder name
+                        renamed_video = entry.path
+                    elif timestamp_video is None and TIMESTAMP_VIDEO_RE.match(name):
+                        # This is a timestamp-only video (YYYYMMDDHHMMSS pattern)
+                        timestamp_video = entry.path
+                    elif first_video is None:
+                        first_video = entry.path
+                    
+                    if renamed_video and (settings_file or not want_settings):
+                        break
+        except OSError:
+            return None, None
+        
+        # Use renamed video if available, otherwise use timestamp video
+        return renamed_video or timestamp_video or first_video, settings_file
     
     def extract_parameters_from_folder(self, folder_name: str) -> Dict:
         """Extract all parameter-value pairs from folder name using multiple strategies."""
@@ -389,28 +1520,23 @@ class DeforumVideoGrid:
         # Return as string if no conversion possible
         return value
     
-    def discover_parameter_space(self, video_files: List[Tuple[Path, Dict]]) -> Dict:
-        """Analyze all folders to discover the complete parameter space."""
-        all_parameters = {}
-        parameter_frequencies = {}
-        
-        # Collect all parameters and their frequencies
-        for _, params in video_files:
-            for param_name, param_value in params['parameters'].items():
-                if param_name not in all_parameters:
-                    all_parameters[param_name] = set()
-                    parameter_frequencies[param_name] = 0
-                
-                all_parameters[param_name].add(param_value)
-                parameter_frequencies[param_name] += 1
+    def discover_parameter_space(self, video_files: List[Tuple[Path, Dict]],
+                                 table: Optional[ParameterTable] = None) -> Dict:
+        """Analyze all folders to discover the complete parameter space.
+        
+        valid_parameters (parameters with several values) is ordered best X/Y candidate first:
+        by how many runs set the parameter, then by its number of values.
+        """
+        if table is None:
+            table = ParameterTable(video_files)
+        all_parameters = {name: set(values) for name, values in table.postings.items()}
         
-        # Find the two most common parameters with multiple values
         valid_params = {}
         for param_name, values in all_parameters.items():
             if len(values) > 1:  # Parameter must have multiple values
                 valid_params[param_name] = {
                     'values': values,
-                    'frequency': parameter_frequencies[param_name],
+                    'frequency': table.frequency(param_name),
                     'value_count': len(values)
                 }
         
@@ -423,44 +1549,145 @@ class DeforumVideoGrid:
         
         return {
             'all_parameters': all_parameters,
-            'valid_parameters': valid_params,
-            'best_candidates': sorted_params[:2] if len(sorted_params) >= 2 else sorted_params
+            'valid_parameters': dict(sorted_params),
+            'best_candidates': sorted_params[:2],
+            'table': table,
         }
     
-    def organize_grid_layout(self, video_files: List[Tuple[Path, Dict]]) -> Tuple[List[List[Path]], List[str], List[str], str, str]:
-        """Organize videos into grid layout using dynamic parameter discovery."""
-        if not video_files:
-            return [], [], [], "", ""
-        
-        # Discover parameter space across all folders
-        param_space = self.discover_parameter_space(video_files)
-        
-        # Get valid parameters
-        valid_params = [name for name, data in param_space['valid_parameters'].items() if len(data['values']) > 1]
+    def resolve_parameter(self, table: ParameterTable, name: str, option: str) -> Optional[str]:
+        """Map a --x/--y/--z/--where parameter name to one of the batch's parameters."""
+        matches = table.resolve(name)
+        if len(matches) == 1:
+            return matches[0]
+        if matches:
+            print(f"Error: {option} '{name}' matches several parameters: {', '.join(sorted(matches))}")
+        else:
+            print(f"Error: {option} parameter '{name}' not found. Parameters: {', '.join(sorted(table.columns))}")
+        return None
+    
+    def resolve_axes(self, table: ParameterTable) -> bool:
+        """Resolve --x/--y/--z against the batch's parameters into axis_choice; False on a bad name."""
+        self.axis_choice = {}
+        for axis, name in self.axis_names.items():
+            if name:
+                resolved = self.resolve_parameter(table, name, f'--{axis}')
+                if not resolved:
+                    return False
+                self.axis_choice[axis] = resolved
+        chosen = list(self.axis_choice.values())
+        if len(set(chosen)) < len(chosen):
+            print("Error: --x, --y and --z must name different parameters")
+            return False
+        return True
+    
+    def filter_rows(self, table: ParameterTable) -> Optional[List[int]]:
+        """Row ids of the runs matching every --where parameter (any of its values); None on a bad filter."""
+        wanted = {}
+        for name, raw_value in self.where:
+            resolved = self.resolve_parameter(table, name, '--where')
+            if not resolved:
+                return None
+            wanted.setdefault(resolved, []).append(raw_value)
+        
+        conditions = [(name, table.match_values(name, raw_values, self.convert_parameter_value))
+                      for name, raw_values in wanted.items()]
+        return table.select(conditions)
+    
+    def select_axes(self, valid_params: List[str]) -> Tuple[str, str]:
+        """Pick X/Y parameters: --x/--y first, then Deforum's strength and CFG schedules."""
+        x_param_name = self.axis_choice.get('x')
+        y_param_name = self.axis_choice.get('y')
         
-        if len(valid_params) >= 2:
-            # Assign parameters based on Deforum conventions
-            x_param_name = None
-            y_param_name = None
-            
-            # Find strength_schedule for X-axis
+        # Find strength_schedule for X-axis
+        if not x_param_name:
             for param in valid_params:
-                if 'strength_schedule' in param:
+                if 'strength_schedule' in param and param != y_param_name:
                     x_param_name = param
                     break
-            
-            # Find cfg_scale_schedule for Y-axis
+        
+        # Find cfg_scale_schedule for Y-axis
+        if not y_param_name:
             for param in valid_params:
-                if 'cfg_scale_schedule' in param:
+                if 'cfg_scale_schedule' in param and param != x_param_name:
                     y_param_name = param
                     break
-            
-            # Fallback to first two parameters if specific ones not found
-            if not x_param_name:
-                x_param_name = valid_params[0]
-            if not y_param_name:
-                y_param_name = valid_params[1] if len(valid_params) > 1 else valid_params[0]
-            
+        
+        # Fallback to the first parameters not already used if specific ones not found
+        if not x_param_name:
+            x_param_name = next((p for p in valid_params if p != y_param_name), y_param_name)
+        if not y_param_name:
+            others = [p for p in valid_params if p != x_param_name]
+            y_param_name = others[0] if others else x_param_name
+        
+        return x_param_name, y_param_name
+    
+    def organize_z_pages(self, video_files: List[Tuple[Path, Dict]],
+                         param_space: Optional[Dict] = None) -> Optional[Tuple[str, List[Tuple[str, List[Tuple[Path, Dict]]]], Tuple[str, str], Dict]]:
+        """Split a 3-D sweep into one page of runs per Z value.
+        
+        Returns (z_param_name, [(z_label, page_video_files)], (x_param, y_param), param_space),
+        or None when fewer than three parameters vary and no --z axis was given.
+        """
+        if param_space is None:
+            param_space = self.discover_parameter_space(video_files)
+        valid_params = list(param_space['valid_parameters'])
+        
+        # --z, or else a z_<param>_<value> folder group, names the Z axis explicitly
+        z_param_name = self.axis_choice.get('z')
+        if z_param_name:
+            if not (self.axis_choice.get('x') or any(p != z_param_name for p in valid_params)):
+                print(f"Warning: No parameter other than '{z_param_name}' varies; ignoring --z")
+                return None
+        else:
+            if len(valid_params) < 3:
+                return None
+            group_params = [name for _, params in video_files for name in params.get('group_parameters', {})]
+            z_param_name = next((name for name in group_params if name in valid_params), None)
+        
+        axes = self.select_axes([p for p in valid_params if p != z_param_name])
+        if not z_param_name:
+            remaining = sorted(
+                (p for p in valid_params if p not in axes),
+                key=lambda p: (param_space['valid_parameters'][p]['frequency'],
+                               param_space['valid_parameters'][p]['value_count']),
+                reverse=True
+            )
+            z_param_name = remaining[0]
+        
+        # Pages come straight from the Z column's posting lists
+        facets = param_space['table'].facet(z_param_name)
+        pages = []
+        for z_val in sorted(facets, key=self.sort_key):
+            pages.append((str(z_val), [video_files[row] for row in facets[z_val]]))
+        
+        print(f"Selected Z parameter: '{z_param_name}' ({len(pages)} pages)")
+        return z_param_name, pages, axes, param_space
+    
+    def organize_grid_layout(self, video_files: List[Tuple[Path, Dict]],
+                             axes: Optional[Tuple[str, str]] = None,
+                             param_space: Optional[Dict] = None) -> Tuple[List[List[Path]], List[str], List[str], str, str]:
+        """Organize videos into grid layout using dynamic parameter discovery.
+        
+        axes and param_space pin the X/Y parameters and their values, so that every page of a
+        Z sweep gets the same rows and columns.
+        """
+        if not video_files:
+            return [], [], [], "", ""
+        
+        # Discover parameter space across all folders
+        if param_space is None:
+            param_space = self.discover_parameter_space(video_files)
+        
+        # Get valid parameters
+        valid_params = [name for name, data in param_space['valid_parameters'].items() if len(data['values']) > 1]
+        
+        x_choice = self.axis_choice.get('x')
+        x_param_name = y_param_name = None
+        if axes or len(valid_params) >= 2 or (x_choice and self.axis_choice.get('y')):
+            # Assign parameters based on Deforum conventions
+            x_param_name, y_param_name = axes or self.select_axes(valid_params)
+        
+        if x_param_name and x_param_name != y_param_name:
             print(f"Selected parameters: X='{x_param_name}', Y='{y_param_name}'")
             
             # Build grid
@@ -489,18 +1716,16 @@ class DeforumVideoGrid:
             
             return grid, x_labels, y_labels, x_param_name, y_param_name
             
-        elif len(valid_params) == 1:
-            param_name = valid_params[0]
+        elif x_param_name or valid_params or x_choice:
+            # One parameter (or the same one on both axes): a single row
+            param_name = x_param_name or x_choice or valid_params[0]
             param_values = sorted(param_space['all_parameters'][param_name], key=self.sort_key)
             
-            row = []
-            for val in param_values:
-                for video_path, params in video_files:
-                    if params['parameters'].get(param_name) == val:
-                        row.append(video_path)
-                        break
-                else:
-                    row.append(None)
+            # First run per value, in one pass over the runs
+            first_runs = {}
+            for video_path, params in video_files:
+                first_runs.setdefault(params['parameters'].get(param_name), video_path)
+            row = [first_runs.get(val) for val in param_values]
             
             return [row], [str(val) for val in param_values], ["All Videos"], param_name, "Index"
         
@@ -531,46 +1756,70 @@ class DeforumVideoGrid:
         except (ValueError, TypeError):
             return (1, str(val))    # String values sorted separately
     
+    def get_video_info(self, video_path: Path) -> Optional[Dict]:
+        """Get video metadata (duration, resolution, fps, codec, frames) from the media index."""
+        return self.media_index.get(video_path)
+    
     def get_video_duration(self, video_path: Path) -> float:
-        """Get video duration using FFprobe."""
-        try:
-            # Try ffprobe first (more reliable)
-            ffprobe_path = self.ffmpeg_path.replace('ffmpeg', 'ffprobe')
-            cmd = [
-                ffprobe_path,
-                '-v', 'quiet',
-                '-print_format', 'json',
-                '-show_format',
-                str(video_path)
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            if result.returncode == 0:
-                data = json.loads(result.stdout)
-                return float(data['format']['duration'])
-        except Exception:
-            pass
-        
-        # Fallback to ffmpeg
-        try:
-            cmd = [
-                self.ffmpeg_path,
-                '-i', str(video_path),
-                '-f', 'null',
-                '-'
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
-            # Parse duration from stderr output
-            duration_match = re.search(r'Duration: (\d{2}):(\d{2}):(\d{2}\.?\d*)', result.stderr)
-            if duration_match:
-                hours, minutes, seconds = duration_match.groups()
-                return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
-        except Exception as e:
-            print(f"Warning: Could not get duration for {video_path}: {e}")
+        """Get video duration from the media index, probing the file if needed."""
+        info = self.get_video_info(video_path)
+        if info and info.get('duration'):
+            return info['duration']
         
+        print(f"Warning: Could not get duration for {video_path}")
         return 10.0  # Default fallback duration
     
+    def has_window(self) -> bool:
+        """Whether --start, --end or --frame-step restrict the frames taken from each clip."""
+        return self.start is not None or self.end is not None or self.frame_step > 1
+    
+    def window_key(self) -> str:
+        """Cache key part for the time window (empty without one, keeping older cache entries valid)."""
+        if not self.has_window():
+            return ''
+        return f"{self.start}|{self.end}|{self.frame_step}"
+    
+    def time_point_seconds(self, point: Optional[Tuple[float, bool]], video_path: Path) -> Optional[float]:
+        """Convert a --start/--end point to seconds; frame numbers use the clip's own frame rate."""
+        if point is None:
+            return None
+        value, is_frame = point
+        if not is_frame:
+            return value
+        info = self.get_video_info(video_path) or {}
+        return value / (info.get('fps') or self.fps)
+    
+    def clip_window(self, video_path: Path) -> Tuple[float, float]:
+        """Start time and length in seconds of the part of a clip inside the --start/--end window."""
+        duration = self.get_video_duration(video_path)
+        start = min(self.time_point_seconds(self.start, video_path) or 0.0, duration)
+        end = self.time_point_seconds(self.end, video_path)
+        end = duration if end is None else min(end, duration)
+        return start, max(0.0, end - start)
+    
+    def windowed_duration(self, video_path: Path) -> float:
+        """Length of a clip's grid cell after the time window and frame step are applied."""
+        if not self.has_window():
+            return self.get_video_duration(video_path)
+        return self.clip_window(video_path)[1] / self.frame_step
+    
+    def input_args(self, video_path: Path) -> List[str]:
+        """Input options for a source clip, seeking before -i so frames outside the window are never decoded."""
+        args = []
+        if self.start is not None or self.end is not None:
+            start, length = self.clip_window(video_path)
+            if start > 0:
+                args.extend(['-ss', f'{start:.3f}'])
+            if self.end is not None:
+                args.extend(['-t', f'{length:.3f}'])
+        return args + ['-i', str(video_path)]
+    
+    def step_filter(self) -> str:
+        """Filter prefix keeping every --frame-step'th frame, retimed so the kept frames play back to back."""
+        if self.frame_step <= 1:
+            return ''
+        return f'framestep={self.frame_step},setpts=(PTS-STARTPTS)/{self.frame_step},'
+    
     def create_placeholder_video(self, duration: float) -> Path:
         """Create a black placeholder video for empty grid cells."""
         placeholder_path = self.temp_dir / "placeholder.mp4"
@@ -579,32 +1828,165 @@ class DeforumVideoGrid:
             self.ffmpeg_path,
             '-f', 'lavfi',
             '-i', f'color=black:size={self.thumbnail_size}x{self.thumbnail_size}:duration={duration}:rate={self.fps}',
-            '-c:v', 'libx264',
-            '-pix_fmt', 'yuv420p',
+        ] + self.cell_encoder_args() + [
             '-y',
             str(placeholder_path)
         ]
         
-        subprocess.run(cmd, capture_output=True, timeout=30)
+        self.run_ffmpeg(cmd, 30, 'placeholder', placeholder_path)
         return placeholder_path
     
-    def resize_video(self, input_path: Path, output_path: Path, duration: float) -> bool:
-        """Resize video to thumbnail size and ensure consistent duration."""
+    def cell_encoder_args(self) -> List[str]:
+        """Encoder arguments for intermediate grid cells."""
+        return list(ENCODER_PROFILES[self.profile]['intermediate'])
+    
+    def output_encoder_args(self) -> List[str]:
+        """Encoder arguments for the final grid video."""
+        return list(ENCODER_PROFILES[self.profile]['output'])
+    
+    def thumbnail_filter(self) -> str:
+        """Scale and letterbox a video into a square thumbnail cell."""
+        size = self.thumbnail_size
+        return f'scale={size}:{size}:force_original_aspect_ratio=decrease,pad={size}:{size}:(ow-iw)/2:(oh-ih)/2:black'
+    
+    def resize_video(self, input_path: Path, output_path: Path, duration: float,
+                     threads: int = 0, windowed: bool = True) -> bool:
+        """Resize video to thumbnail size and ensure consistent duration.
+        
+        windowed applies the time window and frame step; it is off when input_path is a
+        cached cell that already had them applied.
+        """
+        if windowed:
+            inputs = self.input_args(input_path)
+            video_filter = self.step_filter() + self.thumbnail_filter()
+        else:
+            inputs = ['-i', str(input_path)]
+            video_filter = self.thumbnail_filter()
         cmd = [
             self.ffmpeg_path,
-            '-i', str(input_path),
-            '-vf', f'scale={self.thumbnail_size}:{self.thumbnail_size}:force_original_aspect_ratio=decrease,pad={self.thumbnail_size}:{self.thumbnail_size}:(ow-iw)/2:(oh-ih)/2:black',
+        ] + inputs + [
+            '-vf', video_filter,
             '-t', str(duration),
             '-r', str(self.fps),
-            '-c:v', 'libx264',
-            '-pix_fmt', 'yuv420p',
-            '-y',
-            str(output_path)
-        ]
+        ] + self.cell_encoder_args()
+        if threads:
+            cmd.extend(['-threads', str(threads)])
+        cmd.extend(['-y', str(output_path)])
         
-        result = subprocess.run(cmd, capture_output=True, timeout=60)
+        try:
+            result = self.run_ffmpeg(cmd, 60, 'resize_cell', input_path)
+        except subprocess.TimeoutExpired:
+            return False
         return result.returncode == 0
     
+    def threads_per_job(self, job_count: int) -> int:
+        """Split available cores across concurrent FFmpeg jobs (0 lets FFmpeg decide)."""
+        if job_count <= 1:
+            return 0
+        return max(1, (os.cpu_count() or 1) // job_count)
+    
+    def resize_grid_cells(self, grid: List[List[Path]], duration: float,
+                          placeholder_path: Path, on_cell_done=None) -> List[List[Path]]:
+        """Resize all grid cells concurrently, keeping each result at its grid position.
+        
+        on_cell_done(i, j, path) is called from the calling thread as soon as each cell's
+        final file (resized, cached or placeholder) is known.
+        """
+        resized_videos = [[placeholder_path for _ in row] for row in grid]
+        
+        tasks = []
+        ready = []
+        cached_count = 0
+        for i, row in enumerate(grid):
+            for j, video_path in enumerate(row):
+                if not (video_path and video_path.exists()) or (self.has_window() and not self.windowed_duration(video_path)):
+                    ready.append((i, j))
+                    continue
+                cached_path = self.cached_cell_path(video_path, duration)
+                if cached_path and self.cell_cache.lookup(cached_path):
+                    resized_videos[i][j] = cached_path
+                    ready.append((i, j))
+                    cached_count += 1
+                else:
+                    tasks.append((i, j, video_path, cached_path or self.temp_dir / f"resized_{i}_{j}.mp4"))
+        
+        if cached_count:
+            print(f"Reusing {cached_count} cached cells")
+        
+        if on_cell_done:
+            for i, j in ready:
+                on_cell_done(i, j, resized_videos[i][j])
+        
+        if not tasks:
+            return resized_videos
+        
+        if self.cell_farm:
+            finished = self.cell_farm.render(self, tasks, duration)
+        else:
+            finished = self.resize_locally(tasks, duration)
+        for (i, j, video_path, resized_path), ok in finished:
+            if ok:
+                resized_videos[i][j] = resized_path
+            else:
+                print(f"Warning: Using placeholder for {video_path}")
+            if on_cell_done:
+                on_cell_done(i, j, resized_videos[i][j])
+        
+        return resized_videos
+    
+    def resize_locally(self, tasks: List[Tuple[int, int, Path, Path]], duration: float) -> Iterator[Tuple[Tuple, bool]]:
+        """Resize (i, j, video_path, output_path) tasks on the local pool, yielding (task, ok) as each finishes."""
+        workers = min(self.jobs, len(tasks))
+        threads = self.threads_per_job(workers)
+        print(f"Resizing {len(tasks)} videos with {workers} worker(s)")
+        
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self.profiler.carry(self.render_cell), task[2], task[3], duration, threads): task
+                for task in tasks
+            }
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    ok = future.result()
+                except Exception as e:
+                    print(f"Warning: Resize failed for {task[2]}: {e}")
+                    ok = False
+                yield task, ok
+    
+    def cached_cell_path(self, video_path: Path, duration: float) -> Optional[Path]:
+        """Return the cell cache location for a source video, or None if caching is off."""
+        if not self.cell_cache:
+            return None
+        source_key = self.cell_cache.source_key(video_path)
+        if not source_key:
+            return None
+        settings_key = self.cell_cache.settings_key(self.fps, duration, self.cell_encoder_args(), self.window_key())
+        return self.cell_cache.cell_path(source_key, settings_key, self.thumbnail_size)
+    
+    def render_cell(self, video_path: Path, output_path: Path, duration: float, threads: int = 0) -> bool:
+        """Resize one cell, downscaling a larger cached cell of the same source when possible."""
+        if not self.cell_cache or output_path.parent != self.cell_cache.cache_dir:
+            return self.resize_video(video_path, output_path, duration, threads)
+        
+        source_key, settings_key, _ = output_path.stem.split('_')
+        larger = self.cell_cache.find_larger(source_key, settings_key, self.thumbnail_size)
+        
+        # Write to a temporary name so an interrupted encode never leaves a partial cell behind
+        tmp_path = output_path.with_name(f"{output_path.stem}.{threading.get_ident()}.tmp.mp4")
+        ok = False
+        if larger and self.cell_cache.lookup(larger):
+            ok = self.resize_video(larger, tmp_path, duration, threads, windowed=False)
+        if not ok:
+            ok = self.resize_video(video_path, tmp_path, duration, threads)
+        
+        if not ok:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            return False
+        self.cell_cache.store(tmp_path, output_path)
+        return True
+    
     def calculate_grid_dimensions(self, rows: int, cols: int) -> Tuple[int, int]:
         """Calculate final grid dimensions including padding and labels."""
         # Grid content dimensions
@@ -618,185 +2000,1177 @@ class DeforumVideoGrid:
         
         return total_width, total_height
     
-    def create_grid_video(self, grid: List[List[Path]], output_path: Path, 
-                         x_labels: List[str], y_labels: List[str],
-                         x_param_name: str, y_param_name: str) -> bool:
-        """Create the final grid video with padding and labels using FFmpeg."""
-        if not grid:
-            return False
-        
-        rows = len(grid)
-        cols = len(grid[0])
+    def get_max_duration(self, grid: List[List[Path]]) -> float:
+        """Get the longest duration of all videos in the grid, within the time window if one is set."""
+        self.media_index.probe_many([path for row in grid for path in row if path], self.jobs)
         
-        # Get maximum duration from all videos
         max_duration = 0
         for row in grid:
             for video_path in row:
                 if video_path:
-                    duration = self.get_video_duration(video_path)
+                    duration = self.windowed_duration(video_path)
                     max_duration = max(max_duration, duration)
         
         if max_duration == 0:
+            if self.has_window():
+                print("Warning: No video reaches into the --start/--end window")
             max_duration = 10.0
+        return max_duration
+    
+    def create_grid_video(self, grid: List[List[Path]], output_path: Path, 
+                         x_labels: List[str], y_labels: List[str],
+                         x_param_name: str, y_param_name: str) -> bool:
+        """Create the final grid video with padding and labels using FFmpeg."""
+        if not grid:
+            return False
         
-        # Create temporary directory for resized videos
-        self.temp_dir = Path(tempfile.mkdtemp())
-        placeholder_path = self.create_placeholder_video(max_duration)
-        
-        # Resize all videos
-        resized_videos = []
-        for i, row in enumerate(grid):
-            resized_row = []
-            for j, video_path in enumerate(row):
-                if video_path and video_path.exists():
-                    resized_path = self.temp_dir / f"resized_{i}_{j}.mp4"
-                    if self.resize_video(video_path, resized_path, max_duration):
-                        resized_row.append(resized_path)
-                    else:
-                        resized_row.append(placeholder_path)
-                else:
-                    resized_row.append(placeholder_path)
-            resized_videos.append(resized_row)
-        
-        # Calculate final dimensions
-        total_width, total_height = self.calculate_grid_dimensions(rows, cols)
+        page = self.make_page(grid, output_path, x_labels, y_labels, x_param_name, y_param_name)
+        return self.render_pages([page])[0]
+    
+    @staticmethod
+    def make_page(grid: List[List[Path]], output_path: Path, x_labels: List[str], y_labels: List[str],
+                  x_param_name: str, y_param_name: str, title: str = '', ladder: bool = True) -> Dict:
+        """Bundle one grid video to render: cells, output path, labels and an optional title.
         
-        # Build FFmpeg filter complex for grid with padding and labels
-        inputs = []
-        filter_parts = []
+        ladder is off for pages that are only joined into a combined video afterwards.
+        """
+        return {
+            'grid': grid,
+            'output_path': Path(output_path),
+            'x_labels': x_labels,
+            'y_labels': y_labels,
+            'x_param_name': x_param_name,
+            'y_param_name': y_param_name,
+            'title': title,
+            'ladder': ladder,
+        }
+    
+    def render_pages(self, pages: List[Dict]) -> List[bool]:
+        """Render one or more grid pages concurrently.
         
-        # Add all input videos
-        for row in resized_videos:
-            for video_path in row:
-                inputs.extend(['-i', str(video_path)])
+        All pages share one duration probe, one placeholder and one resize pool, so a cell that
+        appears on several pages is probed and resized only once.
+        """
+        if self.preview:
+            return self.render_previews(pages)
         
-        # Create base color canvas
-        canvas_filter = f"color=black:size={total_width}x{total_height}:duration={max_duration}:rate={self.fps}[canvas]"
-        filter_parts.append(canvas_filter)
+        # Get maximum duration from all videos
+        with self.profiler.span('probe', stage=True):
+            max_duration = self.get_max_duration([row for page in pages for row in page['grid']])
         
-        # Add grid videos with padding
-        input_idx = 0
-        current_output = "[canvas]"
+        results = [False] * len(pages)
+        workers = min(self.jobs, len(pages))
+        threads = self.threads_per_job(workers)
         
-        for i, row in enumerate(resized_videos):
-            for j, _ in enumerate(row):
-                # Calculate position with updated left margin
-                x_pos = self.left_margin + j * (self.thumbnail_size + self.padding)
-                y_pos = self.text_height + self.param_name_height + self.padding + i * (self.thumbnail_size + self.padding)
+        pending = list(range(len(pages)))
+        direct_engines = {
+            'single-pass': self.create_grid_video_single_pass,
+            'numpy': self.create_grid_video_numpy,
+        }
+        if self.engine in direct_engines:
+            render = direct_engines[self.engine]
+            with self.profiler.span('composite', stage=True, engine=self.engine):
+                results = self._run_pages(pages, pending, workers, lambda k: render(pages[k], max_duration, threads))
+            pending = [k for k in pending if not results[k]]
+            if pending:
+                print(f"{self.engine} engine failed, falling back to two-stage rendering")
+        
+        if pending:
+            # Create temporary directory for resized videos
+            self.temp_dir = Path(tempfile.mkdtemp())
+            try:
+                placeholder_path = self.create_placeholder_video(max_duration)
                 
-                next_output = f"[overlay_{i}_{j}]"
-                overlay_filter = f"{current_output}[{input_idx}:v]overlay={x_pos}:{y_pos}{next_output}"
-                filter_parts.append(overlay_filter)
-                current_output = next_output
-                input_idx += 1
+                # Resize all videos of the pending pages in one pool
+                all_rows = []
+                row_owner = []
+                resized_pages = {}
+                strip_plans = {}
+                for k in pending:
+                    grid = pages[k]['grid']
+                    all_rows.extend(grid)
+                    row_owner.extend((k, r) for r in range(len(grid)))
+                    resized_pages[k] = [[None] * len(row) for row in grid]
+                    strip_plans[k] = self.plan_strips(len(grid), len(grid[0]))
+                
+                # Large pages are composed as strips, each started as soon as its cells are ready
+                remaining = {
+                    (k, s): (row_end - row_start) * (col_end - col_start)
+                    for k, plan in strip_plans.items() if plan
+                    for s, (row_start, row_end, col_start, col_end) in enumerate(plan)
+                }
+                strip_futures = {}
+                strip_executor = ThreadPoolExecutor(max_workers=self.jobs)
+                strip_threads = self.threads_per_job(self.jobs)
+                
+                def on_cell_done(i, j, path):
+                    k, r = row_owner[i]
+                    resized_pages[k][r][j] = path
+                    plan = strip_plans[k]
+                    if not plan:
+                        return
+                    s = next(n for n, (row_start, row_end, col_start, col_end) in enumerate(plan)
+                             if row_start <= r < row_end and col_start <= j < col_end)
+                    remaining[(k, s)] -= 1
+                    if remaining[(k, s)] == 0:
+                        strip_futures[(k, s)] = strip_executor.submit(
+                            self.profiler.carry(self.compose_strip), self.strip_cells(resized_pages[k], plan[s]),
+                            self.strip_path(pages[k], s), max_duration, strip_threads)
+                
+                try:
+                    with self.profiler.span('resize', stage=True):
+                        self.resize_grid_cells(all_rows, max_duration, placeholder_path, on_cell_done)
+                    strips_ok = {
+                        k: all(strip_futures[(k, s)].result() for s in range(len(plan)))
+                        for k, plan in strip_plans.items() if plan
+                    }
+                finally:
+                    strip_executor.shutdown(wait=True)
+                
+                def compose_page(k):
+                    plan = strip_plans[k]
+                    if not plan:
+                        return self.compose_resized_page(pages[k], resized_pages[k], max_duration, threads)
+                    if not strips_ok[k]:
+                        return False
+                    grid = pages[k]['grid']
+                    strip_paths = [self.strip_path(pages[k], s) for s in range(len(plan))]
+                    return self.stack_strips(pages[k], self.strip_rows(plan, strip_paths),
+                                             len(grid), len(grid[0]), max_duration, threads)
+                
+                with self.profiler.span('composite', stage=True, engine='two-stage'):
+                    two_stage = self._run_pages(pages, pending, workers, compose_page)
+                for k in pending:
+                    results[k] = two_stage[k]
+                
+                if self.cell_cache:
+                    # After composing, so the bodies and labels this run used are protected too
+                    self.cell_cache.evict(keep={str(path) for k in pending for row in resized_pages[k]
+                                                for path in row})
+            finally:
+                # Cleanup temporary files
+                shutil.rmtree(self.temp_dir, ignore_errors=True)
+        
+        return results
+    
+    def render_previews(self, pages: List[Dict]) -> List[bool]:
+        """Render quick previews of grid pages from a few seeked frames per cell."""
+        with self.profiler.span('probe', stage=True):
+            self.media_index.probe_many([path for page in pages for row in page['grid'] for path in row if path], self.jobs)
+        
+        preview_dir = Path(tempfile.mkdtemp())
+        try:
+            results = []
+            with self.profiler.span('preview', stage=True):
+                for page_index, page in enumerate(pages):
+                    page_dir = preview_dir / str(page_index)
+                    page_dir.mkdir()
+                    results.append(self.render_preview(page, page_dir))
+            return results
+        finally:
+            shutil.rmtree(preview_dir, ignore_errors=True)
+    
+    def preview_sample_times(self, video_path: Path, count: int) -> List[float]:
+        """Evenly spaced sample times through a video's time window, avoiding its very first and last frame."""
+        start, length = self.clip_window(video_path)
+        return [start + length * (k + 0.5) / count for k in range(count)]
+    
+    def extract_preview_cell(self, video_path: Optional[Path], output_pattern: Path, count: int, tiled: bool) -> bool:
+        """Grab preview frames of one cell with fast input seeking (-ss before -i).
         
-        # Rename final overlay output for text processing
-        if current_output != "[canvas]":
-            # Use the final overlay output directly, no need for null filter
-            grid_output = current_output
+        With tiled, the frames are tiled into one square cell image (output_pattern is a
+        file); otherwise each frame is written to output_pattern % k.
+        """
+        size = self.thumbnail_size
+        if not (video_path and video_path.exists()):
+            frames = 1 if tiled else count
+            cmd = [self.ffmpeg_path, '-v', 'error', '-f', 'lavfi',
+                   '-i', f'color=black:size={size}x{size}:rate=1',
+                   '-frames:v', str(frames), '-y', str(output_pattern)]
+            return self.run_ffmpeg(cmd, 30, 'preview_cell', output_pattern).returncode == 0
+        
+        times = self.preview_sample_times(video_path, count)
+        cmd = [self.ffmpeg_path, '-v', 'error']
+        for t in times:
+            cmd.extend(['-ss', f'{t:.3f}', '-i', str(video_path)])
+        
+        if tiled and count > 1:
+            tile_cols = int(count ** 0.5 + 0.999)
+            tile_rows = (count + tile_cols - 1) // tile_cols
+            sub = size // tile_cols
+            parts = []
+            for k in range(count):
+                parts.append(f"[{k}:v]trim=end_frame=1,setpts=PTS-STARTPTS,"
+                             f"scale={sub}:{sub}:force_original_aspect_ratio=decrease,"
+                             f"pad={sub}:{sub}:(ow-iw)/2:(oh-ih)/2:black,setsar=1[f{k}]")
+            parts.append(f"{''.join(f'[f{k}]' for k in range(count))}concat=n={count}:v=1,"
+                         f"tile={tile_cols}x{tile_rows},pad={size}:{size}:(ow-iw)/2:(oh-ih)/2:black[cell]")
+            cmd.extend(['-filter_complex', ';'.join(parts), '-map', '[cell]', '-frames:v', '1'])
+            cmd.extend(['-y', str(output_pattern)])
+        elif tiled:
+            cmd.extend(['-vf', self.thumbnail_filter(), '-frames:v', '1', '-y', str(output_pattern)])
         else:
-            grid_output = current_output
+            # One output per seeked input
+            for k in range(count):
+                cmd.extend(['-map', f'{k}:v', '-vf', self.thumbnail_filter(), '-frames:v', '1',
+                            '-y', str(output_pattern) % k])
         
-        # Add text labels
-        text_filters = []
+        try:
+            return self.run_ffmpeg(cmd, 60, 'preview_cell', video_path).returncode == 0
+        except subprocess.TimeoutExpired:
+            return False
+    
+    def render_preview(self, page: Dict, work_dir: Path) -> bool:
+        """Render a labeled still contact sheet or a low-fps animated preview for one page."""
+        grid = page['grid']
+        rows = len(grid)
+        cols = len(grid[0])
+        animated = self.preview == 'animated'
+        count = self.preview_frames or (12 if animated else 1)
         
-        # Add X-axis value labels (below parameter name)
-        for j, label in enumerate(x_labels):
-            x_pos = self.left_margin + j * (self.thumbnail_size + self.padding) + self.thumbnail_size // 2
-            y_pos = self.text_height + 5
-            text_filter = f"drawtext=text='{label}':fontsize={self.font_size}:fontcolor={self.text_color}:box=1:boxcolor={self.text_bg_color}:x={x_pos}-text_w/2:y={y_pos}"
-            text_filters.append(text_filter)
+        tasks = []
+        for i, row in enumerate(grid):
+            for j, video_path in enumerate(row):
+                if animated:
+                    pattern = work_dir / f"cell_{i}_{j}_%03d.png"
+                else:
+                    pattern = work_dir / f"cell_{i}_{j}.png"
+                tasks.append((video_path, pattern))
         
-        # Add Y-axis value labels (horizontal on left with increased margin)
-        for i, label in enumerate(y_labels):
-            x_pos = 50  # Positioned in the left margin
-            y_pos = self.text_height + self.param_name_height + self.padding + i * (self.thumbnail_size + self.padding) + self.thumbnail_size // 2
-            text_filter = f"drawtext=text='{label}':fontsize={self.font_size}:fontcolor={self.text_color}:box=1:boxcolor={self.text_bg_color}:x={x_pos}:y={y_pos}-text_h/2"
-            text_filters.append(text_filter)
+        print(f"Extracting {count} preview frame(s) from {len(tasks)} cells")
+        with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            extract = self.profiler.carry(lambda task: self.extract_preview_cell(task[0], task[1], count, not animated))
+            ok = list(executor.map(extract, tasks))
+        if not all(ok):
+            failed = [str(task[0]) for task, cell_ok in zip(tasks, ok) if not cell_ok]
+            print(f"Warning: Could not extract preview frames for: {', '.join(failed)}")
         
-        # Add X parameter name at top center
-        if x_param_name:
-            x_param_x = total_width // 2
-            x_param_y = 5
-            x_param_filter = f"drawtext=text='{x_param_name}':fontsize={self.font_size + 2}:fontcolor={self.text_color}:box=1:boxcolor={self.text_bg_color}:x={x_param_x}-text_w/2:y={x_param_y}"
-            text_filters.append(x_param_filter)
+        inputs = []
+        cell_streams = []
+        input_idx = 0
+        for i, row in enumerate(grid):
+            stream_row = []
+            for j, _ in enumerate(row):
+                if animated:
+                    inputs.extend(['-framerate', str(self.preview_fps), '-i', str(work_dir / f"cell_{i}_{j}_%03d.png")])
+                else:
+                    inputs.extend(['-i', str(work_dir / f"cell_{i}_{j}.png")])
+                stream_row.append(f"[{input_idx}:v]")
+                input_idx += 1
+            cell_streams.append(stream_row)
         
-        # Add Y parameter name horizontally on left side
-        if y_param_name and rows > 1:
-            y_param_x = 5
-            y_param_y = total_height // 2 - self.font_size
-            y_param_filter = f"drawtext=text='{y_param_name}':fontsize={self.font_size + 2}:fontcolor={self.text_color}:box=1:boxcolor={self.text_bg_color}:x={y_param_x}:y={y_param_y}"
-            text_filters.append(y_param_filter)
+        total_width, total_height = self.calculate_grid_dimensions(rows, cols)
+        filter_parts = []
+        body = self.build_stack_body(filter_parts, cell_streams)
+        grid_output = self.pad_body_to_canvas(filter_parts, body, total_width, total_height)
         
-        # Combine all text filters
+        text_filters = self.build_label_filters(rows, total_width, total_height, page['x_labels'], page['y_labels'],
+                                                page['x_param_name'], page['y_param_name'], page['title'])
+        last = grid_output
         if text_filters:
-            final_filter = f"{grid_output}{','.join(text_filters)}[final]"
-            filter_parts.append(final_filter)
-            output_mapping = "[final]"
+            filter_parts.append(f"{grid_output}{','.join(text_filters)}[labeled]")
+            last = "[labeled]"
+        
+        output_path = page['output_path']
+        output_args = []
+        if not animated:
+            output_args = ['-frames:v', '1']
+        elif self.preview_format == 'gif':
+            filter_parts.append(f"{last}split[gif_a][gif_b];[gif_a]palettegen[gif_p];[gif_b][gif_p]paletteuse[out]")
+            last = "[out]"
+            output_args = ['-loop', '0']
         else:
-            output_mapping = grid_output
+            output_args = ['-c:v', 'libwebp', '-loop', '0', '-quality', '75']
         
-        # Build complete FFmpeg command
         cmd = [self.ffmpeg_path] + inputs + [
             '-filter_complex', ';'.join(filter_parts),
-            '-map', f'{output_mapping}',
-            '-c:v', 'libx264',
-            '-pix_fmt', 'yuv420p',
-            '-r', str(self.fps),
-            '-y',
-            str(output_path)
-        ]
-        
-        print(f"Creating grid video: {output_path}")
-        print(f"Grid layout: {rows}x{cols}")
-        print(f"Duration: {max_duration:.2f}s")
-        print(f"Final dimensions: {total_width}x{total_height}")
-        print(f"Parameters: X={x_param_name}, Y={y_param_name}")
-        print(f"Using FFmpeg: {self.ffmpeg_path}")
-        
-        result = subprocess.run(cmd, capture_output=True, timeout=300)
+            '-map', last,
+        ] + output_args + ['-y', str(output_path)]
         
+        print(f"Creating preview: {output_path}")
+        try:
+            result = self.run_ffmpeg(cmd, self.compose_timeout(len(tasks), 1), 'preview', output_path)
+        except subprocess.TimeoutExpired:
+            print("FFmpeg error: preview timed out")
+            return False
         if result.returncode != 0:
-            print(f"FFmpeg error: {result.stderr.decode()}")
-        
-        # Cleanup temporary files
-        import shutil
-        shutil.rmtree(self.temp_dir)
-        
+            print(f"FFmpeg error: {result.stderr.decode(errors='replace')}")
         return result.returncode == 0
     
-    def generate_grid(self, output_path: Optional[str] = None) -> bool:
-        """Main method to generate video grid."""
-        if not self.batch_dir.exists():
-            print(f"Error: Batch directory {self.batch_dir} does not exist")
-            return False
+    def _run_pages(self, pages: List[Dict], indices: List[int], workers: int, render) -> List[bool]:
+        """Run render(page_index) over the selected pages on a thread pool."""
+        results = [False] * len(pages)
+        if len(indices) == 1:
+            results[indices[0]] = render(indices[0])
+            return results
+        
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            render = self.profiler.carry(render)
+            futures = {executor.submit(render, k): k for k in indices}
+            for future in as_completed(futures):
+                k = futures[future]
+                try:
+                    results[k] = future.result()
+                except Exception as e:
+                    print(f"Warning: Rendering {pages[k]['output_path']} failed: {e}")
+        return results
+    
+    def build_cell_sources(self, grid: List[List[Path]], max_duration: float,
+                           scale: bool) -> Tuple[List[str], List[str], List[List[str]]]:
+        """Build FFmpeg inputs, per-cell filters and cell stream labels for a block of cells.
         
-        # Find video files
-        print(f"Scanning {self.batch_dir} for video files...")
-        video_files = self.find_video_files()
+        With scale, source videos are scaled, padded and trimmed in-graph and empty cells
+        become color sources; otherwise cells are already resized files used as they are.
+        """
+        inputs = []
+        cell_filters = []
+        cell_streams = []
         
-        if not video_files:
-            print("No video files found in batch subdirectories")
-            return False
+        for i, row in enumerate(grid):
+            stream_row = []
+            for j, video_path in enumerate(row):
+                if not scale:
+                    stream_row.append(f"[{inputs.count('-i')}:v]")
+                    inputs.extend(['-i', str(video_path)])
+                    continue
+                
+                label = f"[cell_{i}_{j}]"
+                if video_path and video_path.exists():
+                    input_idx = inputs.count('-i')
+                    inputs.extend(self.input_args(video_path))
+                    cell_filters.append(
+                        f"[{input_idx}:v]{self.step_filter()}{self.thumbnail_filter()},fps={self.fps},"
+                        f"trim=duration={max_duration},setpts=PTS-STARTPTS{label}"
+                    )
+                else:
+                    cell_filters.append(
+                        f"color=black:size={self.thumbnail_size}x{self.thumbnail_size}:"
+                        f"duration={max_duration}:rate={self.fps}{label}"
+                    )
+                stream_row.append(label)
+            cell_streams.append(stream_row)
+        
+        return inputs, cell_filters, cell_streams
+    
+    def compose_resized_page(self, page: Dict, resized_videos: List[List[Path]],
+                             max_duration: float, threads: int = 0) -> bool:
+        """Compose a page from already resized cell files.
+        
+        With the cell cache on and the stack compositor, the unlabeled grid body is saved
+        alongside the page in the same FFmpeg run. A later run with the same cells only pads and
+        labels the cached body, so changing labels, titles or margins does not recompose every
+        cell.
+        """
+        rows = len(resized_videos)
+        cols = len(resized_videos[0])
+        total_width, total_height = self.calculate_grid_dimensions(rows, cols)
+        body_path = self.cached_body_path(resized_videos, max_duration)
+        
+        if body_path and self.cell_cache.lookup(body_path):
+            print("Reusing cached grid body")
+            filter_parts = []
+            grid_output = self.pad_body_to_canvas(filter_parts, '[0:v]', total_width, total_height)
+            return self.encode_grid(['-i', str(body_path)], filter_parts, grid_output, page, rows, cols,
+                                    max_duration, threads)
+        
+        inputs, cell_filters, cell_streams = self.build_cell_sources(resized_videos, max_duration, scale=False)
+        if not body_path:
+            return self.compose_grid(inputs, cell_filters, cell_streams, page, max_duration, threads)
+        
+        filter_parts = list(cell_filters)
+        body = self.build_stack_body(filter_parts, cell_streams)
+        filter_parts.append(f"{body}split[body_out][body_canvas]")
+        grid_output = self.pad_body_to_canvas(filter_parts, '[body_canvas]', total_width, total_height)
+        
+        tmp_body = body_path.with_name(f"{body_path.stem}.{threading.get_ident()}.tmp.mp4")
+        body_output = ['-map', '[body_out]'] + self.cell_encoder_args() + ['-r', str(self.fps), str(tmp_body)]
+        ok = self.encode_grid(inputs, filter_parts, grid_output, page, rows, cols, max_duration, threads,
+                              extra_output=body_output)
+        if ok and tmp_body.exists():
+            self.cell_cache.store(tmp_body, body_path)
+        elif tmp_body.exists():
+            tmp_body.unlink()
+        return ok
+    
+    def compose_resized_grid(self, page: Dict, resized_videos: List[List[Path]],
+                             max_duration: float, threads: int = 0) -> bool:
+        """Compose a page from resized cells, as strips when it has more cells than max_decoders.
         
-        print(f"Found {len(video_files)} video files")
+        The two-stage pipeline does the same, but starts each strip as soon as its cells are ready.
+        """
+        strips = self.plan_strips(len(resized_videos), len(resized_videos[0]))
+        if strips:
+            return self.compose_page_from_strips(page, resized_videos, strips, max_duration, threads)
+        return self.compose_resized_page(page, resized_videos, max_duration, threads)
+    
+    def create_grid_video_single_pass(self, page: Dict, max_duration: float, threads: int = 0) -> bool:
+        """Scale, pad and trim every cell inside one filtergraph, without intermediate files."""
+        strips = self.plan_strips(len(page['grid']), len(page['grid'][0]))
+        if strips:
+            return self.compose_page_from_strips(page, page['grid'], strips, max_duration, threads, scale=True)
+        
+        inputs, cell_filters, cell_streams = self.build_cell_sources(page['grid'], max_duration, scale=True)
+        return self.compose_grid(inputs, cell_filters, cell_streams, page, max_duration, threads)
+    
+    def create_grid_video_numpy(self, page: Dict, max_duration: float, threads: int = 0) -> bool:
+        """Composite raw decoded frames into a reused NumPy canvas and pipe it to the encoder.
         
-        # Organize grid layout
-        grid, x_labels, y_labels, x_param_name, y_param_name = self.organize_grid_layout(video_files)
+        Each cell is decoded to thumbnail-sized rgb24 frames on an FFmpeg stdout pipe. Every
+        output frame, each cell's latest frame is copied into its slot of one preallocated
+        canvas, which is written to the encoder's stdin. Labels are drawn by the encoder.
+        Memory stays at one canvas plus one frame buffer per cell.
+        """
+        if np is None:
+            print("NumPy is not installed; the numpy engine is unavailable")
+            return False
         
-        if not grid:
-            print("Could not organize videos into grid")
+        grid = page['grid']
+        rows = len(grid)
+        cols = len(grid[0])
+        # Empty cells stay black on the canvas
+        cells = [(i, j, video_path) for i, row in enumerate(grid) for j, video_path in enumerate(row)
+                 if video_path and video_path.exists()]
+        if self.max_decoders and len(cells) > self.max_decoders:
+            # One decoder process per cell; larger pages are composed from strips instead
+            print(f"{len(cells)} cells exceed --max-decoders {self.max_decoders} for the numpy engine")
             return False
         
-        # Generate output filename if not provided
-        if not output_path:
-            batch_name = self.batch_dir.name
-            output_path = self.batch_dir / f"{batch_name}_grid.mp4"
-        else:
-            output_path = Path(output_path)
+        size = self.thumbnail_size
+        total_width, total_height = self.calculate_grid_dimensions(rows, cols)
+        frame_count = max(1, int(round(max_duration * self.fps)))
         
-        # Create grid video
-        success = self.create_grid_video(grid, output_path, x_labels, y_labels, x_param_name, y_param_name)
+        canvas = np.zeros((total_height, total_width, 3), dtype=np.uint8)
+        
+        text_filters = self.build_label_filters(rows, total_width, total_height, page['x_labels'], page['y_labels'],
+                                                page['x_param_name'], page['y_param_name'], page['title'])
+        encode_cmd = [
+            self.ffmpeg_path, '-v', 'error',
+            '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+            '-s', f'{total_width}x{total_height}', '-r', str(self.fps),
+            '-i', '-',
+        ]
+        label_dir = None
+        filter_parts = []
+        grid_stream = '[0:v]'
+        if text_filters:
+            layer_path, label_dir = self.label_layer(text_filters, total_width, total_height)
+            if layer_path:
+                encode_cmd.extend(['-i', str(layer_path)])
+                filter_parts.append('[0:v][1:v]overlay=0:0[final]')
+            else:
+                filter_parts.append(f"[0:v]{','.join(text_filters)}[final]")
+            grid_stream = '[final]'
+        ladder_args = []
+        if page.get('ladder', True):
+            grid_stream, ladder_args = self.add_ladder_outputs(filter_parts, grid_stream, page['output_path'])
+        if filter_parts:
+            encode_cmd.extend(['-filter_complex', ';'.join(filter_parts), '-map', grid_stream])
+        encode_cmd.extend(self.output_encoder_args())
+        if threads:
+            encode_cmd.extend(['-threads', str(threads)])
+        encode_cmd.extend(['-y', str(page['output_path'])] + ladder_args)
+        
+        print(f"Creating grid video: {page['output_path']}")
+        print(f"Grid layout: {rows}x{cols} (numpy engine, {frame_count} frames)")
+        
+        runner = ProcessRunner.shared()
+        budget = (self.worker_budget.slot(self.priority, len(cells) + 1) if self.worker_budget
+                  else contextlib.nullcontext())
+        decoder_slots = (self.decoder_budget.slot(count=len(cells)) if self.decoder_budget and cells
+                         else contextlib.nullcontext())
+        decoders = []
+        encoder_log = tempfile.TemporaryFile()
+        try:
+            # The decoders and the encoder take their slots together and die with the runner's
+            # processes on Ctrl+C; leaving the block kills whatever is still running
+            with budget, decoder_slots, runner.reserve(len(cells) + 1), contextlib.ExitStack() as processes:
+                for i, j, video_path in cells:
+                    decode_cmd = [
+                        self.ffmpeg_path, '-v', 'error',
+                    ] + self.input_args(video_path) + [
+                        '-vf', f"{self.step_filter()}{self.thumbnail_filter()},fps={self.fps}",
+                        '-t', str(max_duration),
+                        '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-',
+                    ]
+                    proc = processes.enter_context(runner.popen(
+                        decode_cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                        stderr=subprocess.DEVNULL, bufsize=size * size * 3))
+                    cell_frame = np.zeros((size, size, 3), dtype=np.uint8)
+                    x_pos, y_pos = self.cell_position(i, j)
+                    decoders.append({'proc': proc, 'frame': cell_frame, 'view': memoryview(cell_frame).cast('B'),
+                                     'slot': canvas[y_pos:y_pos + size, x_pos:x_pos + size],
+                                     'i': i, 'j': j, 'alive': True})
+                
+                encoder = processes.enter_context(runner.popen(encode_cmd, stdin=subprocess.PIPE,
+                                                               stdout=subprocess.DEVNULL, stderr=encoder_log))
+                
+                for frame_index in range(frame_count):
+                    for cell in decoders:
+                        # A finished cell keeps showing its last frame, like the overlay chain
+                        if cell['alive'] and not self._read_frame(cell['proc'].stdout, cell['view']):
+                            cell['alive'] = False
+                        self.draw_cell_overlay(cell['frame'], cell['i'], cell['j'], frame_index)
+                        cell['slot'][...] = cell['frame']
+                    encoder.stdin.write(memoryview(canvas).cast('B'))
+                
+                encoder.stdin.close()
+                returncode = encoder.wait(timeout=self.compose_timeout(len(decoders), max_duration))
+        except (OSError, subprocess.TimeoutExpired) as e:
+            print(f"NumPy engine error: {e}")
+            returncode = -1
+        
+        if returncode != 0:
+            encoder_log.seek(0)
+            print(f"FFmpeg error: {encoder_log.read().decode(errors='replace')}")
+        encoder_log.close()
+        if label_dir:
+            shutil.rmtree(label_dir, ignore_errors=True)
+        return returncode == 0
+    
+    @staticmethod
+    def _read_frame(stream, view: memoryview) -> bool:
+        """Fill a frame buffer from a raw video pipe; False once the stream has ended."""
+        filled = 0
+        total = len(view)
+        while filled < total:
+            count = stream.readinto(view[filled:])
+            if not count:
+                return False
+            filled += count
+        return True
+    
+    def draw_cell_overlay(self, frame, i: int, j: int, frame_index: int):
+        """Hook for per-cell overlays in the numpy engine; frame is an editable RGB array.
+        
+        Does nothing by default. Subclasses can draw onto the cell, for example a frame
+        counter or a heat map, before it is copied onto the canvas.
+        """
+        pass
+    
+    def plan_strips(self, rows: int, cols: int) -> Optional[List[Tuple[int, int, int, int]]]:
+        """Split a grid into blocks (row_start, row_end, col_start, col_end) of at most max_decoders cells.
+        
+        Rows wider than max_decoders are split into column blocks. Blocks are listed band by
+        band of rows, left to right. Returns None when the whole grid fits in one FFmpeg process.
+        """
+        if not self.max_decoders:
+            return None
+        # A block of one input would never shrink the grid
+        limit = max(2, self.max_decoders)
+        if rows * cols <= limit:
+            return None
+        width = min(cols, limit)
+        height = max(1, limit // width)
+        return [(row_start, min(rows, row_start + height), col_start, min(cols, col_start + width))
+                for row_start in range(0, rows, height) for col_start in range(0, cols, width)]
+    
+    @staticmethod
+    def strip_cells(cells: List[List], block: Tuple[int, int, int, int]) -> List[List]:
+        """The cells of one planned block."""
+        row_start, row_end, col_start, col_end = block
+        return [row[col_start:col_end] for row in cells[row_start:row_end]]
+    
+    @staticmethod
+    def strip_rows(blocks: List[Tuple[int, int, int, int]], items: List) -> List[List]:
+        """Arrange one item per planned block into rows, as the blocks sit in the grid."""
+        rows = {}
+        for block, item in zip(blocks, items):
+            rows.setdefault(block[0], []).append(item)
+        return list(rows.values())
+    
+    def strip_path(self, page: Dict, index: int) -> Path:
+        """Temporary file for one strip of a page."""
+        return self.temp_dir / f"{page['output_path'].stem}_strip_{index}.mp4"
+    
+    def compose_strip(self, cells: List[List[Path]], output_path: Path, max_duration: float,
+                      threads: int = 0, scale: bool = False) -> bool:
+        """Stack one block of cells into an unlabeled strip video."""
+        inputs, filter_parts, cell_streams = self.build_cell_sources(cells, max_duration, scale)
+        body = self.build_stack_body(filter_parts, cell_streams)
+        return self.encode_body(inputs, filter_parts, body, output_path, max_duration, threads)
+    
+    def stack_tiles(self, tiles: List[List[Path]], output_path: Path, max_duration: float, threads: int = 0) -> bool:
+        """Stack a block of strip videos into one larger unlabeled strip."""
+        inputs = []
+        for row in tiles:
+            for path in row:
+                inputs.extend(['-i', str(path)])
+        filter_parts = []
+        body = self.build_tile_body(filter_parts, tiles)
+        return self.encode_body(inputs, filter_parts, body, output_path, max_duration, threads)
+    
+    def encode_body(self, inputs: List[str], filter_parts: List[str], body: str, output_path: Path,
+                    max_duration: float, threads: int = 0) -> bool:
+        """Encode an unlabeled grid body stream as an intermediate strip."""
+        cmd = [self.ffmpeg_path] + inputs + [
+            '-filter_complex', ';'.join(filter_parts),
+            '-map', body,
+            '-r', str(self.fps),
+        ] + self.cell_encoder_args()
+        if threads:
+            cmd.extend(['-threads', str(threads)])
+        cmd.extend(['-y', str(output_path)])
+        
+        try:
+            result = self.run_ffmpeg(cmd, self.compose_timeout(inputs.count('-i'), max_duration),
+                                     'strip', output_path)
+        except subprocess.TimeoutExpired:
+            print(f"FFmpeg error: strip {output_path.name} timed out")
+            return False
+        
+        if result.returncode != 0:
+            print(f"FFmpeg error: {result.stderr.decode(errors='replace')}")
+        return result.returncode == 0
+    
+    def compose_page_from_strips(self, page: Dict, cells: List[List[Path]], strips: List[Tuple[int, int, int, int]],
+                                 max_duration: float, threads: int = 0, scale: bool = False) -> bool:
+        """Compose strips as parallel sub-jobs, then stack them into the labeled grid."""
+        strip_dir = Path(tempfile.mkdtemp())
+        try:
+            strip_paths = [strip_dir / f"strip_{k}.mp4" for k in range(len(strips))]
+            workers = min(self.jobs, len(strips))
+            strip_threads = self.threads_per_job(workers)
+            print(f"Composing {len(strips)} strips with {workers} worker(s)")
+            
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(self.profiler.carry(self.compose_strip), self.strip_cells(cells, block),
+                                    strip_paths[k], max_duration, strip_threads, scale)
+                    for k, block in enumerate(strips)
+                ]
+                if not all(future.result() for future in futures):
+                    return False
+            
+            return self.stack_strips(page, self.strip_rows(strips, strip_paths), len(cells), len(cells[0]),
+                                     max_duration, threads)
+        finally:
+            shutil.rmtree(strip_dir, ignore_errors=True)
+    
+    def reduce_tiles(self, tiles: List[List[Path]], work_dir: Path, max_duration: float,
+                     threads: int = 0) -> Optional[List[List[Path]]]:
+        """Stack strips into larger ones, level by level, until one process may open all of them."""
+        level = 0
+        while True:
+            blocks = self.plan_strips(len(tiles), len(tiles[0]))
+            if not blocks:
+                return tiles
+            paths = [work_dir / f"level_{level}_{k}.mp4" for k in range(len(blocks))]
+            workers = min(self.jobs, len(blocks))
+            print(f"Stacking {len(tiles) * len(tiles[0])} strips into {len(blocks)}")
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [
+                    executor.submit(self.profiler.carry(self.stack_tiles), self.strip_cells(tiles, block),
+                                    paths[k], max_duration, self.threads_per_job(workers))
+                    for k, block in enumerate(blocks)
+                ]
+                if not all(future.result() for future in futures):
+                    return None
+            tiles = self.strip_rows(blocks, paths)
+            level += 1
+    
+    def stack_strips(self, page: Dict, tiles: List[List[Path]], rows: int, cols: int,
+                     max_duration: float, threads: int = 0) -> bool:
+        """Stack strip videos with the grid padding between them, then pad and label the grid.
+        
+        tiles holds the strips as they sit in the grid. When there are more than max_decoders,
+        they are first stacked into fewer, larger strips.
+        """
+        work_dir = Path(tempfile.mkdtemp())
+        try:
+            tiles = self.reduce_tiles(tiles, work_dir, max_duration, threads)
+            if tiles is None:
+                return False
+            
+            total_width, total_height = self.calculate_grid_dimensions(rows, cols)
+            inputs = []
+            for row in tiles:
+                for path in row:
+                    inputs.extend(['-i', str(path)])
+            filter_parts = []
+            body = self.build_tile_body(filter_parts, tiles)
+            grid_output = self.pad_body_to_canvas(filter_parts, body, total_width, total_height)
+            return self.encode_grid(inputs, filter_parts, grid_output, page, rows, cols, max_duration, threads)
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    
+    def build_tile_body(self, filter_parts: List[str], tiles: List[List]) -> str:
+        """Stack input videos laid out as tiles, with the grid padding between them.
+        
+        Tiles in a row share their height and tiles in a column their width, as the blocks of
+        plan_strips do. Returns the stream label of the stacked body.
+        """
+        rows = len(tiles)
+        cols = len(tiles[0])
+        row_outputs = []
+        index = 0
+        for i, row in enumerate(tiles):
+            streams = []
+            for j in range(len(row)):
+                stream = f"[{index}:v]"
+                index += 1
+                pad_right = self.padding if j < cols - 1 else 0
+                pad_bottom = self.padding if i < rows - 1 else 0
+                if pad_right or pad_bottom:
+                    label = f"[tile_{i}_{j}]"
+                    filter_parts.append(f"{stream}pad=iw+{pad_right}:ih+{pad_bottom}:0:0:black{label}")
+                    stream = label
+                streams.append(stream)
+            if cols > 1:
+                filter_parts.append(f"{''.join(streams)}hstack=inputs={cols}[tile_row_{i}]")
+                row_outputs.append(f"[tile_row_{i}]")
+            else:
+                row_outputs.append(streams[0])
+        
+        if rows > 1:
+            filter_parts.append(f"{''.join(row_outputs)}vstack=inputs={rows}[tiles]")
+            return "[tiles]"
+        return row_outputs[0]
+    
+    def compose_timeout(self, input_count: int, max_duration: float) -> float:
+        """Timeout for one FFmpeg compose job, growing with the number of inputs and the duration."""
+        return 300 + input_count * max_duration
+    
+    def combine_pages(self, page_paths: List[Path], output_path: Path, mode: str) -> bool:
+        """Join equally sized page videos into one video, stacked ('tile') or one after another ('sequence')."""
+        inputs = []
+        for path in page_paths:
+            inputs.extend(['-i', str(path)])
+        streams = ''.join(f"[{k}:v]" for k in range(len(page_paths)))
+        
+        if mode == 'tile':
+            filter_parts = [f"{streams}vstack=inputs={len(page_paths)}[out]"]
+        else:
+            filter_parts = [f"{streams}concat=n={len(page_paths)}:v=1:a=0[out]"]
+        main_stream, ladder_args = self.add_ladder_outputs(filter_parts, '[out]', output_path)
+        
+        cmd = [self.ffmpeg_path] + inputs + [
+            '-filter_complex', ';'.join(filter_parts),
+            '-map', main_stream,
+        ] + self.output_encoder_args() + [
+            '-y',
+            str(output_path)
+        ] + ladder_args
+        
+        print(f"Combining {len(page_paths)} pages ({mode}): {output_path}")
+        try:
+            result = self.run_ffmpeg(cmd, 300, 'combine_pages', output_path)
+        except subprocess.TimeoutExpired:
+            print("FFmpeg error: page combination timed out")
+            return False
+        
+        if result.returncode != 0:
+            print(f"FFmpeg error: {result.stderr.decode(errors='replace')}")
+        return result.returncode == 0
+    
+    def cell_position(self, i: int, j: int) -> Tuple[int, int]:
+        """Top-left canvas position of the grid cell at row i, column j."""
+        x_pos = self.left_margin + j * (self.thumbnail_size + self.padding)
+        y_pos = self.text_height + self.param_name_height + self.padding + i * (self.thumbnail_size + self.padding)
+        return x_pos, y_pos
+    
+    def build_overlay_layout(self, filter_parts: List[str], cell_streams: List[List[str]],
+                             total_width: int, total_height: int, max_duration: float) -> str:
+        """Place cells by chaining one overlay per cell onto a full-size canvas."""
+        # Create base color canvas
+        canvas_filter = f"color=black:size={total_width}x{total_height}:duration={max_duration}:rate={self.fps}[canvas]"
+        filter_parts.append(canvas_filter)
+        
+        # Add grid videos with padding
+        current_output = "[canvas]"
+        
+        for i, row in enumerate(cell_streams):
+            for j, cell_stream in enumerate(row):
+                x_pos, y_pos = self.cell_position(i, j)
+                
+                next_output = f"[overlay_{i}_{j}]"
+                overlay_filter = f"{current_output}{cell_stream}overlay={x_pos}:{y_pos}{next_output}"
+                filter_parts.append(overlay_filter)
+                current_output = next_output
+        
+        return current_output
+    
+    def build_stack_layout(self, filter_parts: List[str], cell_streams: List[List[str]],
+                           total_width: int, total_height: int) -> str:
+        """Place cells with hstack/vstack and add the gaps and label margins once.
+        
+        The stacked grid body is padded into the labeled canvas. The geometry matches
+        calculate_grid_dimensions.
+        """
+        body = self.build_stack_body(filter_parts, cell_streams)
+        return self.pad_body_to_canvas(filter_parts, body, total_width, total_height)
+    
+    def pad_body_to_canvas(self, filter_parts: List[str], body: str,
+                           total_width: int, total_height: int) -> str:
+        """Pad a grid body (cells and gaps only) into the labeled canvas."""
+        x_pos, y_pos = self.cell_position(0, 0)
+        filter_parts.append(f"{body}pad={total_width}:{total_height}:{x_pos}:{y_pos}:black[grid_body]")
+        return "[grid_body]"
+    
+    def build_stack_body(self, filter_parts: List[str], cell_streams: List[List[str]]) -> str:
+        """Stack cells into the grid body, with the grid padding between cells and none around it.
+        
+        Each cell is padded on its right and bottom edge by the grid padding, cells are
+        hstacked into rows, rows are vstacked and the trailing padding is cropped off.
+        """
+        rows = len(cell_streams)
+        cols = len(cell_streams[0])
+        step = self.thumbnail_size + self.padding
+        
+        row_outputs = []
+        for i, row in enumerate(cell_streams):
+            padded = []
+            for j, cell_stream in enumerate(row):
+                label = f"[padded_{i}_{j}]"
+                filter_parts.append(f"{cell_stream}pad={step}:{step}:0:0:black{label}")
+                padded.append(label)
+            
+            if cols > 1:
+                row_label = f"[row_{i}]"
+                filter_parts.append(f"{''.join(padded)}hstack=inputs={cols}{row_label}")
+                row_outputs.append(row_label)
+            else:
+                row_outputs.append(padded[0])
+        
+        if rows > 1:
+            filter_parts.append(f"{''.join(row_outputs)}vstack=inputs={rows}[stacked]")
+            stacked = "[stacked]"
+        else:
+            stacked = row_outputs[0]
+        
+        grid_width = cols * step - self.padding
+        grid_height = rows * step - self.padding
+        filter_parts.append(f"{stacked}crop={grid_width}:{grid_height}:0:0[stack_body]")
+        return "[stack_body]"
+    
+    @staticmethod
+    def escape_drawtext(text) -> str:
+        """Quote text for a drawtext option inside a filtergraph.
+        
+        Backslashes, quotes and colons are escaped for the option parser, then the value is
+        single-quoted for the filtergraph parser, so schedule values such as 0: (0.4) work.
+        """
+        value = str(text).replace('\\', '\\\\').replace("'", "\\'").replace(':', '\\:')
+        return "'" + value.replace("'", "'\\''") + "'"
+    
+    def drawtext(self, text, font_size: int, x: str, y: str) -> str:
+        """One boxed drawtext filter in the grid label style."""
+        return (f"drawtext=text={self.escape_drawtext(text)}:expansion=none:fontsize={font_size}:"
+                f"fontcolor={self.text_color}:box=1:boxcolor={self.text_bg_color}:x={x}:y={y}")
+    
+    def build_label_filters(self, rows: int, total_width: int, total_height: int,
+                            x_labels: List[str], y_labels: List[str],
+                            x_param_name: str, y_param_name: str, title: str = '') -> List[str]:
+        """Build drawtext filters for axis value labels and parameter names."""
+        text_filters = []
+        
+        # Add X-axis value labels (below parameter name)
+        for j, label in enumerate(x_labels):
+            x_pos = self.left_margin + j * (self.thumbnail_size + self.padding) + self.thumbnail_size // 2
+            y_pos = self.text_height + 5
+            text_filters.append(self.drawtext(label, self.font_size, f"{x_pos}-text_w/2", str(y_pos)))
+        
+        # Add Y-axis value labels (horizontal on left with increased margin)
+        for i, label in enumerate(y_labels):
+            x_pos = 50  # Positioned in the left margin
+            y_pos = self.text_height + self.param_name_height + self.padding + i * (self.thumbnail_size + self.padding) + self.thumbnail_size // 2
+            text_filters.append(self.drawtext(label, self.font_size, str(x_pos), f"{y_pos}-text_h/2"))
+        
+        # Add X parameter name at top center
+        if x_param_name:
+            x_param_x = total_width // 2
+            x_param_y = 5
+            text_filters.append(self.drawtext(x_param_name, self.font_size + 2, f"{x_param_x}-text_w/2", str(x_param_y)))
+        
+        # Add Y parameter name horizontally on left side
+        if y_param_name and rows > 1:
+            y_param_x = 5
+            y_param_y = total_height // 2 - self.font_size
+            text_filters.append(self.drawtext(y_param_name, self.font_size + 2, str(y_param_x), str(y_param_y)))
+        
+        # Add page title (Z value) in the top-left corner
+        if title:
+            text_filters.append(self.drawtext(title, self.font_size, '5', '5'))
+        
+        return text_filters
+    
+    def render_label_layer(self, text_filters: List[str], total_width: int, total_height: int,
+                           layer_path: Path) -> bool:
+        """Rasterize all labels once into a transparent PNG the size of the grid canvas."""
+        cached = bool(self.cell_cache) and layer_path.parent == self.cell_cache.cache_dir
+        if cached and self.cell_cache.lookup(layer_path) or layer_path.exists():
+            return True
+        tmp_path = layer_path.with_name(f"{layer_path.stem}.{threading.get_ident()}.tmp.png")
+        cmd = [
+            self.ffmpeg_path,
+            '-f', 'lavfi',
+            '-i', f'color=c=black@0.0:size={total_width}x{total_height}:rate=1,format=rgba',
+            '-vf', ','.join(text_filters),
+            '-frames:v', '1',
+            '-y', str(tmp_path)
+        ]
+        try:
+            result = self.run_ffmpeg(cmd, 60, 'labels', layer_path)
+        except subprocess.TimeoutExpired:
+            return False
+        if result.returncode != 0 or not tmp_path.exists():
+            if tmp_path.exists():
+                tmp_path.unlink()
+            print(f"Warning: Could not pre-render labels, drawing them per frame: {result.stderr.decode(errors='replace')[-300:]}")
+            return False
+        if cached:
+            self.cell_cache.store(tmp_path, layer_path)
+        else:
+            os.replace(tmp_path, layer_path)
+        return True
+    
+    def label_layer(self, text_filters: List[str], total_width: int,
+                    total_height: int) -> Tuple[Optional[Path], Optional[Path]]:
+        """Return (label PNG, temporary folder to remove afterwards).
+        
+        The PNG is kept in the cell cache, keyed by the label filters, when caching is on.
+        The PNG is None if it could not be rendered.
+        """
+        label_dir = None
+        if self.cell_cache:
+            layer_key = self.cell_cache._digest(*text_filters, total_width, total_height)
+            layer_path = self.cell_cache.cache_dir / f"labels_{layer_key}.png"
+        else:
+            label_dir = Path(tempfile.mkdtemp())
+            layer_path = label_dir / "labels.png"
+        
+        if not self.render_label_layer(text_filters, total_width, total_height, layer_path):
+            return None, label_dir
+        return layer_path, label_dir
+    
+    def cached_body_path(self, resized_videos: List[List[Path]], max_duration: float) -> Optional[Path]:
+        """Cache location of the unlabeled grid body, if every cell is a cached cell or empty.
+        
+        The body is built with hstack/vstack, so it is only cached for the stack compositor;
+        --compositor overlay always composes the page from its cells.
+        """
+        if not self.cell_cache or self.compositor != 'stack':
+            return None
+        cells = []
+        for row in resized_videos:
+            for path in row:
+                if path.parent == self.cell_cache.cache_dir:
+                    cells.append(path.name)
+                elif path.name == 'placeholder.mp4':
+                    cells.append('empty')
+                else:
+                    return None
+        key = self.cell_cache._digest(len(resized_videos), len(resized_videos[0]), *cells, self.padding,
+                                      self.thumbnail_size, self.fps, f"{max_duration:.3f}",
+                                      ' '.join(self.cell_encoder_args()))
+        return self.cell_cache.cache_dir / f"body_{key}.mp4"
+    
+    def compose_grid(self, inputs: List[str], cell_filters: List[str], cell_streams: List[List[str]],
+                     page: Dict, max_duration: float, threads: int = 0) -> bool:
+        """Overlay prepared cell streams onto a labeled canvas and encode the grid video."""
+        rows = len(cell_streams)
+        cols = len(cell_streams[0])
+        
+        # Calculate final dimensions
+        total_width, total_height = self.calculate_grid_dimensions(rows, cols)
+        
+        # Build FFmpeg filter complex for grid with padding and labels
+        filter_parts = list(cell_filters)
+        
+        if self.compositor == 'stack':
+            grid_output = self.build_stack_layout(filter_parts, cell_streams, total_width, total_height)
+        else:
+            grid_output = self.build_overlay_layout(filter_parts, cell_streams, total_width, total_height,
+                                                    max_duration)
+        
+        return self.encode_grid(inputs, filter_parts, grid_output, page, rows, cols, max_duration, threads)
+    
+    @staticmethod
+    def ladder_path(output_path: Path, spec: Dict) -> Path:
+        """File name of a --ladder output next to the main grid: <stem>_<name>.<format>."""
+        output_path = Path(output_path)
+        return output_path.with_name(f"{output_path.stem}_{spec['name']}.{spec['format']}")
+    
+    def add_ladder_outputs(self, filter_parts: List[str], stream: str, output_path: Path) -> Tuple[str, List[str]]:
+        """Split a finished grid stream into the main output plus one branch per --ladder output.
+        
+        Returns the stream label to map to the main output and the output arguments of the
+        ladder outputs, which are appended after the main output of the same command. The grid
+        is decoded and composited once; each branch only rescales, retimes and encodes.
+        """
+        if not self.ladder:
+            return stream, []
+        
+        branches = ''.join(f"[ladder_{k}]" for k in range(len(self.ladder)))
+        filter_parts.append(f"{stream}split={len(self.ladder) + 1}[ladder_main]{branches}")
+        
+        output_args = []
+        for k, spec in enumerate(self.ladder):
+            chain = [f"fps={spec['fps'] or self.fps}"]
+            if spec['width']:
+                # Never upscale a grid that is already narrower than the requested width
+                chain.append(f"scale='min({spec['width']},iw)':-2:flags=lanczos")
+            label = f"[ladder_{k}_out]"
+            if spec['format'] == 'gif':
+                filter_parts.append(f"[ladder_{k}]{','.join(chain)},split[ladder_{k}_a][ladder_{k}_b];"
+                                    f"[ladder_{k}_a]palettegen[ladder_{k}_p];"
+                                    f"[ladder_{k}_b][ladder_{k}_p]paletteuse{label}")
+            else:
+                filter_parts.append(f"[ladder_{k}]{','.join(chain)}{label}")
+            
+            codec_args = list(LADDER_CODECS[spec['format']])
+            if spec.get('codec'):
+                if '-c:v' in codec_args:
+                    codec_args[codec_args.index('-c:v') + 1] = spec['codec']
+                else:
+                    codec_args[:0] = ['-c:v', spec['codec']]
+            if spec.get('crf') is not None:
+                if '-crf' in codec_args:
+                    codec_args[codec_args.index('-crf') + 1] = str(spec['crf'])
+                else:
+                    codec_args.extend(['-crf', str(spec['crf'])])
+            
+            path = self.ladder_path(output_path, spec)
+            print(f"Also writing {spec['name']}: {path}")
+            output_args.extend(['-map', label] + codec_args + ['-y', str(path)])
+        
+        return "[ladder_main]", output_args
+    
+    def encode_grid(self, inputs: List[str], filter_parts: List[str], grid_output: str, page: Dict,
+                    rows: int, cols: int, max_duration: float, threads: int = 0,
+                    extra_output: Optional[List[str]] = None) -> bool:
+        """Add labels to a composed grid stream and encode the grid video.
+        
+        Labels are rasterized once into a transparent PNG and laid over the grid with a single
+        overlay; drawtext filters are only applied per frame if the PNG cannot be made.
+        extra_output holds the arguments of a second output written by the same run; --ladder
+        outputs are split off the labeled stream of the same run as well.
+        """
+        output_path = page['output_path']
+        x_param_name = page['x_param_name']
+        y_param_name = page['y_param_name']
+        total_width, total_height = self.calculate_grid_dimensions(rows, cols)
+        
+        # Add text labels
+        text_filters = self.build_label_filters(rows, total_width, total_height, page['x_labels'], page['y_labels'],
+                                                x_param_name, y_param_name, page['title'])
+        
+        label_dir = None
+        output_mapping = grid_output
+        if text_filters:
+            layer_path, label_dir = self.label_layer(text_filters, total_width, total_height)
+            if layer_path:
+                label_index = inputs.count('-i')
+                inputs = inputs + ['-i', str(layer_path)]
+                filter_parts.append(f"{grid_output}[{label_index}:v]overlay=0:0[final]")
+            else:
+                filter_parts.append(f"{grid_output}{','.join(text_filters)}[final]")
+            output_mapping = "[final]"
+        ladder_args = []
+        if page.get('ladder', True):
+            output_mapping, ladder_args = self.add_ladder_outputs(filter_parts, output_mapping, output_path)
+        
+        # Build complete FFmpeg command
+        cmd = [self.ffmpeg_path] + inputs + [
+            '-filter_complex', ';'.join(filter_parts),
+            '-map', f'{output_mapping}',
+        ] + self.output_encoder_args() + [
+            '-r', str(self.fps),
+        ]
+        if threads:
+            cmd.extend(['-threads', str(threads)])
+        cmd.extend(['-y', str(output_path)])
+        if extra_output:
+            cmd.extend(extra_output)
+        cmd.extend(ladder_args)
+        
+        print(f"Creating grid video: {output_path}")
+        print(f"Grid layout: {rows}x{cols}")
+        print(f"Duration: {max_duration:.2f}s")
+        print(f"Final dimensions: {total_width}x{total_height}")
+        print(f"Parameters: X={x_param_name}, Y={y_param_name}")
+        print(f"Using FFmpeg: {self.ffmpeg_path}")
+        
+        try:
+            result = self.run_ffmpeg(cmd, self.compose_timeout(inputs.count('-i'), max_duration),
+                                     'compose', page['output_path'])
+        except subprocess.TimeoutExpired:
+            print("FFmpeg error: grid composition timed out")
+            return False
+        finally:
+            if label_dir:
+                shutil.rmtree(label_dir, ignore_errors=True)
+        
+        if result.returncode != 0:
+            print(f"FFmpeg error: {result.stderr.decode(errors='replace')}")
+        
+        return result.returncode == 0
+    
+    def generate_grid(self, output_path: Optional[str] = None) -> bool:
+        """Main method to generate video grid."""
+        if not self.batch_dir.exists():
+            print(f"Error: Batch directory {self.batch_dir} does not exist")
+            return False
+        
+        # Find video files, probing metadata while the scan is still running
+        print(f"Scanning {self.batch_dir} for video files...")
+        video_files = []
+        with self.profiler.span('scan', stage=True), ThreadPoolExecutor(max_workers=self.jobs) as executor:
+            for video_path, params in self.iter_video_files():
+                video_files.append((video_path, params))
+                if video_path and self.media_index.lookup(video_path) is None:
+                    executor.submit(self.media_index.get, video_path)
+        self.media_index.save()
+        with self.profiler.span('parameters', stage=True):
+            self.resolve_settings_parameters(video_files)
+            table = ParameterTable(video_files)
+            if self.where:
+                rows = self.filter_rows(table)
+                if rows is None:
+                    return False
+                if not rows:
+                    print("No runs match the --where filters")
+                    return False
+                print(f"--where filters kept {len(rows)} of {len(video_files)} runs")
+                video_files = [video_files[row] for row in rows]
+                table = ParameterTable(video_files)
+            if not self.resolve_axes(table):
+                return False
+        
+        found_count = sum(1 for video_path, _ in video_files if video_path)
+        if not found_count:
+            print("No video files found in batch subdirectories")
+            return False
+        
+        print(f"Found {found_count} video files")
+        if found_count < len(video_files):
+            print(f"Pending runs shown as placeholders: {len(video_files) - found_count}")
+        
+        # Generate output filename if not provided
+        if not output_path:
+            batch_name = self.batch_dir.name
+            output_path = self.batch_dir / f"{batch_name}_grid.mp4"
+        else:
+            output_path = Path(output_path)
+        if self.preview:
+            output_path = output_path.with_name(f"{output_path.stem}_preview.{self.preview_format}")
+        
+        # Sweeps with a third varying parameter get one grid page per Z value
+        with self.profiler.span('layout', stage=True):
+            param_space = self.discover_parameter_space(video_files, table)
+            z_layout = self.organize_z_pages(video_files, param_space) if self.z_mode != 'off' else None
+            if not z_layout:
+                # Organize grid layout
+                grid, x_labels, y_labels, x_param_name, y_param_name = self.organize_grid_layout(
+                    video_files, param_space=param_space)
+        if z_layout:
+            return self.generate_z_grids(z_layout, output_path)
+        
+        if not grid:
+            print("Could not organize videos into grid")
+            return False
+        
+        # Create grid video
+        success = self.create_grid_video(grid, output_path, x_labels, y_labels, x_param_name, y_param_name)
         
         if success:
             print(f"Grid video created successfully: {output_path}")
@@ -804,6 +3178,340 @@ class DeforumVideoGrid:
         else:
             print("Failed to create grid video")
             return False
+    
+    def benchmark_profiles(self, profiles: Optional[List[str]] = None) -> bool:
+        """Render the grid once per encoder profile and report wall time and output size."""
+        profiles = profiles or list(ENCODER_PROFILES)
+        original_profile = self.profile
+        original_cache = self.cell_cache
+        bench_dir = Path(tempfile.mkdtemp())
+        # Cached cells would hide the intermediate encode cost
+        self.cell_cache = None
+        results = []
+        try:
+            for profile in profiles:
+                self.profile = profile
+                output_path = bench_dir / f"grid_{profile}.mp4"
+                start = time.perf_counter()
+                ok = self.generate_grid(str(output_path))
+                elapsed = time.perf_counter() - start
+                size = sum(p.stat().st_size for p in bench_dir.glob(f"grid_{profile}*.mp4")) if ok else 0
+                results.append((profile, ok, elapsed, size))
+        finally:
+            self.profile = original_profile
+            self.cell_cache = original_cache
+            shutil.rmtree(bench_dir, ignore_errors=True)
+        
+        print("\n" + "=" * 60)
+        print(f"{'Profile':<10} {'Status':<8} {'Wall time':>10} {'Size':>12}")
+        for profile, ok, elapsed, size in results:
+            status = "ok" if ok else "FAILED"
+            print(f"{profile:<10} {status:<8} {elapsed:>9.1f}s {size / (1024 * 1024):>10.2f}MB")
+        return all(ok for _, ok, _, _ in results)
+    
+    def generate_z_grids(self, z_layout, output_path: Path) -> bool:
+        """Render one grid per Z value concurrently, optionally joining them into one video."""
+        z_param_name, z_pages, axes, param_space = z_layout
+        
+        pages = []
+        for z_label, page_files in z_pages:
+            grid, x_labels, y_labels, x_param_name, y_param_name = self.organize_grid_layout(
+                page_files, axes=axes, param_space=param_space)
+            safe_label = re.sub(r'[^\w.\-]+', '-', z_label)
+            page_path = output_path.with_name(f"{output_path.stem}_z_{z_param_name}_{safe_label}{output_path.suffix}")
+            pages.append(self.make_page(grid, page_path, x_labels, y_labels, x_param_name, y_param_name,
+                                        title=f"{z_param_name} = {z_label}",
+                                        ladder=self.z_mode not in ('tile', 'sequence')))
+        
+        results = self.render_pages(pages)
+        for page, ok in zip(pages, results):
+            status = "created" if ok else "FAILED"
+            print(f"Grid page {status}: {page['output_path']}")
+        
+        if not all(results):
+            print("Failed to create some grid pages")
+            return False
+        
+        if self.z_mode in ('tile', 'sequence'):
+            with self.profiler.span('combine', stage=True):
+                combined = self.combine_pages([page['output_path'] for page in pages], output_path, self.z_mode)
+            if not combined:
+                print("Failed to combine grid pages")
+                return False
+            print(f"Grid video created successfully: {output_path}")
+        
+        return True
+
+class GridWatcher:
+    """Poll a batch folder while a sweep renders, renaming finished videos and refreshing the grid.
+    
+    A video counts as finished once its size and mtime are unchanged between two polls. The
+    grid is rebuilt once no new video has finished for the debounce period; cached cells mean
+    only the new cells are encoded again.
+    """
+    
+    def __init__(self, generator: 'DeforumVideoGrid', output_path: Optional[str] = None,
+                 interval: float = 5.0, debounce: float = 30.0, rename: bool = True):
+        self.generator = generator
+        self.output_path = output_path
+        self.interval = interval
+        self.debounce = debounce
+        self.renamer = self._load_renamer() if rename else None
+        self.last_stat = {}
+        self.finished = set()
+        self.last_change = 0.0
+        self.dirty = False
+        
+        generator.include_pending = True
+    
+    @staticmethod
+    def _load_renamer():
+        """Import the batch renamer that sits next to this folder in the repository."""
+        renamer_dir = Path(__file__).resolve().parent.parent / 'batch-renamer'
+        if str(renamer_dir) not in sys.path:
+            sys.path.append(str(renamer_dir))
+        try:
+            import deforum_video_renamer
+            return deforum_video_renamer
+        except ImportError:
+            print(f"Warning: deforum_video_renamer.py not found in {renamer_dir}, videos will not be renamed")
+            return None
+    
+    def poll(self) -> Tuple[List[str], List[str]]:
+        """Return (newly finished, still being written) videos."""
+        generator = self.generator
+        current = {}
+        for _, video_path, _ in generator._scan_folders(str(generator.batch_dir), 0):
+            if not video_path:
+                continue
+            try:
+                stat = os.stat(video_path)
+            except OSError:
+                continue
+            current[video_path] = (stat.st_size, stat.st_mtime_ns)
+        
+        new_finished = []
+        writing = []
+        for video_path, stat in current.items():
+            if video_path in self.finished:
+                continue
+            if stat[0] > 0 and self.last_stat.get(video_path) == stat:
+                new_finished.append(video_path)
+            else:
+                writing.append(video_path)
+        self.last_stat = current
+        return new_finished, writing
+    
+    def rename(self, video_path: str) -> str:
+        """Rename a finished timestamp video to its folder name, returning the path to use."""
+        folder_name = os.path.basename(os.path.dirname(video_path))
+        if (not self.renamer or not TIMESTAMP_VIDEO_RE.match(os.path.basename(video_path))
+                or not self.renamer.is_timestamp_folder(folder_name)):
+            return video_path
+        status, new_path = self.renamer.rename_video_to_folder(
+            Path(video_path), self.renamer.extract_timestamp_from_folder(folder_name))
+        return str(new_path) if status == 'renamed' else video_path
+    
+    def step(self) -> bool:
+        """Run one poll, refreshing the grid when due. Returns True if the grid was rebuilt."""
+        new_finished, writing = self.poll()
+        for video_path in new_finished:
+            final_path = self.rename(video_path)
+            self.finished.add(final_path)
+            print(f"Finished: {final_path}")
+        if new_finished:
+            self.dirty = True
+            self.last_change = time.monotonic()
+        
+        if not self.dirty or time.monotonic() - self.last_change < self.debounce:
+            return False
+        
+        self.generator.ignored_videos = set(writing)
+        print(f"Refreshing grid ({len(self.finished)} finished, {len(writing)} still writing)...")
+        self.generator.generate_grid(self.output_path)
+        self.dirty = False
+        return True
+    
+    def run(self) -> bool:
+        """Watch until interrupted, then rebuild the grid once more if anything changed."""
+        print(f"Watching {self.generator.batch_dir} (poll every {self.interval:g}s, "
+              f"refresh after {self.debounce:g}s without new videos). Press Ctrl+C to stop.")
+        try:
+            while True:
+                self.step()
+                time.sleep(self.interval)
+        except KeyboardInterrupt:
+            print("\nStopping watch")
+            ProcessRunner.shared().resume()
+        if self.dirty:
+            self.generator.ignored_videos = set()
+            return self.generator.generate_grid(self.output_path)
+        return True
+
+class MultiBatchRunner:
+    """Build grids for many batch directories on one shared FFmpeg worker budget.
+    
+    Batches are started shortest first (by total source video size), and all of their
+    resize and compose jobs compete for the same slots with the same ordering. A batch that
+    fails is reported and does not stop the others.
+    """
+    
+    def __init__(self, roots: List[str], generator_options: Dict, jobs: int, batch_workers: int = 0):
+        self.roots = [Path(root) for root in roots]
+        self.generator_options = generator_options
+        self.jobs = max(1, jobs)
+        self.batch_workers = batch_workers or self.jobs
+        self.budget = WorkerBudget(self.jobs)
+    
+    @staticmethod
+    def is_batch(directory: Path) -> bool:
+        """A batch has run folders (or z_<param>_<value> groups) directly inside.
+        
+        Only renamed or timestamp videos count, so a folder holding other batches and their
+        grid outputs is not mistaken for a batch.
+        """
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if not entry.is_dir() or entry.name.startswith('.'):
+                        continue
+                    if Z_GROUP_RE.match(entry.name):
+                        return True
+                    video_path, _ = DeforumVideoGrid._pick_folder_files(entry.path, entry.name, False)
+                    if video_path and (os.path.basename(video_path) == f"{entry.name}.mp4"
+                                       or TIMESTAMP_VIDEO_RE.match(os.path.basename(video_path))):
+                        return True
+        except OSError:
+            pass
+        return False
+    
+    def discover_batches(self) -> List[Path]:
+        """Use each root that is a batch itself, otherwise the batches directly inside it."""
+        batches = []
+        for root in self.roots:
+            if self.is_batch(root):
+                batches.append(root)
+                continue
+            try:
+                children = sorted(Path(entry.path) for entry in os.scandir(root)
+                                  if entry.is_dir() and not entry.name.startswith('.'))
+            except OSError as e:
+                print(f"Warning: Could not scan {root}: {e}")
+                continue
+            found = [child for child in children if self.is_batch(child)]
+            if not found:
+                print(f"Warning: No batches found in {root}")
+            batches.extend(found)
+        # A batch reached through two roots is built once
+        return list(dict.fromkeys(batch.resolve() for batch in batches))
+    
+    @staticmethod
+    def estimate_cost(batch_dir: Path) -> int:
+        """Total bytes of source videos, a cheap stand-in for decode and encode work."""
+        total = 0
+        for root, dirs, files in os.walk(batch_dir):
+            dirs[:] = [d for d in dirs if not d.startswith('.')]
+            for name in files:
+                if name.endswith('.mp4') and '_grid' not in name:
+                    try:
+                        total += os.path.getsize(os.path.join(root, name))
+                    except OSError:
+                        pass
+        return total
+    
+    def run_batch(self, batch_dir: Path, cost: int) -> Dict:
+        start = time.perf_counter()
+        report = {'batch': str(batch_dir), 'cost_mb': cost / (1024 * 1024), 'ok': False, 'error': None}
+        try:
+            generator = DeforumVideoGrid(str(batch_dir), worker_budget=self.budget, priority=cost,
+                                         **self.generator_options)
+            report['ok'] = generator.generate_grid()
+            if not report['ok']:
+                report['error'] = 'grid generation failed (see log above)'
+        except Exception as e:
+            report['error'] = f"{type(e).__name__}: {e}"
+        report['seconds'] = time.perf_counter() - start
+        return report
+    
+    def run(self) -> List[Dict]:
+        batches = self.discover_batches()
+        if not batches:
+            print("No batch directories found")
+            return []
+        
+        costs = {batch: self.estimate_cost(batch) for batch in batches}
+        ordered = sorted(batches, key=lambda batch: costs[batch])
+        print(f"Found {len(ordered)} batches; running up to {self.jobs} FFmpeg jobs at once, smallest batches first")
+        
+        reports = []
+        workers = min(self.batch_workers, len(ordered))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(self.run_batch, batch, costs[batch]) for batch in ordered]
+            for future in as_completed(futures):
+                reports.append(future.result())
+        
+        order = {str(batch): index for index, batch in enumerate(ordered)}
+        reports.sort(key=lambda report: order[report['batch']])
+        return reports
+    
+    @staticmethod
+    def print_report(reports: List[Dict]):
+        print("\n" + "=" * 60)
+        print(f"{'Batch':<40} {'Status':<8} {'Size':>9} {'Time':>9}")
+        for report in reports:
+            name = Path(report['batch']).name
+            if len(name) > 40:
+                name = name[:37] + '...'
+            status = 'ok' if report['ok'] else 'FAILED'
+            print(f"{name:<40} {status:<8} {report['cost_mb']:>7.1f}MB {report['seconds']:>8.1f}s")
+            if report['error']:
+                print(f"    {report['error']}")
+        failed = sum(1 for report in reports if not report['ok'])
+        print(f"COMPLETED: {len(reports) - failed} of {len(reports)} batch grids created")
+
+def parse_time_point(value: str) -> Tuple[float, bool]:
+    """Parse a --start/--end value: seconds, or a frame number with an 'f' suffix (e.g. 200f)."""
+    is_frame = value.lower().endswith('f')
+    try:
+        number = float(value[:-1] if is_frame else value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid time '{value}' (use seconds, or frames like 200f)")
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"time must not be negative: '{value}'")
+    return number, is_frame
+
+def parse_where(value: str) -> Tuple[str, str]:
+    """Parse a --where PARAM=VALUE filter."""
+    name, sep, raw_value = value.partition('=')
+    if not sep or not name.strip():
+        raise argparse.ArgumentTypeError(f"expected PARAM=VALUE, got '{value}'")
+    return name.strip(), raw_value.strip()
+
+def parse_ladder_spec(value: str) -> Dict:
+    """Parse a --ladder output: a preset or new name, optionally followed by :key=value options."""
+    name, _, options = value.partition(':')
+    if not re.match(r'^[\w\-]+$', name):
+        raise argparse.ArgumentTypeError(f"invalid output name '{name}'")
+    if not options and name not in LADDER_PRESETS:
+        raise argparse.ArgumentTypeError(
+            f"unknown preset '{name}' (presets: {', '.join(LADDER_PRESETS)}; or give options, e.g. {name}:width=640)")
+    
+    spec = {'name': name, 'width': 0, 'fps': 0, 'format': 'mp4', 'codec': None, 'crf': None}
+    spec.update(LADDER_PRESETS.get(name, {}))
+    for option in filter(None, options.split(':')):
+        key, sep, val = option.partition('=')
+        if not sep or key not in spec or key == 'name':
+            raise argparse.ArgumentTypeError(f"invalid option '{option}' (use width, fps, format, codec or crf)")
+        if key in ('width', 'fps', 'crf'):
+            try:
+                spec[key] = int(val)
+            except ValueError:
+                raise argparse.ArgumentTypeError(f"{key} must be an integer: '{val}'")
+        else:
+            spec[key] = val
+    if spec['format'] not in LADDER_CODECS:
+        raise argparse.ArgumentTypeError(f"unsupported format '{spec['format']}' (use {', '.join(LADDER_CODECS)})")
+    return spec
 
 def main():
     parser = argparse.ArgumentParser(
@@ -814,12 +3522,38 @@ Examples:
   python deforum_video_grid.py batch_folder
   python deforum_video_grid.py batch_folder -o output_grid.mp4 -s 200 -f 30
   python deforum_video_grid.py "D:/outputs/batch_20231201" --size 150 --padding 10
+  python deforum_video_grid.py "D:/outputs" --multi -j 8
+  python deforum_video_grid.py batch_folder --start 200f --end 400f --frame-step 2
+  python deforum_video_grid.py batch_folder --ladder proxy --ladder preview
+  python deforum_video_grid.py batch_folder --x cfg_scale --y seed --where strength_schedule=0.6
         """
     )
     
     parser.add_argument(
         'batch_directory',
-        help='Directory containing Deforum batch output folders'
+        nargs='+',
+        help='Directory containing Deforum batch output folders. Several directories (or '
+             '--multi) build a grid for every batch found in them'
+    )
+    
+    parser.add_argument(
+        '--multi',
+        action='store_true',
+        help='Treat the directories as roots holding many batches: every batch directly inside '
+             'gets its own grid, sharing one pool of --jobs FFmpeg processes, smallest batch first'
+    )
+    
+    parser.add_argument(
+        '--batch-workers',
+        type=int,
+        default=0,
+        help='Batches prepared at the same time in multi-batch mode (default: --jobs)'
+    )
+    
+    parser.add_argument(
+        '--report',
+        metavar='FILE',
+        help='Also write the multi-batch report as JSON'
     )
     
     parser.add_argument(
@@ -841,6 +3575,69 @@ Examples:
         help='Output video frame rate (default: 24)'
     )
     
+    parser.add_argument(
+        '--ladder',
+        action='append',
+        type=parse_ladder_spec,
+        metavar='SPEC',
+        help='Also write a smaller copy of the grid from the same FFmpeg run (repeatable). SPEC is a preset '
+             f'({", ".join(LADDER_PRESETS)}) or a name, optionally with options, e.g. '
+             'chat:width=640:fps=15:format=webm. Options: width, fps, format '
+             f'({", ".join(LADDER_CODECS)}), codec, crf. Written as <grid>_<name>.<format>'
+    )
+    
+    parser.add_argument(
+        '--farm',
+        metavar='QUEUE',
+        help='Hand two-stage cell resizes to grid_farm.py workers through QUEUE: a directory shared '
+             'with the workers, or tcp://host:port to serve the queue from this process'
+    )
+    
+    parser.add_argument(
+        '--farm-lease',
+        type=float,
+        default=60.0,
+        help='Seconds a worker may go without a heartbeat before its cell is handed to another '
+             'worker, and that a cell a worker could not read waits for another worker before it is '
+             'resized here (default: 60)'
+    )
+    
+    parser.add_argument(
+        '--farm-attempts',
+        type=int,
+        default=3,
+        help='Attempts per cell before the coordinator resizes it itself (default: 3)'
+    )
+    
+    parser.add_argument(
+        '--farm-timeout',
+        type=float,
+        default=0.0,
+        help='Resize cells still outstanding after this many seconds locally (default: wait for workers)'
+    )
+    
+    parser.add_argument(
+        '--start',
+        type=parse_time_point,
+        metavar='TIME',
+        help='Start each clip at TIME seconds, or at a frame number like 200f (source frame rate). '
+             'Seeks before decoding, so skipped frames are never decoded'
+    )
+    
+    parser.add_argument(
+        '--end',
+        type=parse_time_point,
+        metavar='TIME',
+        help='End each clip at TIME seconds, or at a frame number like 400f'
+    )
+    
+    parser.add_argument(
+        '--frame-step',
+        type=int,
+        default=1,
+        help='Keep every Nth frame of each clip, shortening the grid N times (default: 1)'
+    )
+    
     parser.add_argument(
         '-p', '--padding',
         type=int,
@@ -853,19 +3650,328 @@ Examples:
         help='Custom path to FFmpeg executable'
     )
     
+    parser.add_argument(
+        '--depth',
+        type=int,
+        default=0,
+        help='How many folder levels below a folder without videos to search (default: 0)'
+    )
+    
+    parser.add_argument(
+        '--include',
+        action='append',
+        metavar='PATTERN',
+        help='Only use run folders whose name matches this glob pattern (repeatable)'
+    )
+    
+    parser.add_argument(
+        '--exclude',
+        action='append',
+        metavar='PATTERN',
+        help='Skip run folders whose name matches this glob pattern (repeatable)'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running while a sweep renders: rename each finished timestamp video to its '
+             'folder name and rebuild the grid, with pending runs as placeholders'
+    )
+    
+    parser.add_argument(
+        '--watch-interval',
+        type=float,
+        default=5.0,
+        help='Seconds between folder polls in watch mode (default: 5)'
+    )
+    
+    parser.add_argument(
+        '--debounce',
+        type=float,
+        default=30.0,
+        help='Seconds without a newly finished video before the grid is rebuilt in watch mode '
+             '(default: 30)'
+    )
+    
+    parser.add_argument(
+        '--no-rename',
+        action='store_true',
+        help='Do not rename finished videos in watch mode'
+    )
+    
+    parser.add_argument(
+        '--preview',
+        choices=['sheet', 'animated'],
+        help='Skip full encoding and make a quick preview: a labeled still contact sheet, '
+             'or a low-fps animated WebP/GIF, from frames grabbed with fast seeking'
+    )
+    
+    parser.add_argument(
+        '--preview-frames',
+        type=int,
+        default=0,
+        help='Frames sampled per cell: tiled inside each cell for sheets, played in order for '
+             'animated previews (default: 1 for sheet, 12 for animated)'
+    )
+    
+    parser.add_argument(
+        '--preview-fps',
+        type=int,
+        default=4,
+        help='Frame rate of animated previews (default: 4)'
+    )
+    
+    parser.add_argument(
+        '--preview-format',
+        choices=['png', 'jpg', 'webp', 'gif'],
+        help='Preview file format (default: png for sheet, webp for animated)'
+    )
+    
+    parser.add_argument(
+        '--profile',
+        choices=list(ENCODER_PROFILES),
+        default='standard',
+        help='Encoder profile: ' + '; '.join(f"{name} = {p['description']}" for name, p in ENCODER_PROFILES.items())
+             + ' (default: standard)'
+    )
+    
+    parser.add_argument(
+        '--benchmark-profiles',
+        action='store_true',
+        help='Render the grid with every encoder profile into a temporary folder and '
+             'print wall time and file size for each'
+    )
+    
+    parser.add_argument(
+        '--max-decoders',
+        type=int,
+        default=64,
+        help='Most input videos open at once; larger grids are composed as strips of at most '
+             'this many cells, which are then stacked (0 disables strips, default: 64)'
+    )
+    
+    parser.add_argument(
+        '--x',
+        metavar='PARAM',
+        help='Parameter for the columns (exact name or a unique part of it; default: strength '
+             'schedule, else the parameter set by the most runs)'
+    )
+    
+    parser.add_argument(
+        '--y',
+        metavar='PARAM',
+        help='Parameter for the rows (default: CFG scale schedule, else the next most common parameter)'
+    )
+    
+    parser.add_argument(
+        '--z',
+        metavar='PARAM',
+        help='Parameter to split into one grid page per value (default: only when three or more '
+             'parameters vary)'
+    )
+    
+    parser.add_argument(
+        '--where',
+        action='append',
+        type=parse_where,
+        metavar='PARAM=VALUE',
+        help='Only use runs whose PARAM equals VALUE (repeatable; repeating a parameter '
+             'accepts any of its values, different parameters must all match)'
+    )
+    
+    parser.add_argument(
+        '--z-mode',
+        choices=['pages', 'tile', 'sequence', 'off'],
+        default='pages',
+        help='How to render a third varying parameter: one grid per Z value (pages), pages plus '
+             'one video with pages stacked (tile) or played one after another (sequence), '
+             'or ignore it (off) (default: pages)'
+    )
+    
+    parser.add_argument(
+        '--no-settings',
+        action='store_true',
+        help='Ignore Deforum *_settings.txt files and read parameters from folder names only'
+    )
+    
+    parser.add_argument(
+        '--rescan-ffmpeg',
+        action='store_true',
+        help='Ignore the cached FFmpeg location and run detection again'
+    )
+    
+    parser.add_argument(
+        '--trace',
+        metavar='FILE',
+        help='Profile the run: write per-stage and per-FFmpeg-process timings, child CPU time, '
+             'peak memory and speed as a Chrome trace JSON file (open in chrome://tracing or '
+             'Perfetto) and print a summary'
+    )
+    
+    parser.add_argument(
+        '-v', '--verbose',
+        action='store_true',
+        help='Print detailed FFmpeg detection output'
+    )
+    
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Number of videos to resize in parallel, and the most FFmpeg/FFprobe processes '
+             'running at once (default: CPU core count)'
+    )
+    
+    parser.add_argument(
+        '--engine',
+        choices=['two-stage', 'single-pass', 'numpy'],
+        default='two-stage',
+        help='two-stage resizes cells to temporary files first; single-pass scales cells '
+             'inside one filtergraph; numpy composites raw frames piped from per-cell decoders '
+             '(requires NumPy). Both fall back to two-stage on failure (default: two-stage)'
+    )
+    
+    parser.add_argument(
+        '--compositor',
+        choices=['overlay', 'stack'],
+        default='overlay',
+        help='overlay chains one overlay per cell onto the canvas; stack places cells with '
+             'hstack/vstack and pads the margins once (default: overlay)'
+    )
+    
+    parser.add_argument(
+        '--no-index',
+        action='store_true',
+        help=f'Do not read or write the media and settings indexes ({MediaIndex.INDEX_FILENAME}, '
+             f'{SettingsIndex.INDEX_FILENAME})'
+    )
+    
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help=f'Do not reuse or store resized cells in {CellCache.CACHE_DIRNAME}'
+    )
+    
+    parser.add_argument(
+        '--cache-size',
+        type=int,
+        default=2048,
+        help='Maximum size of the resized cell cache in MB (default: 2048)'
+    )
+    
     args = parser.parse_args()
     
-    # Create grid generator
-    generator = DeforumVideoGrid(
-        batch_dir=args.batch_directory,
+    if args.frame_step < 1:
+        parser.error("--frame-step must be at least 1")
+    if args.start and args.end and args.start[1] == args.end[1] and args.end[0] <= args.start[0]:
+        parser.error("--end must be after --start")
+    if args.ladder:
+        ladder_names = [spec['name'] for spec in args.ladder]
+        if len(set(ladder_names)) < len(ladder_names):
+            parser.error("--ladder output names must be unique")
+        if args.preview:
+            print("Warning: --ladder is ignored in preview mode")
+    
+    FFmpegLocator.verbose = args.verbose
+    profiler = StageProfiler() if args.trace else None
+    ProcessRunner.shared(args.jobs).install_interrupt_handler()
+    
+    generator_options = dict(
         thumbnail_size=args.size,
         fps=args.fps,
         ffmpeg_path=args.ffmpeg_path,
-        padding=args.padding
+        padding=args.padding,
+        jobs=args.jobs,
+        engine=args.engine,
+        compositor=args.compositor,
+        use_index=not args.no_index,
+        use_cache=not args.no_cache,
+        cache_size_mb=args.cache_size,
+        rescan_ffmpeg=args.rescan_ffmpeg,
+        scan_depth=args.depth,
+        include_patterns=args.include,
+        exclude_patterns=args.exclude,
+        use_settings=not args.no_settings,
+        z_mode=args.z_mode,
+        max_decoders=args.max_decoders,
+        profile=args.profile,
+        preview=args.preview,
+        preview_frames=args.preview_frames,
+        preview_fps=args.preview_fps,
+        preview_format=args.preview_format,
+        profiler=profiler,
+        start=args.start,
+        end=args.end,
+        frame_step=args.frame_step,
+        ladder=args.ladder,
+        x_axis=args.x,
+        y_axis=args.y,
+        z_axis=args.z,
+        where=args.where
     )
     
-    # Generate grid
-    success = generator.generate_grid(args.output)
+    cell_farm = None
+    if args.farm:
+        from grid_farm import CellFarm, open_coordinator_queue
+        try:
+            queue = open_coordinator_queue(args.farm, args.farm_lease)
+        except (OSError, ValueError) as e:
+            print(f"Error: Could not open farm queue {args.farm}: {e}")
+            return 1
+        cell_farm = CellFarm(queue, max_attempts=args.farm_attempts, timeout=args.farm_timeout)
+        generator_options['cell_farm'] = cell_farm
+        print(f"Cell resizes go to grid farm workers on {queue.describe()}")
+    
+    try:
+        return run_generators(args, generator_options, profiler)
+    except KeyboardInterrupt:
+        print("\nInterrupted; running FFmpeg processes were stopped")
+        return 130
+    finally:
+        if cell_farm:
+            cell_farm.close()
+
+def run_generators(args, generator_options: Dict, profiler) -> int:
+    """Run the multi-batch, benchmark, watch or single-grid mode selected on the command line."""
+    if args.multi or len(args.batch_directory) > 1:
+        if args.output:
+            print("Warning: --output is ignored in multi-batch mode; each grid is saved in its batch folder")
+        # Locate FFmpeg once for all batches
+        generator_options['ffmpeg_path'] = args.ffmpeg_path or FFmpegLocator.find_ffmpeg(use_cache=not args.rescan_ffmpeg)
+        if not generator_options['ffmpeg_path']:
+            print("Error: FFmpeg not found. Please install FFmpeg or specify path with --ffmpeg-path")
+            return 1
+        runner = MultiBatchRunner(args.batch_directory, generator_options, args.jobs, args.batch_workers)
+        try:
+            reports = runner.run()
+        finally:
+            if profiler:
+                profiler.write(Path(args.trace))
+                print("\n" + profiler.summary())
+        runner.print_report(reports)
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(reports, f, indent=2)
+        return 0 if reports and all(report['ok'] for report in reports) else 1
+    
+    # Create grid generator
+    generator = DeforumVideoGrid(batch_dir=args.batch_directory[0], **generator_options)
+    
+    try:
+        if args.benchmark_profiles:
+            success = generator.benchmark_profiles()
+        elif args.watch:
+            watcher = GridWatcher(generator, args.output, interval=args.watch_interval,
+                                  debounce=args.debounce, rename=not args.no_rename)
+            success = watcher.run()
+        else:
+            # Generate grid
+            success = generator.generate_grid(args.output)
+    finally:
+        if profiler:
+            profiler.write(Path(args.trace))
+            print("\n" + profiler.summary())
+            print(f"Trace written to {args.trace}")
     
     return 0 if success else 1
 
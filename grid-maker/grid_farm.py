@@ -0,0 +1,743 @@
+#!/usr/bin/env python3
+"""
+Deforum Video Grid Farm
+
+Spreads the cell resizing of the grid maker over several worker processes or machines. The
+grid maker (the coordinator, started with --farm) publishes one resize job per cell to a
+queue; workers claim jobs with a lease, resize the cell with their own FFmpeg and hand the
+cell back. The coordinator composes the grid once every cell is in.
+
+A worker renews its lease while FFmpeg runs. If it dies or hangs, the lease runs out and the
+job goes back to the queue for another worker. A job that failed on every attempt, or that no
+worker finished before --farm-timeout, is resized by the coordinator itself.
+
+Two queues are supported:
+    - a directory that the coordinator and all workers can write to (local disk, NFS, SMB)
+    - tcp://host:port, served by the coordinator; workers upload finished cells over the socket
+
+Jobs name source videos by the path the coordinator sees. A worker that cannot read a source
+leaves the job for the others, so each node can serve the videos on its own disk as long as
+they are mounted at the same path. A job still unclaimed one lease period after a worker
+skipped it is resized by the coordinator, so a source no worker can read never stalls a grid.
+
+Usage:
+    python grid_farm.py QUEUE [options]                              (worker)
+    python deforum_video_grid.py batch_folder --farm QUEUE           (coordinator)
+
+Example (one machine, three workers):
+    python grid_farm.py /tmp/grid_queue -j 2 &
+    python grid_farm.py /tmp/grid_queue -j 2 &
+    python grid_farm.py /tmp/grid_queue -j 2 &
+    python deforum_video_grid.py batch_folder --farm /tmp/grid_queue
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import shutil
+import socket
+import argparse
+import itertools
+import platform
+import tempfile
+import threading
+import subprocess
+import socketserver
+from collections import deque
+from pathlib import Path
+from typing import List, Tuple, Dict, Optional, Iterator, Set
+
+from deforum_video_grid import ENCODER_PROFILES, FFmpegLocator, ProcessRunner
+
+# Same limit as a local resize in DeforumVideoGrid.resize_video
+RESIZE_TIMEOUT = 60
+
+# How often a busy slot checks whether the worker is stopping
+STOP_POLL_INTERVAL = 0.5
+
+def resize_command(ffmpeg_path: str, job: Dict, output_path: Path, threads: int = 0) -> List[str]:
+    """FFmpeg command for one resize job; matches DeforumVideoGrid.resize_video so cached cells agree."""
+    cmd = [ffmpeg_path] + job['seek'] + [
+        '-i', job['source'],
+        '-vf', job['video_filter'],
+        '-t', str(job['duration']),
+        '-r', str(job['fps']),
+    ] + ENCODER_PROFILES[job['profile']]['intermediate']
+    if threads:
+        cmd.extend(['-threads', str(threads)])
+    cmd.extend(['-y', str(output_path)])
+    return cmd
+
+def parse_tcp_address(spec: str) -> Optional[Tuple[str, int]]:
+    """Split tcp://host:port into (host, port); None for a directory queue."""
+    if not spec.startswith('tcp://'):
+        return None
+    host, _, port = spec[len('tcp://'):].rpartition(':')
+    return host or '0.0.0.0', int(port)
+
+def open_coordinator_queue(spec: str, lease_seconds: float):
+    """Open the queue the coordinator publishes to (serving it when it is a TCP address)."""
+    address = parse_tcp_address(spec)
+    if address:
+        return TcpJobQueue(address, lease_seconds)
+    return DirectoryJobQueue(spec, lease_seconds)
+
+def open_worker_queue(spec: str):
+    """Open the queue a worker claims jobs from."""
+    address = parse_tcp_address(spec)
+    if address:
+        return TcpJobClient(address)
+    return DirectoryJobQueue(spec)
+
+class DirectoryJobQueue:
+    """Job queue in a shared directory, where every state change is an atomic rename.
+    
+    pending/<id>.json                           jobs waiting for a worker
+    leased/<id>.json                            claimed jobs; mtime is the last heartbeat
+    staging/<id>.json.<owner>                   jobs being put back by whoever took them
+    done/<id>.<worker>.json, cells/<id>.<worker>.mp4   finished cells
+    failed/<id>.json                            jobs that used up their attempts
+    skipped/<id>.<worker>                       a worker could not read the job's source
+    
+    Renaming a file out of leased/ takes ownership of the job, so a coordinator expiring a
+    lease and a worker finishing late can never both win.
+    """
+    
+    STATES = ('pending', 'leased', 'staging', 'done', 'failed', 'skipped', 'cells')
+    
+    def __init__(self, root: str, lease_seconds: float = 60.0):
+        self.root = Path(root)
+        self.lease_seconds = lease_seconds
+        for state in self.STATES:
+            (self.root / state).mkdir(parents=True, exist_ok=True)
+    
+    def describe(self) -> str:
+        return str(self.root)
+    
+    def _path(self, state: str, name: str) -> Path:
+        return self.root / state / name
+    
+    def _entries(self, state: str, prefix: str = '') -> List[str]:
+        try:
+            names = sorted(os.listdir(self.root / state))
+        except OSError:
+            return []
+        return [name for name in names if name.startswith(prefix) and not name.startswith('.')]
+    
+    def _write(self, state: str, job: Dict):
+        """Write a job file atomically: hidden temporary file first, then rename."""
+        tmp_path = self._path(state, f".{job['id']}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f)
+        os.replace(tmp_path, self._path(state, f"{job['id']}.json"))
+    
+    @staticmethod
+    def _read(path: Path) -> Optional[Dict]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+    
+    @staticmethod
+    def _unlink(path: Path):
+        try:
+            path.unlink()
+        except OSError:
+            pass
+    
+    def _requeue(self, owned: Path, error: str):
+        """Put an owned job back to pending, or to failed once it is out of attempts."""
+        job = self._read(owned)
+        if job is not None:
+            job['attempts'] = job.get('attempts', 0) + 1
+            job['error'] = error
+            self._write('failed' if job['attempts'] >= job['max_attempts'] else 'pending', job)
+        self._unlink(owned)
+    
+    # Coordinator side
+    
+    def publish(self, jobs: List[Dict]):
+        for job in jobs:
+            self._write('pending', job)
+    
+    def poll(self, prefix: str) -> List[Tuple[str, str, object]]:
+        """Collect ('done', id, cell_path), ('failed', id, error) and ('skipped', id, worker) events;
+        expire stale leases."""
+        events = []
+        for name in self._entries('done', prefix):
+            job_id, worker = name[:-len('.json')].split('.', 1)
+            self._unlink(self._path('done', name))
+            events.append(('done', job_id, self._path('cells', f"{job_id}.{worker}.mp4")))
+        
+        for name in self._entries('failed', prefix):
+            path = self._path('failed', name)
+            job = self._read(path) or {}
+            self._unlink(path)
+            events.append(('failed', name[:-len('.json')], job.get('error', 'unknown error')))
+        
+        for name in self._entries('skipped', prefix):
+            job_id, worker = name.split('.', 1)
+            self._unlink(self._path('skipped', name))
+            events.append(('skipped', job_id, worker))
+        
+        now = time.time()
+        for state in ('leased', 'staging'):
+            for name in self._entries(state, prefix):
+                path = self._path(state, name)
+                try:
+                    age = now - path.stat().st_mtime
+                except OSError:
+                    continue
+                if age < self.lease_seconds:
+                    continue
+                owned = self._path('staging', f".{name}.expired")
+                try:
+                    os.rename(path, owned)
+                except OSError:
+                    continue
+                self._requeue(owned, f"lease expired after {age:.0f}s")
+        return events
+    
+    def withdraw(self, job_id: str) -> bool:
+        """Take back a job that no worker holds; False if it is leased or already finished."""
+        owned = self._path('staging', f".{job_id}.json.withdrawn")
+        try:
+            os.rename(self._path('pending', f"{job_id}.json"), owned)
+        except OSError:
+            return False
+        self._unlink(owned)
+        return True
+    
+    def cancel(self, prefix: str):
+        """Drop every file of one coordinator run, whatever state it is in."""
+        for state in self.STATES:
+            for name in self._entries(state, prefix):
+                self._unlink(self._path(state, name))
+    
+    def close(self):
+        pass
+    
+    # Worker side
+    
+    def claim(self, worker: str, skipped: Set[str]) -> Optional[Dict]:
+        for name in self._entries('pending'):
+            if name[:-len('.json')] in skipped:
+                continue
+            leased = self._path('leased', name)
+            try:
+                os.rename(self._path('pending', name), leased)
+                os.utime(leased)
+            except OSError:
+                continue
+            job = self._read(leased)
+            if job is not None:
+                return job
+        return None
+    
+    def heartbeat(self, job: Dict, worker: str) -> bool:
+        try:
+            os.utime(self._path('leased', f"{job['id']}.json"))
+            return True
+        except OSError:
+            return False
+    
+    def cell_target(self, job: Dict, worker: str) -> Path:
+        return self._path('cells', f"{job['id']}.{worker}.mp4")
+    
+    def complete(self, job: Dict, worker: str, cell_path: Path) -> bool:
+        try:
+            os.rename(self._path('leased', f"{job['id']}.json"), self._path('done', f"{job['id']}.{worker}.json"))
+            return True
+        except OSError:
+            # The lease was taken back; the job has been handed to someone else
+            self._unlink(cell_path)
+            return False
+    
+    def fail(self, job: Dict, worker: str, error: str, skip: bool = False):
+        owned = self._path('staging', f"{job['id']}.json.{worker}")
+        try:
+            os.rename(self._path('leased', f"{job['id']}.json"), owned)
+        except OSError:
+            return
+        if skip:
+            # Not this worker's fault: hand the job back without using up an attempt
+            os.replace(owned, self._path('pending', f"{job['id']}.json"))
+            self._path('skipped', f"{job['id']}.{worker}").touch()
+        else:
+            self._requeue(owned, error)
+
+class _QueueServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+class _QueueRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        self.server.job_queue.handle_request(self.rfile, self.wfile)
+
+class TcpJobQueue:
+    """Job queue held in the coordinator's memory and served over TCP.
+    
+    Each connection carries one JSON request line and gets one JSON response line. Requests
+    are claim, heartbeat, fail and complete; complete is followed by the cell's bytes, which
+    are spooled to a local directory until the coordinator adopts the cell.
+    """
+    
+    def __init__(self, address: Tuple[str, int], lease_seconds: float = 60.0):
+        self.lease_seconds = lease_seconds
+        self.lock = threading.Lock()
+        self.pending = deque()
+        self.leases = {}    # job id -> (job, worker, expiry)
+        self.skipped = {}   # job id -> workers that cannot read the source
+        self.events = []
+        self.spool_dir = Path(tempfile.mkdtemp(prefix='grid_farm_'))
+        self.server = _QueueServer(address, _QueueRequestHandler)
+        self.server.job_queue = self
+        self.address = self.server.server_address
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    
+    def describe(self) -> str:
+        return f"tcp://{self.address[0]}:{self.address[1]}"
+    
+    def _requeue(self, job: Dict, error: str):
+        job['attempts'] = job.get('attempts', 0) + 1
+        job['error'] = error
+        if job['attempts'] >= job['max_attempts']:
+            self.events.append(('failed', job['id'], error))
+        else:
+            self.pending.append(job)
+    
+    def _holds(self, job_id: str, worker: str) -> bool:
+        lease = self.leases.get(job_id)
+        return lease is not None and lease[1] == worker
+    
+    def handle_request(self, rfile, wfile):
+        try:
+            request = json.loads(rfile.readline().decode('utf-8'))
+        except ValueError:
+            return
+        op = request.get('op')
+        worker = request.get('worker', '')
+        job_id = request.get('id', '')
+        
+        received = None
+        if op == 'complete':
+            received = self.spool_dir / f".{job_id}.{uuid.uuid4().hex}.mp4"
+            remaining = int(request.get('size', 0))
+            with open(received, 'wb') as f:
+                while remaining > 0:
+                    chunk = rfile.read(min(remaining, 1 << 20))
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    remaining -= len(chunk)
+            if remaining:
+                received.unlink()
+                return
+        
+        with self.lock:
+            if op == 'claim':
+                job = None
+                for candidate in self.pending:
+                    if worker not in self.skipped.get(candidate['id'], ()):
+                        job = candidate
+                        break
+                if job is not None:
+                    self.pending.remove(job)
+                    self.leases[job['id']] = (job, worker, time.time() + self.lease_seconds)
+                response = {'job': job}
+            elif op == 'heartbeat':
+                ok = self._holds(job_id, worker)
+                if ok:
+                    job, _, _ = self.leases[job_id]
+                    self.leases[job_id] = (job, worker, time.time() + self.lease_seconds)
+                response = {'ok': ok}
+            elif op == 'complete':
+                ok = self._holds(job_id, worker)
+                if ok:
+                    del self.leases[job_id]
+                    cell_path = self.spool_dir / f"{job_id}.mp4"
+                    os.replace(received, cell_path)
+                    self.events.append(('done', job_id, cell_path))
+                else:
+                    received.unlink()
+                response = {'ok': ok}
+            elif op == 'fail':
+                ok = self._holds(job_id, worker)
+                if ok:
+                    job, _, _ = self.leases.pop(job_id)
+                    if request.get('skip'):
+                        self.skipped.setdefault(job_id, set()).add(worker)
+                        self.pending.append(job)
+                        self.events.append(('skipped', job_id, worker))
+                    else:
+                        self._requeue(job, request.get('error', 'unknown error'))
+                response = {'ok': ok}
+            else:
+                response = {'error': f"unknown request {op!r}"}
+        
+        wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+    
+    # Coordinator side
+    
+    def publish(self, jobs: List[Dict]):
+        with self.lock:
+            self.pending.extend(jobs)
+    
+    def poll(self, prefix: str) -> List[Tuple[str, str, object]]:
+        now = time.time()
+        with self.lock:
+            for job_id, (job, worker, expiry) in list(self.leases.items()):
+                if expiry < now:
+                    del self.leases[job_id]
+                    self._requeue(job, f"lease of {worker} expired")
+            events = [event for event in self.events if event[1].startswith(prefix)]
+            self.events = [event for event in self.events if not event[1].startswith(prefix)]
+        return events
+    
+    def withdraw(self, job_id: str) -> bool:
+        with self.lock:
+            for job in self.pending:
+                if job['id'] == job_id:
+                    self.pending.remove(job)
+                    return True
+        return False
+    
+    def cancel(self, prefix: str):
+        with self.lock:
+            self.pending = deque(job for job in self.pending if not job['id'].startswith(prefix))
+            for job_id in [job_id for job_id in self.leases if job_id.startswith(prefix)]:
+                del self.leases[job_id]
+            for kind, job_id, payload in self.events:
+                if kind == 'done' and job_id.startswith(prefix) and payload.exists():
+                    payload.unlink()
+            self.events = [event for event in self.events if not event[1].startswith(prefix)]
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+class TcpJobClient:
+    """Worker side of a TcpJobQueue; one short connection per request."""
+    
+    def __init__(self, address: Tuple[str, int]):
+        self.address = address
+    
+    def describe(self) -> str:
+        return f"tcp://{self.address[0]}:{self.address[1]}"
+    
+    def _request(self, request: Dict, payload: Optional[Path] = None) -> Dict:
+        with socket.create_connection(self.address, timeout=RESIZE_TIMEOUT) as sock:
+            stream = sock.makefile('rwb')
+            stream.write((json.dumps(request) + '\n').encode('utf-8'))
+            if payload:
+                with open(payload, 'rb') as f:
+                    shutil.copyfileobj(f, stream)
+            stream.flush()
+            line = stream.readline()
+        return json.loads(line.decode('utf-8')) if line else {}
+    
+    def claim(self, worker: str, skipped: Set[str]) -> Optional[Dict]:
+        return self._request({'op': 'claim', 'worker': worker}).get('job')
+    
+    def heartbeat(self, job: Dict, worker: str) -> bool:
+        return self._request({'op': 'heartbeat', 'worker': worker, 'id': job['id']}).get('ok', False)
+    
+    def cell_target(self, job: Dict, worker: str) -> Path:
+        return Path(tempfile.gettempdir()) / f"grid_farm_{job['id']}.{worker}.mp4"
+    
+    def complete(self, job: Dict, worker: str, cell_path: Path) -> bool:
+        try:
+            request = {'op': 'complete', 'worker': worker, 'id': job['id'], 'size': cell_path.stat().st_size}
+            return self._request(request, payload=cell_path).get('ok', False)
+        finally:
+            cell_path.unlink()
+    
+    def fail(self, job: Dict, worker: str, error: str, skip: bool = False):
+        self._request({'op': 'fail', 'worker': worker, 'id': job['id'], 'error': error, 'skip': skip})
+
+class FarmWorker:
+    """Claim resize jobs from a queue and render them with the local FFmpeg, several at a time."""
+    
+    def __init__(self, queue, ffmpeg_path: str, jobs: int = 1, poll_interval: float = 1.0,
+                 idle_exit: float = 0.0):
+        self.queue = queue
+        self.ffmpeg_path = ffmpeg_path
+        self.jobs = max(1, jobs)
+        self.poll_interval = poll_interval
+        self.idle_exit = idle_exit
+        self.name = re.sub(r'[^\w\-]+', '-', f"{platform.node()}-{os.getpid()}")
+        self.skipped = set()
+        self.counts = {'done': 0, 'failed': 0, 'skipped': 0, 'lost': 0}
+        self.lock = threading.Lock()
+        self.stop = threading.Event()
+        self.last_activity = time.time()
+    
+    def threads(self) -> int:
+        """Split the cores across the worker's slots, as the grid maker does for local jobs."""
+        if self.jobs <= 1:
+            return 0
+        return max(1, (os.cpu_count() or 1) // self.jobs)
+    
+    def process(self, job: Dict, worker: str) -> str:
+        """Render one claimed job; returns 'done', 'failed', 'skipped' or 'lost' (lease taken back)."""
+        if not os.path.exists(job['source']):
+            self.skipped.add(job['id'])
+            self.queue.fail(job, worker, f"{job['source']} is not readable on {worker}", skip=True)
+            return 'skipped'
+        
+        cell_path = self.queue.cell_target(job, worker)
+        cmd = resize_command(self.ffmpeg_path, job, cell_path, self.threads())
+        heartbeat_interval = max(1.0, job.get('lease_seconds', 60) / 3)
+        deadline = time.time() + RESIZE_TIMEOUT
+        runner = ProcessRunner.shared()
+        error = None
+        try:
+            # Leaving the block for any reason (lost coordinator, stop, Ctrl+C) kills FFmpeg
+            with tempfile.TemporaryFile() as log, runner.popen(cmd, stdin=subprocess.DEVNULL,
+                                                               stdout=subprocess.DEVNULL, stderr=log) as proc:
+                next_heartbeat = time.time() + heartbeat_interval
+                while proc.poll() is None:
+                    if self.stop.is_set():
+                        error = 'lost'
+                    elif time.time() > deadline:
+                        error = f"FFmpeg timed out after {RESIZE_TIMEOUT}s"
+                    elif time.time() >= next_heartbeat:
+                        if not self.queue.heartbeat(job, worker):
+                            error = 'lost'
+                        next_heartbeat = time.time() + heartbeat_interval
+                    if error:
+                        break
+                    self.stop.wait(STOP_POLL_INTERVAL)
+                if error is None and proc.returncode != 0:
+                    if self.stop.is_set() or runner.interrupted:
+                        error = 'lost'
+                    else:
+                        log.seek(0)
+                        error = (log.read().decode(errors='replace').strip()[-500:]
+                                 or f"FFmpeg exited with {proc.returncode}")
+        except BaseException:
+            self._discard(cell_path)
+            raise
+        
+        if error is None:
+            return 'done' if self.queue.complete(job, worker, cell_path) else 'lost'
+        self._discard(cell_path)
+        if error == 'lost':
+            return 'lost'
+        self.queue.fail(job, worker, error)
+        return 'failed'
+    
+    @staticmethod
+    def _discard(cell_path: Path):
+        try:
+            cell_path.unlink()
+        except OSError:
+            pass
+    
+    def _slot(self, index: int):
+        worker = f"{self.name}-{index}"
+        while not self.stop.is_set():
+            try:
+                job = self.queue.claim(worker, self.skipped)
+            except OSError:
+                # Coordinator not up yet, or already finished; keep polling
+                job = None
+            if job is None:
+                if self.idle_exit and time.time() - self.last_activity > self.idle_exit:
+                    self.stop.set()
+                    break
+                self.stop.wait(self.poll_interval)
+                continue
+            
+            self.last_activity = time.time()
+            try:
+                status = self.process(job, worker)
+            except OSError as e:
+                print(f"Warning: [{worker}] job {job['id']} aborted: {e}")
+                status = 'lost'
+            self.last_activity = time.time()
+            with self.lock:
+                self.counts[status] += 1
+            if status != 'skipped':
+                print(f"[{worker}] {status}: {Path(job['source']).name} ({job['size']}px)")
+    
+    def run(self) -> bool:
+        print(f"Grid farm worker {self.name}: {self.jobs} slot(s) on {self.queue.describe()}")
+        slots = [threading.Thread(target=self._slot, args=(index,), daemon=True) for index in range(self.jobs)]
+        for slot in slots:
+            slot.start()
+        try:
+            while any(slot.is_alive() for slot in slots):
+                time.sleep(0.5)
+        except KeyboardInterrupt:
+            print("\nStopping worker (unfinished jobs go back to the queue when their lease runs out)")
+            self.stop.set()
+            # Let each slot kill its FFmpeg and remove its partial cell before the process exits
+            for slot in slots:
+                slot.join(timeout=10)
+        print(f"Worker finished: {self.counts['done']} done, {self.counts['failed']} failed, "
+              f"{self.counts['lost']} lost, {self.counts['skipped']} skipped")
+        return True
+
+class CellFarm:
+    """Coordinator side: publish the cells a grid needs as jobs and collect them as workers finish."""
+    
+    def __init__(self, queue, max_attempts: int = 3, timeout: float = 0.0, poll_interval: float = 0.5):
+        self.queue = queue
+        self.max_attempts = max(1, max_attempts)
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+        self.run_id = uuid.uuid4().hex[:12]
+        self.render_ids = itertools.count()
+    
+    def make_job(self, generator, job_id: str, video_path: Path, duration: float) -> Dict:
+        return {
+            'id': job_id,
+            'source': str(Path(video_path).resolve()),
+            'size': generator.thumbnail_size,
+            'duration': duration,
+            'fps': generator.fps,
+            'profile': generator.profile,
+            'seek': generator.input_args(video_path)[:-2],
+            'video_filter': generator.step_filter() + generator.thumbnail_filter(),
+            'attempts': 0,
+            'max_attempts': self.max_attempts,
+            'lease_seconds': self.queue.lease_seconds,
+        }
+    
+    @staticmethod
+    def adopt(cell_path: Path, output_path: Path) -> bool:
+        """Move a finished cell into place without ever exposing a partial file."""
+        tmp_path = output_path.with_name(f"{output_path.stem}.{threading.get_ident()}.tmp.mp4")
+        try:
+            shutil.move(str(cell_path), str(tmp_path))
+            os.replace(tmp_path, output_path)
+            return True
+        except OSError as e:
+            print(f"Warning: Could not collect cell {cell_path}: {e}")
+            return False
+    
+    def render(self, generator, tasks: List[Tuple], duration: float) -> Iterator[Tuple[Tuple, bool]]:
+        """Yield (task, ok) for each (i, j, video_path, output_path) task as its cell arrives.
+        
+        Cells the workers give up on, or do not finish within the timeout, are resized locally.
+        So is a cell that no worker has claimed one lease period after a worker skipped it
+        because it could not read the source. A cell another worker is rendering is left to it.
+        """
+        prefix = f"{self.run_id}-{next(self.render_ids)}-"
+        skip_grace = self.queue.lease_seconds
+        waiting = {}
+        skipped_at = {}
+        jobs = []
+        for n, task in enumerate(tasks):
+            job = self.make_job(generator, f"{prefix}{n:05d}", task[2], duration)
+            waiting[job['id']] = task
+            jobs.append(job)
+        self.queue.publish(jobs)
+        print(f"Published {len(jobs)} cell jobs to {self.queue.describe()}")
+        
+        started = last_report = time.time()
+        try:
+            while waiting:
+                for kind, job_id, payload in self.queue.poll(prefix):
+                    if kind == 'skipped':
+                        if job_id in waiting:
+                            skipped_at.setdefault(job_id, time.time())
+                        continue
+                    task = waiting.pop(job_id, None)
+                    if task is None:
+                        continue
+                    if kind == 'done':
+                        yield task, self.adopt(payload, task[3])
+                    else:
+                        print(f"Warning: Workers gave up on {task[2]} ({payload}); resizing it here")
+                        yield task, generator.render_cell(task[2], task[3], duration)
+                
+                now = time.time()
+                for job_id, since in list(skipped_at.items()):
+                    # withdraw fails while a worker holds the lease; an expired lease puts the job back
+                    if job_id in waiting and now - since > skip_grace and self.queue.withdraw(job_id):
+                        task = waiting.pop(job_id)
+                        print(f"Warning: No worker took {task[2]} after it was skipped; resizing it here")
+                        yield task, generator.render_cell(task[2], task[3], duration)
+                
+                if waiting and self.timeout and time.time() - started > self.timeout:
+                    print(f"Warning: {len(waiting)} cells not rendered by workers within {self.timeout:.0f}s; "
+                          f"resizing them here")
+                    self.queue.cancel(prefix)
+                    for task in list(waiting.values()):
+                        yield task, generator.render_cell(task[2], task[3], duration)
+                    waiting.clear()
+                
+                if waiting:
+                    if time.time() - last_report >= 10:
+                        print(f"Waiting for workers: {len(waiting)} of {len(jobs)} cells outstanding")
+                        last_report = time.time()
+                    time.sleep(self.poll_interval)
+        finally:
+            self.queue.cancel(prefix)
+    
+    def close(self):
+        self.queue.close()
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Render grid cells for deforum_video_grid.py --farm coordinators",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python grid_farm.py /mnt/shared/grid_queue -j 4
+  python grid_farm.py tcp://render-head:8765 -j 8 --idle-exit 300
+        """
+    )
+    
+    parser.add_argument(
+        'queue',
+        help='Queue directory shared with the coordinator, or tcp://host:port of a coordinator'
+    )
+    
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=os.cpu_count() or 1,
+        help='Cells to render at the same time (default: CPU core count)'
+    )
+    
+    parser.add_argument(
+        '--ffmpeg-path',
+        help='Custom path to FFmpeg executable'
+    )
+    
+    parser.add_argument(
+        '--poll-interval',
+        type=float,
+        default=1.0,
+        help='Seconds between checks for new jobs when the queue is empty (default: 1)'
+    )
+    
+    parser.add_argument(
+        '--idle-exit',
+        type=float,
+        default=0.0,
+        help='Exit after this many seconds without a job (default: run until interrupted)'
+    )
+    
+    args = parser.parse_args()
+    
+    ffmpeg_path = args.ffmpeg_path or FFmpegLocator.find_ffmpeg()
+    if not ffmpeg_path:
+        print("Error: FFmpeg not found. Please install FFmpeg or specify path with --ffmpeg-path")
+        return 1
+    
+    ProcessRunner.shared(args.jobs).install_interrupt_handler()
+    worker = FarmWorker(open_worker_queue(args.queue), ffmpeg_path, jobs=args.jobs,
+                        poll_interval=args.poll_interval, idle_exit=args.idle_exit)
+    return 0 if worker.run() else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
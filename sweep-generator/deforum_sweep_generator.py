@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+"""
+Deforum Sweep Generator
+
+Headless version of the settings generator in deforum_xyz_enhanced-batchname.html.
+Takes a base Deforum settings file and X/Y (and optionally Z) parameter ranges, and
+writes one settings file per combination into a ZIP archive or straight into a folder
+for Deforum batch mode.
+
+Combinations are generated one at a time and written as they are produced, so sweeps
+with many thousands of files use little memory. A manifest (manifest.jsonl) lists the
+varied parameters and batch name of every file.
+
+Usage:
+    python deforum_sweep_generator.py base_settings.txt -x PARAM VALUES... -y PARAM VALUES...
+                                      [-z PARAM VALUES...] [-o output.zip | -o folder]
+
+Value formats (same as the web page):
+    0.5             single value
+    1-5             integer range: 1, 2, 3, 4, 5
+    0.1-0.5         float range in steps of 0.1
+    0-1 (+0.2)      range with increment: 0, 0.2, 0.4, 0.6, 0.8, 1
+    0-1 [6]         range with count: 0, 0.2, 0.4, 0.6, 0.8, 1
+"""
+
+import sys
+import re
+import json
+import argparse
+import tempfile
+import zipfile
+from datetime import datetime
+from itertools import product
+from pathlib import Path
+from typing import List, Tuple, Dict, Optional, Iterator
+
+SIMPLE_RANGE_RE = re.compile(r'^(-?\d*\.?\d+)-(-?\d*\.?\d+)$')
+INCREMENT_RANGE_RE = re.compile(r'^(-?\d*\.?\d+)-(-?\d*\.?\d+)\s*\(\s*(\+|-)(\d*\.?\d+)\s*\)$')
+COUNT_RANGE_RE = re.compile(r'^(-?\d*\.?\d+)-(-?\d*\.?\d+)\s*\[\s*(\d+)\s*\]$')
+
+# Parameters written as "0: (value)" keyframe schedules
+SCHEDULE_PARAMETERS = {
+    'strength_schedule', 'cfg_scale_schedule', 'noise_schedule', 'contrast_schedule',
+    'zoom', 'angle', 'translation_x', 'translation_y', 'translation_z',
+    'rotation_3d_x', 'rotation_3d_y', 'rotation_3d_z', 'perspective_flip_theta',
+    'perspective_flip_phi', 'perspective_flip_gamma', 'perspective_flip_fv'
+}
+
+DEFAULT_TEMPLATE = '{timestring}_512-circle_seed_{seed}_{seed_behavior}_{w}x{h}_{x_param}-{x_value}_{y_param}-{y_value}'
+
+MANIFEST_FILENAME = 'manifest.jsonl'
+
+def js_number(value: float):
+    """Return integral floats as int, so values print the way JavaScript prints numbers."""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def format_value(value) -> str:
+    """Format a value for names and templates the way JavaScript string conversion does."""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(js_number(value))
+
+def parse_parameter_value(value: str):
+    """Parse a single value as a number, boolean or string."""
+    try:
+        return js_number(float(value))
+    except ValueError:
+        pass
+    
+    if value.lower() == 'true':
+        return True
+    if value.lower() == 'false':
+        return False
+    return value
+
+def parse_range(range_str: str) -> List:
+    """Expand a value or range expression into a list of values."""
+    range_str = range_str.strip()
+    
+    if range_str == 'true':
+        return [True]
+    if range_str == 'false':
+        return [False]
+    
+    # Simple value (not a range)
+    if '-' not in range_str:
+        return [parse_parameter_value(range_str)]
+    
+    # Simple range: "1-5" steps by 1, "0.1-0.5" steps by 0.1
+    match = SIMPLE_RANGE_RE.match(range_str)
+    if match:
+        start, end = float(match.group(1)), float(match.group(2))
+        result = []
+        if '.' not in range_str:
+            step = 1 if start <= end else -1
+            i = start
+            while (i <= end) if step > 0 else (i >= end):
+                result.append(js_number(i))
+                i += step
+        else:
+            step = 0.1 if start <= end else -0.1
+            i = start
+            while (i <= end + 0.0001) if step > 0 else (i >= end - 0.0001):
+                result.append(js_number(round(i, 1)))
+                i += step
+        return result
+    
+    # Range with increment: "1-5 (+2)", "10-5 (-3)", "1-3 (+0.5)"
+    match = INCREMENT_RANGE_RE.match(range_str)
+    if match:
+        start, end = float(match.group(1)), float(match.group(2))
+        increment = float(match.group(4)) * (1 if match.group(3) == '+' else -1)
+        result = [js_number(start)]
+        current = start
+        while ((increment > 0 and current + increment <= end) or
+               (increment < 0 and current + increment >= end)):
+            current += increment
+            result.append(js_number(round(current, 10)))
+        return result
+    
+    # Range with count: "1-10 [5]", "0.0-1.0 [6]"
+    match = COUNT_RANGE_RE.match(range_str)
+    if match:
+        start, end = float(match.group(1)), float(match.group(2))
+        count = int(match.group(3))
+        if count < 2:
+            return [js_number(start)]
+        step = (end - start) / (count - 1)
+        return [js_number(round(start + i * step, 10)) for i in range(count)]
+    
+    # Not recognized as a range, treat as a single value
+    return [parse_parameter_value(range_str)]
+
+def parse_values(range_strs: List[str]) -> List:
+    """Expand and concatenate several value or range expressions."""
+    values = []
+    for range_str in range_strs:
+        if range_str.strip():
+            values.extend(parse_range(range_str))
+    return values
+
+def short_name(param: str) -> str:
+    return param.split('.')[-1]
+
+def is_schedule_parameter(param: str) -> bool:
+    return short_name(param) in SCHEDULE_PARAMETERS
+
+def format_schedule_value(param: str, value):
+    """Wrap values of schedule parameters as a single keyframe, "0: (value)"."""
+    if is_schedule_parameter(param):
+        return f"0: ({format_value(value)})"
+    return value
+
+def make_timestring(now: Optional[datetime] = None) -> str:
+    return (now or datetime.now()).strftime('%Y%m%d%H%M%S')
+
+def generate_batch_name(template: str, base_settings: Dict, timestring: str,
+                        axes: List[Tuple[str, object]]) -> str:
+    """Fill in a batch name template.
+    
+    axes holds (param, value) for X, Y and optionally Z; missing axes keep placeholder names.
+    """
+    names = ['x', 'y', 'z']
+    variables = {
+        'timestring': timestring,
+        'seed': base_settings.get('seed') or -1,
+        'seed_behavior': base_settings.get('seed_behavior') or 'iter',
+        'w': base_settings.get('W') or 512,
+        'h': base_settings.get('H') or 512,
+        'steps': base_settings.get('steps') or 20,
+        'cfg_scale': base_settings.get('cfg_scale') or 7,
+        'sampler': base_settings.get('sampler') or 'Euler a',
+        'strength': base_settings.get('strength') or 0.75,
+        'max_frames': base_settings.get('max_frames') or 120,
+    }
+    for axis, name in enumerate(names):
+        param, value = axes[axis] if axis < len(axes) else (None, None)
+        variables[f'{name}_param'] = short_name(param) if param else f'{name}_param'
+        # Unlike the web page, a value of 0 is kept rather than replaced by the placeholder
+        variables[f'{name}_value'] = value if value is not None else f'{name}_val'
+    
+    result = template
+    for key, value in variables.items():
+        result = result.replace(f'{{{key}}}', format_value(value))
+    return result
+
+def with_overrides(settings: Dict, overrides: Dict[str, object]) -> Dict:
+    """Return settings with dotted-path overrides applied.
+    
+    Only the dicts along each overridden path are copied; everything else is shared with the
+    base settings, so no full deep copy is made per combination. Key order is preserved.
+    """
+    result = dict(settings)
+    for path, value in overrides.items():
+        parts = path.split('.')
+        current = result
+        for part in parts[:-1]:
+            child = current.get(part)
+            child = dict(child) if isinstance(child, dict) else {}
+            current[part] = child
+            current = child
+        current[parts[-1]] = value
+    return result
+
+class SweepGenerator:
+    def __init__(self, base_settings: Dict, x_param: str, x_values: List, y_param: str, y_values: List,
+                 z_param: Optional[str] = None, z_values: Optional[List] = None,
+                 template: str = DEFAULT_TEMPLATE, timestring: Optional[str] = None):
+        self.base_settings = base_settings
+        self.x_param = x_param
+        self.x_values = x_values
+        self.y_param = y_param
+        self.y_values = y_values
+        self.z_param = z_param
+        self.z_values = z_values if z_param else [None]
+        self.template = template
+        self.timestring = timestring or make_timestring()
+    
+    def __len__(self) -> int:
+        return len(self.z_values) * len(self.y_values) * len(self.x_values)
+    
+    def file_path(self, x, y, z) -> str:
+        """Relative path of a combination's settings file, inside a z_<param>_<value> folder for Z sweeps."""
+        file_name = (f"{self.x_param.replace('.', '_')}_{format_value(x)}_"
+                     f"{self.y_param.replace('.', '_')}_{format_value(y)}")
+        if z is not None:
+            file_name += f"_{self.z_param.replace('.', '_')}_{format_value(z)}"
+            return f"z_{short_name(self.z_param)}_{format_value(z)}/{file_name}.txt"
+        return f"{file_name}.txt"
+    
+    def iter_entries(self) -> Iterator[Tuple[str, Dict, Dict]]:
+        """Lazily yield (relative path, settings, varied parameters) for every combination."""
+        for z, y, x in product(self.z_values, self.y_values, self.x_values):
+            axes = [(self.x_param, x), (self.y_param, y)]
+            if z is not None:
+                axes.append((self.z_param, z))
+            
+            overrides = {param: format_schedule_value(param, value) for param, value in axes}
+            batch_name = generate_batch_name(self.template, self.base_settings, self.timestring, axes)
+            overrides['batch_name'] = batch_name
+            
+            varied = {'batch_name': batch_name}
+            varied.update((param, value) for param, value in axes)
+            yield self.file_path(x, y, z), with_overrides(self.base_settings, overrides), varied
+    
+    def default_zip_name(self) -> str:
+        return f"deforum_xyz_plot_{self.timestring}.zip"
+    
+    def write_zip(self, zip_path: Path) -> int:
+        """Stream every settings file into a ZIP archive, with the manifest added last."""
+        count = 0
+        # zipfile can only write one member at a time, so the manifest is spooled to a temp file
+        with zipfile.ZipFile(zip_path, 'w', compression=zipfile.ZIP_DEFLATED) as zf, \
+                tempfile.TemporaryFile('w+', encoding='utf-8') as manifest:
+            for rel_path, settings, varied in self.iter_entries():
+                zf.writestr(rel_path, json.dumps(settings, indent=4, ensure_ascii=False))
+                manifest.write(self.manifest_line(rel_path, varied))
+                count += 1
+            manifest.seek(0)
+            with zf.open(MANIFEST_FILENAME, 'w') as dest:
+                for line in manifest:
+                    dest.write(line.encode('utf-8'))
+        return count
+    
+    def write_folder(self, folder: Path) -> int:
+        """Write every settings file into a folder (with z_<param>_<value> subfolders for Z sweeps)."""
+        folder.mkdir(parents=True, exist_ok=True)
+        count = 0
+        created = set()
+        with open(folder / MANIFEST_FILENAME, 'w', encoding='utf-8') as manifest:
+            for rel_path, settings, varied in self.iter_entries():
+                path = folder / rel_path
+                if path.parent not in created:
+                    path.parent.mkdir(parents=True, exist_ok=True)
+                    created.add(path.parent)
+                with open(path, 'w', encoding='utf-8') as f:
+                    json.dump(settings, f, indent=4, ensure_ascii=False)
+                manifest.write(self.manifest_line(rel_path, varied))
+                count += 1
+        return count
+    
+    @staticmethod
+    def manifest_line(rel_path: str, varied: Dict) -> str:
+        entry = {'file': rel_path}
+        entry.update(varied)
+        return json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate Deforum settings files for every X/Y/Z parameter combination",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+Examples:
+  python deforum_sweep_generator.py base.txt -x strength_schedule 0.4-0.7 -y cfg_scale_schedule "5-9 (+2)"
+  python deforum_sweep_generator.py base.txt -x zoom "1-1.05 [6]" -y seed 1-4 -z steps 20 30 -o sweep.zip
+  python deforum_sweep_generator.py base.txt -x strength_schedule 0.5 0.6 -y seed 1-3 -o "D:/batch_settings"
+        """
+    )
+    
+    parser.add_argument(
+        'settings',
+        help='Base Deforum settings file (JSON)'
+    )
+    
+    parser.add_argument(
+        '-x', '--x-axis',
+        nargs='+',
+        required=True,
+        metavar=('PARAM', 'VALUES'),
+        help='X-axis parameter (dotted path for nested keys) followed by values or ranges'
+    )
+    
+    parser.add_argument(
+        '-y', '--y-axis',
+        nargs='+',
+        required=True,
+        metavar=('PARAM', 'VALUES'),
+        help='Y-axis parameter followed by values or ranges'
+    )
+    
+    parser.add_argument(
+        '-z', '--z-axis',
+        nargs='+',
+        metavar=('PARAM', 'VALUES'),
+        help='Optional Z-axis parameter followed by values or ranges; '
+             'each Z value gets its own z_<param>_<value> folder'
+    )
+    
+    parser.add_argument(
+        '-t', '--template',
+        default=DEFAULT_TEMPLATE,
+        help='Batch name template. Variables: {timestring} {seed} {seed_behavior} {w} {h} '
+             '{x_param} {x_value} {y_param} {y_value} {z_param} {z_value} {steps} {cfg_scale} '
+             '{sampler} {strength} {max_frames}'
+    )
+    
+    parser.add_argument(
+        '-o', '--output',
+        help='Output .zip file, or a folder to write the settings files into '
+             '(default: deforum_xyz_plot_<timestring>.zip)'
+    )
+    
+    parser.add_argument(
+        '--list',
+        action='store_true',
+        help='Only print the files and batch names that would be generated'
+    )
+    
+    args = parser.parse_args()
+    
+    try:
+        with open(args.settings, 'r', encoding='utf-8') as f:
+            base_settings = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not read settings file '{args.settings}': {e}")
+        return 1
+    
+    axes = []
+    for name, axis in (('X', args.x_axis), ('Y', args.y_axis), ('Z', args.z_axis)):
+        if axis is None:
+            continue
+        if len(axis) < 2:
+            print(f"Error: {name}-axis needs a parameter and at least one value")
+            return 1
+        values = parse_values(axis[1:])
+        if not values:
+            print(f"Error: No values for {name}-axis parameter '{axis[0]}'")
+            return 1
+        axes.append((axis[0], values))
+    
+    generator = SweepGenerator(
+        base_settings,
+        axes[0][0], axes[0][1],
+        axes[1][0], axes[1][1],
+        z_param=axes[2][0] if len(axes) > 2 else None,
+        z_values=axes[2][1] if len(axes) > 2 else None,
+        template=args.template
+    )
+    
+    print(f"Generating {len(generator)} settings files")
+    for param, values in axes:
+        print(f"  {param}: {', '.join(format_value(v) for v in values)}")
+    
+    if args.list:
+        for rel_path, _, varied in generator.iter_entries():
+            print(f"{rel_path}  {varied['batch_name']}")
+        return 0
+    
+    output = Path(args.output or generator.default_zip_name())
+    if output.suffix.lower() == '.zip':
+        count = generator.write_zip(output)
+    else:
+        count = generator.write_folder(output)
+    
+    print(f"Wrote {count} settings files to {output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())